@@ -10,6 +10,54 @@ class Settings(BaseSettings):
     # Model settings
     model_path: str = "models/trading_model.pkl"
     model_version: str = "1.0.0"
+    predictor_backend: str = "sklearn"  # "sklearn", "compiled" or "mmap" (shared .npy arrays)
+    model_arrays_path: str = ""  # mmap backend arrays dir (default: <model stem>_arrays)
+    preload_model: bool = False  # Load + warm the model at import, before workers fork
+    model_watch_interval_seconds: float = 0.0  # Poll model_path and hot-reload (0 = off)
+
+    # Batch prediction
+    max_batch_size: int = 100  # Max agent contexts per /predict/batch call
+
+    # Decision execution: "inline" (on the event loop), "thread" or "process" pool
+    execution_mode: str = "thread"
+    executor_max_workers: int = 4
+    executor_max_queue: int = 16  # Calls waiting for a worker before 503
+    executor_retry_after_seconds: int = 1  # Retry-After sent with 503 when saturated
+    predict_timeout_seconds: float = 30.0  # 504 if a decision takes longer
+
+    # Threads computing features for independent symbols concurrently (1 = serial)
+    feature_workers: int = 1
+
+    # Streaming features: keep indicator state per (symbol, interval) and only
+    # fold in new candles. RSI/MACD then smooth over the full streamed history.
+    streaming_features_enabled: bool = False
+    streaming_features_max_series: int = 256
+
+    # Candle buffer: retain recent candles per symbol so requests can name
+    # candleWindows and send only new candles instead of full windows
+    candle_buffer_enabled: bool = False
+    candle_buffer_capacity: int = 1000  # Candles retained per symbol
+    candle_buffer_max_symbols: int = 1000  # Least recently used symbols are evicted
+    # Also retain candles sent in full windows (trusts every client: they are shared)
+    candle_buffer_ingest_requests: bool = False
+
+    # Streaming sessions (WebSocket /predict/stream)
+    stream_max_sessions: int = 1000  # Open sessions; each runs one decision at a time
+
+    # Feature cache: latest features keyed by a hash of the candle series
+    feature_cache_enabled: bool = True
+    feature_cache_max_bytes: int = 16 * 1024 * 1024  # Memory bound for cached entries
+    feature_cache_ttl_seconds: int = 300
+
+    # Prometheus metrics
+    metrics_public: bool = False  # Serve /metrics without an API key
+    metrics_max_symbols: int = 200  # Distinct symbol labels before "other"
+
+    # Rate limiting: "memory" (per worker) or "redis" (shared by all workers)
+    rate_limit_backend: str = "memory"
+    rate_limit_key: str = "ip"  # Count per "ip", "api_key" or "agent_id"
+    rate_limit_predict: str = "5/minute"
+    rate_limit_predict_batch: str = "5/minute"
 
     # Logging
     log_level: str = "INFO"
@@ -27,6 +75,15 @@ class Settings(BaseSettings):
     redis_password: Optional[str] = None
     redis_enabled: bool = False  # Enable when Redis is available
     redis_ttl_seconds: int = 3600  # 1 hour cache
+    redis_max_connections: int = 50  # Async connection pool size per worker
+    redis_socket_timeout_seconds: float = 5.0
+
+    # In-process L1 in front of Redis for idempotent responses (0 entries = off;
+    # unused while Redis is disabled or unreachable)
+    idempotency_l1_max_entries: int = 1024
+    idempotency_l1_max_bytes: int = 8 * 1024 * 1024
+    idempotency_l1_ttl_seconds: float = 60.0
+    idempotency_l1_negative_ttl_seconds: float = 1.0  # How long a Redis miss is remembered
 
     class Config:
         env_file = ".env"
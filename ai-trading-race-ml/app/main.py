@@ -1,55 +1,141 @@
 """FastAPI application for the ML trading service."""
 
+import hashlib
+import logging
 import os
+import time
 from contextlib import asynccontextmanager
-from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from slowapi import Limiter
-from slowapi.errors import RateLimitExceeded
-from slowapi.util import get_remote_address
+from fastapi.responses import Response
+from pydantic import ValidationError
 
+from app import metrics
 from app.config import settings
-from app.middleware.auth import verify_api_key
+from app.middleware.auth import APIKeyMiddleware
 from app.middleware.idempotency import IdempotencyMiddleware
+from app.middleware.metrics import MetricsMiddleware
 from app.ml.predictor import TradingPredictor
 from app.models.schemas import (
     AgentContextRequest,
     AgentDecisionResponse,
+    AgentSessionUpdate,
+    CandlePushRequest,
     HealthResponse,
     SCHEMA_VERSION,
 )
-from app.services.decision_service import DecisionService
-from app.services.cache_service import cache_service
+from app.services.agent_session import AgentSession
+from app.services.cache_service import async_cache_service
+from app.services.candle_buffer import CandleBuffer
+from app.services.candle_series import group_candles, series_from_columns
+from app.services.decision_executor import (
+    DecisionExecutor,
+    DecisionTimeoutError,
+    ExecutorSaturatedError,
+)
+from app.services.decision_service import DecisionService, create_decision_service
+from app.services.model_manager import ModelManager, ModelReloadError
+from app.services.rate_limiter import (
+    KEY_AGENT_ID,
+    KEY_API_KEY,
+    RateLimiter,
+    RedisRateLimitBackend,
+)
+
+logger = logging.getLogger(__name__)
 
 # Global instances (initialized in lifespan)
 predictor: Optional[TradingPredictor] = None
 decision_service: Optional[DecisionService] = None
+decision_executor: Optional[DecisionExecutor] = None
+model_manager: Optional[ModelManager] = None
+candle_buffer: Optional[CandleBuffer] = None
+
+# Open /predict/stream sessions
+stream_sessions = 0
+
+# Service built at import time when preloading, so a pre-forking server
+# (gunicorn --preload) loads and warms the model once for all workers
+_preloaded_service: Optional[DecisionService] = None
+
+
+def _build_decision_service() -> DecisionService:
+    """Create the decision service and warm its model."""
+    service = create_decision_service()
+    service.predictor.warm_up()
+    return service
+
+
+if settings.preload_model:
+    _preloaded_service = _build_decision_service()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize and cleanup application resources."""
-    global predictor, decision_service
+    global predictor, decision_service, decision_executor, model_manager, candle_buffer
 
-    # Initialize predictor and decision service
-    model_path = Path(settings.model_path)
-    predictor = TradingPredictor(model_path)
-    decision_service = DecisionService(predictor)
+    # Initialize predictor, decision service and the pool that runs it
+    decision_service = _preloaded_service or _build_decision_service()
+    predictor = decision_service.predictor
+    decision_executor = DecisionExecutor(
+        decision_service,
+        mode=settings.execution_mode,
+        max_workers=settings.executor_max_workers,
+        max_queue=settings.executor_max_queue,
+        timeout_seconds=settings.predict_timeout_seconds,
+    )
+
+    # Hot model reloads (admin endpoint, and file watching if enabled)
+    model_manager = ModelManager(
+        decision_service,
+        decision_service.model_version,
+        on_swap=decision_executor.recycle_workers,
+    )
+    if settings.model_watch_interval_seconds > 0:
+        model_manager.start_watching(settings.model_watch_interval_seconds)
+
+    # Recent candles per symbol, so requests can send only new ones
+    if settings.candle_buffer_enabled:
+        candle_buffer = CandleBuffer(
+            capacity=settings.candle_buffer_capacity,
+            max_symbols=settings.candle_buffer_max_symbols,
+        )
+
+    # Idempotency cache (async Redis pool, if enabled)
+    await async_cache_service.connect()
+
+    # Share rate-limit counters across workers through the same pool
+    if settings.rate_limit_backend == "redis":
+        if async_cache_service.client is not None:
+            limiter.use_backend(RedisRateLimitBackend(async_cache_service.client))
+        else:
+            logger.warning("Redis unavailable, rate limits are counted per worker")
 
     yield
 
     # Cleanup
-    cache_service.close()
+    await model_manager.stop()
+    decision_executor.shutdown()
+    decision_service.close()
+    await async_cache_service.close()
     predictor = None
     decision_service = None
+    decision_executor = None
+    model_manager = None
+    candle_buffer = None
 
 
-# Rate limiter (per IP, 5 requests/minute on /predict)
-limiter = Limiter(key_func=get_remote_address)
+# Rate limiter (per IP by default, 5 requests/minute on /predict)
+limiter = RateLimiter(
+    limits={
+        "predict": settings.rate_limit_predict,
+        "predict_batch": settings.rate_limit_predict_batch,
+    },
+    key_func=settings.rate_limit_key,
+)
 
 # Disable docs in production
 is_dev = os.getenv("ENVIRONMENT", "development") == "development"
@@ -65,23 +151,14 @@ app = FastAPI(
     openapi_url="/openapi.json" if is_dev else None,
 )
 
-# Rate limit state and 429 handler
-app.state.limiter = limiter
-
+# Stage timing, innermost so it measures the app itself
+app.add_middleware(MetricsMiddleware)
 
-@app.exception_handler(RateLimitExceeded)
-async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
-    return JSONResponse(
-        status_code=429,
-        content={"detail": f"Rate limit exceeded: {exc.detail}"},
-    )
-
-
-# Add idempotency middleware (must be before auth)
+# Add idempotency middleware (runs after auth: added first = inner)
 app.add_middleware(IdempotencyMiddleware)
 
 # Add API key authentication middleware
-app.middleware("http")(verify_api_key)
+app.add_middleware(APIKeyMiddleware)
 
 # Configure CORS based on environment
 if settings.allowed_origin:
@@ -102,6 +179,94 @@ if origins:
     )
 
 
+def _busy_exception() -> HTTPException:
+    """503 telling the client when to retry while the decision pool is full."""
+    return HTTPException(
+        status_code=503,
+        detail="Server busy, retry later",
+        headers={"Retry-After": str(settings.executor_retry_after_seconds)},
+    )
+
+
+def _rate_limit_identities(request: Request, agent_ids: list[str]) -> list[str]:
+    """Values the configured key function counts this request against."""
+    if limiter.key_func == KEY_AGENT_ID:
+        return agent_ids
+    if limiter.key_func == KEY_API_KEY:
+        api_key = request.headers.get("X-API-Key", "")
+        # Keys are hashed so secrets never end up in Redis
+        return [hashlib.sha256(api_key.encode()).hexdigest()[:16]]
+    return [request.client.host if request.client else "unknown"]
+
+
+async def _enforce_rate_limit(request: Request, endpoint: str, agent_ids: list[str]) -> None:
+    """Raise 429 with Retry-After if the request is over the endpoint's limit."""
+    result = await limiter.hit(endpoint, _rate_limit_identities(request, agent_ids))
+    if not result.allowed:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded: {limiter.limits[endpoint]}",
+            headers={"Retry-After": str(result.retry_after_seconds)},
+        )
+
+
+def _resolve_candles(contexts: list[AgentContextRequest]) -> None:
+    """Read requested candle windows from the buffer (see CandleBuffer.resolve)."""
+    if candle_buffer is None:
+        return
+    # Here rather than in the executor, so process-pool workers receive the
+    # windows with the request instead of needing the buffer themselves
+    try:
+        with metrics.stage_timer(metrics.STAGE_CANDLES):
+            for context in contexts:
+                candle_buffer.resolve(context, ingest=settings.candle_buffer_ingest_requests)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid request: {str(e)}",
+        )
+
+
+async def _run_decision(method: str, *args: Any) -> Any:
+    """Run a DecisionService method in the pool, mapping failures to HTTP errors."""
+    if decision_executor is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Service not initialized",
+        )
+    try:
+        return await decision_executor.run(method, *args)
+    except ExecutorSaturatedError:
+        raise _busy_exception()
+    except DecisionTimeoutError:
+        raise HTTPException(
+            status_code=504,
+            detail="Prediction timed out",
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid request: {str(e)}",
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Prediction failed: {str(e)}",
+        )
+
+
+def _mark_parsed(request: Request) -> None:
+    """Record the time from routing until the body was parsed and validated."""
+    received_at = getattr(request.state, "received_at", None)
+    if received_at is not None:
+        metrics.observe_stage(metrics.STAGE_PARSE, time.perf_counter() - received_at)
+
+
+def _mark_handled(request: Request) -> None:
+    """Stamp the end of the handler so serialization time can be measured."""
+    request.state.handler_done = time.perf_counter()
+
+
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """
@@ -110,16 +275,27 @@ async def health_check():
     Returns service status and model information.
     Does not require API key authentication.
     """
+    current = model_manager.predictor if model_manager else predictor
     return HealthResponse(
         status="healthy",
-        model_loaded=predictor.is_loaded if predictor else False,
-        model_version=settings.model_version,
+        model_loaded=current.is_loaded if current else False,
+        model_version=model_manager.model_version if model_manager else settings.model_version,
         schema_version=SCHEMA_VERSION,
     )
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """
+    Prometheus metrics: per-stage latency histograms and decision counters.
+
+    Requires X-API-Key header unless ML_SERVICE_METRICS_PUBLIC is set.
+    """
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
 @app.post("/predict", response_model=AgentDecisionResponse)
-@limiter.limit("5/minute")
 async def predict(request: Request, context: AgentContextRequest):
     """
     Generate a trading decision for an agent.
@@ -132,21 +308,229 @@ async def predict(request: Request, context: AgentContextRequest):
     Returns:
         Trading decision with orders and explanation signals
     """
-    if decision_service is None:
+    _mark_parsed(request)
+    await _enforce_rate_limit(request, "predict", [context.agent_id])
+
+    if decision_executor is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Service not initialized",
+        )
+
+    _resolve_candles([context])
+    decision = await _run_decision("generate_decision", context)
+
+    _mark_handled(request)
+    return decision
+
+
+@app.post("/predict/batch", response_model=list[AgentDecisionResponse])
+async def predict_batch(request: Request, contexts: list[AgentContextRequest]):
+    """
+    Generate trading decisions for many agents in one call.
+
+    Candle series shared between agents are deduplicated and the model
+    is run once over all of them. Requires X-API-Key header.
+
+    Args:
+        contexts: Agent contexts with portfolio and market candles
+
+    Returns:
+        One trading decision per context, in request order
+    """
+    _mark_parsed(request)
+    await _enforce_rate_limit(request, "predict_batch", [c.agent_id for c in contexts])
+
+    if decision_executor is None:
         raise HTTPException(
             status_code=503,
             detail="Service not initialized",
         )
 
+    if len(contexts) > settings.max_batch_size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid request: batch size exceeds {settings.max_batch_size}",
+        )
+
+    _resolve_candles(contexts)
+    decisions = await _run_decision("generate_decisions", contexts)
+
+    _mark_handled(request)
+    return decisions
+
+
+@app.post("/candles")
+async def push_candles(push: CandlePushRequest):
+    """
+    Add candles to the candle buffer, for requests that use candleWindows.
+
+    Candles older than the latest retained one of their symbol are ignored.
+    Requires X-API-Key header.
+
+    Args:
+        push: Candles in row and/or columnar form
+
+    Returns:
+        Candles added and retained per symbol
+    """
+    if candle_buffer is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid request: candle buffer is disabled",
+        )
+
+    appended: dict[str, int] = {}
+    for series in group_candles(push.candles) + [
+        series_from_columns(columns) for columns in push.candle_columns
+    ]:
+        appended[series.symbol] = (
+            appended.get(series.symbol, 0) + candle_buffer.append_series(series)
+        )
+    return {
+        "appended": appended,
+        "retained": {symbol: candle_buffer.rows(symbol) for symbol in appended},
+    }
+
+
+def _stream_context(
+    session: Optional[AgentSession], message: str
+) -> tuple[AgentSession, AgentContextRequest]:
+    """
+    Apply one /predict/stream message to its session.
+
+    Args:
+        session: The open session, or None if this message subscribes
+        message: JSON agent context (subscription) or AgentSessionUpdate
+
+    Returns:
+        The session and the request to decide on
+
+    Raises:
+        HTTPException: 422 for invalid messages, 400 for unusable ones
+    """
     try:
-        return decision_service.generate_decision(context)
+        with metrics.stage_timer(metrics.STAGE_PARSE):
+            if session is None:
+                session = AgentSession(
+                    AgentContextRequest.model_validate_json(message),
+                    candle_buffer,
+                    ingest=settings.candle_buffer_ingest_requests,
+                    capacity=settings.candle_buffer_capacity,
+                )
+                update = None
+            else:
+                update = AgentSessionUpdate.model_validate_json(message)
+        with metrics.stage_timer(metrics.STAGE_CANDLES):
+            return session, session.tick(update)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=422,
+            detail=e.errors(include_url=False, include_context=False, include_input=False),
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=400,
             detail=f"Invalid request: {str(e)}",
         )
-    except Exception as e:
+
+
+def _stream_error(error: HTTPException) -> dict:
+    """Stream message for a failed tick, mirroring the HTTP error response."""
+    body = {"status": error.status_code, "detail": error.detail}
+    retry_after = (error.headers or {}).get("Retry-After")
+    if retry_after is not None:
+        body["retryAfter"] = int(retry_after)
+    return {"error": body}
+
+
+@app.websocket("/predict/stream")
+async def predict_stream(websocket: WebSocket):
+    """
+    Stream trading decisions to a long-lived agent session.
+
+    The first message is a full agent context, as sent to /predict; every
+    later message is an AgentSessionUpdate with only what changed (see
+    AgentSession). Each message is answered with a decision, or with
+    {"error": {"status", "detail"}}, after which the session stays open.
+    Requires X-API-Key header, checked once when connecting; messages are
+    not rate limited, but each session runs one decision at a time.
+    """
+    global stream_sessions
+
+    if decision_executor is None or stream_sessions >= settings.stream_max_sessions:
+        # 1013 = try again later
+        await websocket.close(code=1013)
+        return
+
+    # Reserve the slot before the first await, so concurrent handshakes
+    # can't all pass the check above
+    stream_sessions += 1
+    session: Optional[AgentSession] = None
+    try:
+        await websocket.accept()
+        while True:
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                break
+            try:
+                message = frame.get("text")
+                if message is None:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Invalid request: messages must be JSON text frames",
+                    )
+                session, context = _stream_context(session, message)
+                decision = await _run_decision("generate_decision", context)
+            except HTTPException as e:
+                await websocket.send_json(_stream_error(e))
+                continue
+
+            with metrics.stage_timer(metrics.STAGE_SERIALIZE):
+                payload = decision.model_dump_json(by_alias=True)
+            await websocket.send_text(payload)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        stream_sessions -= 1
+        if session is not None:
+            logger.info(f"Stream of agent {session.agent_id} closed after {session.ticks} ticks")
+
+
+@app.post("/admin/model/reload")
+async def reload_model(
+    force: bool = False,
+    model_version: Optional[str] = Query(default=None, alias="modelVersion"),
+):
+    """
+    Reload the model file and swap it in without dropping requests.
+
+    The new model is loaded, validated and warmed in the background; requests
+    already running finish on the old one. Requires X-API-Key header.
+
+    Args:
+        force: Reload even if the model file is unchanged
+        model_version: Version to report for the new model
+
+    Returns:
+        Reload status with the serving model's version and feature count
+    """
+    if model_manager is None:
         raise HTTPException(
-            status_code=500,
-            detail=f"Prediction failed: {str(e)}",
+            status_code=503,
+            detail="Service not initialized",
         )
+
+    try:
+        result = await model_manager.reload(force=force, model_version=model_version)
+    except ModelReloadError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Model reload failed: {str(e)}",
+        )
+
+    return {
+        "status": "reloaded" if result.reloaded else "unchanged",
+        "modelVersion": result.model_version,
+        "nFeatures": result.n_features,
+    }
@@ -0,0 +1,137 @@
+"""Prometheus metrics for request stages and decisions.
+
+Every stage of a prediction (request parsing, candle grouping, feature
+engineering, model inference, signal generation, response serialization and
+idempotency cache lookups) is recorded in one latency histogram labelled by
+stage and by the version of the model serving it. Feature timings and
+decisions are also labelled by symbol.
+
+With several processes (gunicorn workers or the process execution mode),
+point PROMETHEUS_MULTIPROC_DIR at an empty directory shared by all of them
+and /metrics aggregates their samples.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+from app.config import settings
+
+# Stage names
+STAGE_PARSE = "parse"
+STAGE_CANDLES = "candles"
+STAGE_FEATURES = "features"
+STAGE_PREDICT = "predict"
+STAGE_SIGNALS = "signals"
+STAGE_SERIALIZE = "serialize"
+STAGE_IDEMPOTENCY_LOOKUP = "idempotency_lookup"
+STAGE_IDEMPOTENCY_STORE = "idempotency_store"
+
+# Symbols beyond the first `metrics_max_symbols` seen share this label
+OTHER_SYMBOL = "other"
+
+# Stages run from ~50us (signals) to seconds (features on long series)
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+STAGE_DURATION = Histogram(
+    "ml_stage_duration_seconds",
+    "Time spent in each stage of a prediction request",
+    ["stage", "model_version"],
+    buckets=LATENCY_BUCKETS,
+)
+SYMBOL_FEATURE_DURATION = Histogram(
+    "ml_symbol_feature_duration_seconds",
+    "Feature engineering time per candle series",
+    ["symbol"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_DURATION = Histogram(
+    "ml_request_duration_seconds",
+    "End-to-end request latency",
+    ["path", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+DECISIONS = Counter(
+    "ml_decisions",
+    "Model decisions per symbol and action",
+    ["symbol", "action", "model_version"],
+)
+IDEMPOTENCY_REQUESTS = Counter(
+    "ml_idempotency_requests",
+    "Requests with an Idempotency-Key by outcome (hit, miss or coalesced)",
+    ["result"],
+)
+
+_model_version = settings.model_version
+_symbols: set[str] = set()
+_symbols_lock = threading.Lock()
+
+
+def set_model_version(version: str) -> None:
+    """Label samples recorded from now on with this model version."""
+    global _model_version
+    _model_version = version
+
+
+def current_model_version() -> str:
+    return _model_version
+
+
+def symbol_label(symbol: str) -> str:
+    """Symbol as a label value, bounded so clients can't explode cardinality."""
+    if symbol in _symbols:
+        return symbol
+    with _symbols_lock:
+        if len(_symbols) >= settings.metrics_max_symbols:
+            return OTHER_SYMBOL
+        _symbols.add(symbol)
+    return symbol
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """Record how long a stage took."""
+    STAGE_DURATION.labels(stage, _model_version).observe(seconds)
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Time the enclosed block as `stage`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def record_decision(symbol: str, action: str) -> None:
+    """Count one model decision for a symbol."""
+    DECISIONS.labels(symbol_label(symbol), action, _model_version).inc()
+
+
+def render() -> tuple[bytes, str]:
+    """
+    Current metrics in the Prometheus text format.
+
+    Returns:
+        (body, content type)
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -2,58 +2,102 @@
 
 import hmac
 import os
-from fastapi import HTTPException, Request
+from typing import Optional
+
+from starlette.responses import JSONResponse
+from starlette.status import WS_1008_POLICY_VIOLATION
+from starlette.types import ASGIApp, Receive, Scope, Send
+from starlette.websockets import WebSocketClose
 
 from app.config import settings
 
 # Public endpoints (no auth required)
 PUBLIC_PATHS = {"/health", "/"}
 
+# Prometheus scrape endpoint (public only if settings.metrics_public)
+METRICS_PATH = "/metrics"
+
 # Docs endpoints (only accessible in development)
 DOCS_PATHS = {"/docs", "/openapi.json", "/redoc"}
 
 
-async def verify_api_key(request: Request, call_next):
+def header_value(scope: Scope, name: bytes) -> Optional[bytes]:
+    """First value of a (lower-case) header in an ASGI scope, or None."""
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return None
+
+
+def check_api_key(path: str, api_key: Optional[bytes]) -> Optional[tuple[int, str]]:
     """
-    Middleware to verify API key for service-to-service authentication.
+    Decide whether a request to `path` with `api_key` may proceed.
 
     Security fixes:
     - Fail closed if API key not configured (no bypass)
     - Timing-safe comparison to prevent timing attacks
     - Docs only accessible in development
+
+    Returns:
+        None if allowed, otherwise (status code, error detail)
     """
     # Allow health check unconditionally
-    if request.url.path in PUBLIC_PATHS:
-        return await call_next(request)
+    if path in PUBLIC_PATHS:
+        return None
+
+    # Metrics are open only if configured (scrapers may not send headers)
+    if path == METRICS_PATH and settings.metrics_public:
+        return None
 
     # Docs only in development
-    if request.url.path in DOCS_PATHS:
+    if path in DOCS_PATHS:
         if os.getenv("ENVIRONMENT", "development") == "development":
-            return await call_next(request)
-        else:
-            raise HTTPException(status_code=404, detail="Not found")
+            return None
+        return 404, "Not found"
 
     # SECURITY FIX: Fail closed if API key not configured
     if not settings.api_key:
-        raise HTTPException(
-            status_code=500,
-            detail="Server misconfiguration: API key not set",
-        )
-
-    # Check API key header
-    api_key = request.headers.get("X-API-Key")
+        return 500, "Server misconfiguration: API key not set"
 
     if not api_key:
-        raise HTTPException(
-            status_code=401,
-            detail="Missing API key",
-        )
+        return 401, "Missing API key"
 
     # SECURITY FIX: Timing-safe comparison
-    if not hmac.compare_digest(api_key, settings.api_key):
-        raise HTTPException(
-            status_code=401,
-            detail="Invalid API key",
-        )
+    if not hmac.compare_digest(api_key, settings.api_key.encode("latin-1")):
+        return 401, "Invalid API key"
+
+    return None
+
+
+class APIKeyMiddleware:
+    """
+    Raw ASGI middleware verifying the X-API-Key header.
+
+    WebSocket connections are checked once, at the handshake.
+
+    Works on the ASGI scope directly instead of wrapping every request in a
+    Request object and an extra task, which matters at high request rates.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        error = check_api_key(scope["path"], header_value(scope, b"x-api-key"))
+        if error is not None:
+            status_code, detail = error
+            if scope["type"] == "websocket":
+                # Closing before accepting rejects the handshake (HTTP 403)
+                await WebSocketClose(code=WS_1008_POLICY_VIOLATION, reason=detail)(
+                    scope, receive, send
+                )
+                return
+            response = JSONResponse(status_code=status_code, content={"detail": detail})
+            await response(scope, receive, send)
+            return
 
-    return await call_next(request)
+        await self.app(scope, receive, send)
@@ -1,92 +1,132 @@
 """Idempotency middleware using Redis cache."""
 
+import asyncio
 import logging
-from typing import Callable
+from typing import Optional
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from app.services.cache_service import cache_service
+from app.metrics import (
+    IDEMPOTENCY_REQUESTS,
+    STAGE_IDEMPOTENCY_LOOKUP,
+    STAGE_IDEMPOTENCY_STORE,
+    stage_timer,
+)
+from app.middleware.auth import header_value
+from app.services.cache_service import CachedResponse, async_cache_service
 
 logger = logging.getLogger(__name__)
 
 
-class IdempotencyMiddleware(BaseHTTPMiddleware):
+class IdempotencyMiddleware:
     """
-    Middleware to handle request idempotency using Redis cache.
-    
+    Raw ASGI middleware to handle request idempotency using Redis cache.
+
     Clients can send an 'Idempotency-Key' header with a unique identifier.
     If the same key is seen within the TTL window (1 hour), the cached
     response is returned without re-processing the request.
-    
+
     This prevents duplicate processing of ML predictions which can be expensive.
+    Concurrent requests with the same key are coalesced: only the first runs
+    the handler and the others replay its response. Responses stream to the
+    client as they are produced; successful ones are captured on the way out.
     """
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        """
-        Process request with idempotency check.
-        
-        Args:
-            request: FastAPI request
-            call_next: Next middleware/handler
-            
-        Returns:
-            Response (either cached or freshly generated)
-        """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         # Only apply to POST /predict endpoint
-        if request.method != "POST" or not request.url.path.endswith("/predict"):
-            return await call_next(request)
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not scope["path"].endswith("/predict")
+        ):
+            await self.app(scope, receive, send)
+            return
 
         # Get idempotency key from header
-        idempotency_key = request.headers.get("Idempotency-Key")
-        
-        if not idempotency_key:
+        raw_key = header_value(scope, b"idempotency-key")
+        if not raw_key:
             # No idempotency key provided, process normally
-            logger.debug("No idempotency key provided, processing request")
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
+        idempotency_key = raw_key.decode("latin-1")
 
-        # Check cache for existing response
-        if cache_service.is_available:
-            cached_response = cache_service.get(idempotency_key)
-            
+        # Another request with this key is being processed: wait for it
+        in_flight = async_cache_service.join_in_flight(idempotency_key)
+        if in_flight is not None:
+            IDEMPOTENCY_REQUESTS.labels("coalesced").inc()
+            shared = await asyncio.shield(in_flight)
+            if shared:
+                logger.info(f"Returning coalesced response for key: {idempotency_key}")
+                await self._replay(shared, send)
+                return
+            # The first request produced nothing cacheable, so process this one
+            await self.app(scope, receive, send)
+            return
+
+        cache_data: Optional[CachedResponse] = None
+        try:
+            # Check cache for existing response
+            with stage_timer(STAGE_IDEMPOTENCY_LOOKUP):
+                cached_response = await async_cache_service.get(idempotency_key)
+            IDEMPOTENCY_REQUESTS.labels("hit" if cached_response else "miss").inc()
             if cached_response:
                 logger.info(f"Returning cached response for key: {idempotency_key}")
-                return Response(
-                    content=cached_response["body"],
-                    status_code=cached_response["status_code"],
-                    headers=cached_response["headers"],
-                    media_type="application/json",
-                )
-
-        # Process request normally
-        response = await call_next(request)
-
-        # Cache successful responses (2xx status codes)
-        if idempotency_key and cache_service.is_available and 200 <= response.status_code < 300:
-            try:
-                # Read response body
-                body_bytes = b""
-                async for chunk in response.body_iterator:
-                    body_bytes += chunk
-
-                # Cache the response
-                cache_data = {
-                    "body": body_bytes.decode("utf-8"),
-                    "status_code": response.status_code,
-                    "headers": dict(response.headers),
-                }
-                cache_service.set(idempotency_key, cache_data)
-
-                # Create new response with consumed body
-                return Response(
-                    content=body_bytes,
-                    status_code=response.status_code,
-                    headers=dict(response.headers),
-                    media_type=response.media_type,
-                )
-            except Exception as e:
-                logger.error(f"Error caching response: {e}")
-                # Return original response if caching fails
-                return response
-
-        return response
+                cache_data = cached_response
+                await self._replay(cached_response, send)
+                return
+
+            cache_data = await self._run_and_capture(scope, receive, send)
+            if cache_data is not None:
+                with stage_timer(STAGE_IDEMPOTENCY_STORE):
+                    await async_cache_service.set(idempotency_key, cache_data)
+        finally:
+            async_cache_service.finish_in_flight(idempotency_key, cache_data)
+
+    async def _run_and_capture(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> Optional[CachedResponse]:
+        """Run the app, passing messages through and keeping a 2xx body."""
+        status_code = 0
+        content_type = b"application/json"
+        chunks: Optional[list[bytes]] = None
+
+        async def send_and_capture(message: Message) -> None:
+            nonlocal status_code, content_type, chunks
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Only successful responses (2xx status codes) are cached
+                if 200 <= status_code < 300:
+                    chunks = []
+                    content_type = next(
+                        (v for k, v in message.get("headers", []) if k == b"content-type"),
+                        content_type,
+                    )
+            elif message["type"] == "http.response.body" and chunks is not None:
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, receive, send_and_capture)
+
+        if chunks is None:
+            return None
+        return CachedResponse(
+            body=b"".join(chunks), status_code=status_code, content_type=content_type
+        )
+
+    @staticmethod
+    async def _replay(cached_response: CachedResponse, send: Send) -> None:
+        """Send cached body bytes back as they were stored."""
+        await send(
+            {
+                "type": "http.response.start",
+                "status": cached_response.status_code,
+                "headers": [
+                    (b"content-type", cached_response.content_type),
+                    (b"content-length", str(len(cached_response.body)).encode("latin-1")),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": cached_response.body})
@@ -0,0 +1,49 @@
+"""Request timing middleware feeding the Prometheus metrics."""
+
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.metrics import REQUEST_DURATION, STAGE_SERIALIZE, observe_stage
+
+
+class MetricsMiddleware:
+    """
+    Raw ASGI middleware timing requests from routing to the last body chunk.
+
+    It stamps `request.state.received_at` on the way in, so a handler can
+    record how long parsing took. A handler that sets
+    `request.state.handler_done` when it returns gets the time until the
+    response starts recorded as serialization.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        state = scope.setdefault("state", {})
+        state["received_at"] = start
+        status_code = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                handler_done = state.get("handler_done")
+                if handler_done is not None:
+                    observe_stage(STAGE_SERIALIZE, time.perf_counter() - handler_done)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            # Route templates (not raw paths) keep the label set bounded
+            route = scope.get("route")
+            REQUEST_DURATION.labels(
+                route.path if route is not None else "unmatched", str(status_code)
+            ).observe(time.perf_counter() - start)
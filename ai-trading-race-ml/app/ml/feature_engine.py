@@ -0,0 +1,174 @@
+"""Vectorized NumPy feature engine.
+
+Computes the same FEATURE_COLUMNS as `engineer_features`, but straight from
+contiguous float64 close/volume arrays, without building pandas objects or
+`ta` indicator instances. Only the requested trailing rows are computed for
+windowed indicators; recursive indicators (EMAs) run over the full history
+through a single linear filter call.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+
+# Feature columns used by the model
+FEATURE_COLUMNS = [
+    "sma_7",
+    "sma_21",
+    "rsi_14",
+    "macd",
+    "macd_signal",
+    "macd_diff",
+    "bb_width",
+    "returns_1",
+    "returns_7",
+    "volatility_7",
+    "volume_ratio",
+]
+
+# Indicator windows (mirroring engineer_features / ta defaults)
+SMA_SHORT_WINDOW = 7
+SMA_LONG_WINDOW = 21
+RSI_WINDOW = 14
+MACD_FAST = 12
+MACD_SLOW = 26
+MACD_SIGNAL = 9
+BB_WINDOW = 20
+BB_DEV = 2
+RETURNS_LONG_PERIOD = 7
+VOLATILITY_WINDOW = 7
+VOLUME_WINDOW = 7
+
+# First row where the MACD line / signal line are defined (ta min_periods)
+MACD_FIRST_ROW = MACD_SLOW - 1
+MACD_SIGNAL_FIRST_ROW = MACD_FIRST_ROW + MACD_SIGNAL - 1
+
+N_FEATURES = len(FEATURE_COLUMNS)
+
+
+def ema(values: np.ndarray, alpha: float) -> np.ndarray:
+    """Exponential moving average with pandas `ewm(adjust=False)` semantics."""
+    decay = 1.0 - alpha
+    smoothed, _ = lfilter([alpha], [1.0, -decay], values, zi=[decay * values[0]])
+    return smoothed
+
+
+def _windows(values: np.ndarray, window: int, start: int) -> np.ndarray:
+    """Sliding windows ending at rows start..n-1 (start must be >= window - 1)."""
+    return sliding_window_view(values[start - window + 1:], window)
+
+
+def _warmup_rows(n: int) -> int:
+    """Index of the first row engineer_features keeps for a series of length n."""
+    return max(BB_WINDOW, min(SMA_LONG_WINDOW, n)) - 1
+
+
+def compute_features(close: np.ndarray, volume: np.ndarray, start: int = 0) -> np.ndarray:
+    """
+    Compute feature rows start..n-1 for a close/volume series.
+
+    Rows that engineer_features would drop (indicator warm-up, NaN inputs)
+    are filled with NaN so row indices line up with the input candles.
+
+    Args:
+        close: Close prices, oldest first
+        volume: Volumes aligned with close
+        start: First row to compute (negative values count from the end)
+
+    Returns:
+        float64 array of shape (n - start, len(FEATURE_COLUMNS))
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    volume = np.ascontiguousarray(volume, dtype=np.float64)
+    n = len(close)
+    if len(volume) != n:
+        raise ValueError("close and volume must have the same length")
+
+    start = max(start + n if start < 0 else start, 0)
+    out = np.full((max(n - start, 0), N_FEATURES), np.nan)
+    if n < BB_WINDOW or start >= n:
+        return out
+
+    lo = max(start, _warmup_rows(n))
+    rows = out[lo - start:]
+    current = close[lo:]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Moving averages
+        sma_7 = _windows(close, SMA_SHORT_WINDOW, lo).mean(axis=1)
+        sma_21 = _windows(close, min(SMA_LONG_WINDOW, n), lo).mean(axis=1)
+
+        # RSI (Wilder smoothing over the full history)
+        diff = np.diff(close, prepend=close[0])
+        alpha = 1.0 / min(RSI_WINDOW, max(2, n - 1))
+        avg_up = ema(np.where(diff > 0, diff, 0.0), alpha)[lo:]
+        avg_down = ema(np.where(diff < 0, -diff, 0.0), alpha)[lo:]
+        rsi = np.where(avg_down == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_up / avg_down))
+
+        # MACD (undefined values are filled with 0, as in engineer_features)
+        macd_line = ema(close, 2.0 / (MACD_FAST + 1)) - ema(close, 2.0 / (MACD_SLOW + 1))
+        macd = np.zeros(n)
+        signal = np.zeros(n)
+        macd_diff = np.zeros(n)
+        if n > MACD_FIRST_ROW:
+            macd[MACD_FIRST_ROW:] = macd_line[MACD_FIRST_ROW:]
+        if n > MACD_SIGNAL_FIRST_ROW:
+            signal_line = ema(macd_line[MACD_FIRST_ROW:], 2.0 / (MACD_SIGNAL + 1))
+            signal[MACD_SIGNAL_FIRST_ROW:] = signal_line[MACD_SIGNAL - 1:]
+            macd_diff[MACD_SIGNAL_FIRST_ROW:] = (
+                macd[MACD_SIGNAL_FIRST_ROW:] - signal[MACD_SIGNAL_FIRST_ROW:]
+            )
+
+        # Bollinger band width: (upper - lower) / close
+        bb_std = _windows(close, BB_WINDOW, lo).std(axis=1)
+        bb_width = 2 * BB_DEV * bb_std / current
+
+        # Price momentum
+        returns_1 = current / close[lo - 1:n - 1] - 1.0
+        returns_7 = current / close[lo - RETURNS_LONG_PERIOD:n - RETURNS_LONG_PERIOD] - 1.0
+
+        # Volatility (sample std of the last 7 one-period returns)
+        all_returns = close[1:] / close[:-1] - 1.0
+        volatility_7 = _windows(all_returns, VOLATILITY_WINDOW, lo - 1).std(axis=1, ddof=1)
+
+        # Volume momentum
+        volume_ratio = volume[lo:] / _windows(volume, VOLUME_WINDOW, lo).mean(axis=1)
+
+    columns = {
+        "sma_7": sma_7,
+        "sma_21": sma_21,
+        "rsi_14": rsi,
+        "macd": macd[lo:],
+        "macd_signal": signal[lo:],
+        "macd_diff": macd_diff[lo:],
+        "bb_width": bb_width,
+        "returns_1": returns_1,
+        "returns_7": returns_7,
+        "volatility_7": volatility_7,
+        "volume_ratio": volume_ratio,
+    }
+    for col, name in enumerate(FEATURE_COLUMNS):
+        rows[:, col] = columns[name]
+
+    # Match engineer_features: bb_width NaNs become 0, other NaN rows are dropped
+    bb_col = FEATURE_COLUMNS.index("bb_width")
+    rows[np.isnan(rows[:, bb_col]), bb_col] = 0.0
+    rows[np.isnan(rows).any(axis=1)] = np.nan
+    return out
+
+
+def latest_features(close: np.ndarray, volume: np.ndarray, rows: int = 1) -> np.ndarray:
+    """
+    Compute the feature rows for the last `rows` candles.
+
+    Args:
+        close: Close prices, oldest first
+        volume: Volumes aligned with close
+        rows: Number of trailing candles to compute features for
+
+    Returns:
+        Array of shape (k, len(FEATURE_COLUMNS)) with k <= rows, keeping only
+        the rows engineer_features would keep
+    """
+    features = compute_features(close, volume, start=-rows)
+    return features[~np.isnan(features).any(axis=1)]
@@ -1,29 +1,21 @@
 """Feature engineering for trading ML model.
 
 Creates technical indicators from OHLCV candle data.
+
+`engineer_features` is the pandas/`ta` reference implementation used for
+training. The inference helpers run on the NumPy engine in
+`app.ml.feature_engine`, which produces the same values for the latest rows.
 """
 
+from typing import NamedTuple
+
 import numpy as np
 import pandas as pd
 from ta.momentum import RSIIndicator
 from ta.trend import MACD, SMAIndicator
 from ta.volatility import BollingerBands
 
-
-# Feature columns used by the model
-FEATURE_COLUMNS = [
-    "sma_7",
-    "sma_21",
-    "rsi_14",
-    "macd",
-    "macd_signal",
-    "macd_diff",
-    "bb_width",
-    "returns_1",
-    "returns_7",
-    "volatility_7",
-    "volume_ratio",
-]
+from app.ml.feature_engine import FEATURE_COLUMNS, latest_features
 
 
 def engineer_features(candles_df: pd.DataFrame) -> pd.DataFrame:
@@ -80,6 +72,55 @@ def engineer_features(candles_df: pd.DataFrame) -> pd.DataFrame:
     return df.dropna()
 
 
+class InferenceFeatures(NamedTuple):
+    """Model input and explanation values for the latest candle."""
+
+    features: np.ndarray  # Shape (1, n_features), model input
+    values: dict[str, float]  # Feature name -> value, for ExplanationSignals
+
+
+def extract_inference_features(candles_df: pd.DataFrame) -> InferenceFeatures:
+    """
+    Compute the latest feature row once and return it in both forms.
+
+    Args:
+        candles_df: DataFrame with OHLCV data
+
+    Returns:
+        InferenceFeatures with the model input array and the feature dict
+
+    Raises:
+        ValueError: If there is not enough data to compute features
+    """
+    return inference_features_from_row(
+        latest_features(
+            candles_df["close"].to_numpy(dtype=np.float64),
+            candles_df["volume"].to_numpy(dtype=np.float64),
+        )
+    )
+
+
+def inference_features_from_row(features: np.ndarray) -> InferenceFeatures:
+    """
+    Wrap a computed (1, n_features) feature row as InferenceFeatures.
+
+    Args:
+        features: Latest feature row, or an empty array if none is available
+
+    Returns:
+        InferenceFeatures with the model input array and the feature dict
+
+    Raises:
+        ValueError: If the row is empty (not enough data)
+    """
+    if len(features) == 0:
+        raise ValueError("Not enough data to compute features")
+    return InferenceFeatures(
+        features=features,
+        values=dict(zip(FEATURE_COLUMNS, features[0].tolist())),
+    )
+
+
 def prepare_inference_features(candles_df: pd.DataFrame) -> np.ndarray:
     """
     Prepare features for model inference (latest row only).
@@ -90,10 +131,7 @@ def prepare_inference_features(candles_df: pd.DataFrame) -> np.ndarray:
     Returns:
         numpy array of shape (1, n_features) for the latest candle
     """
-    df = engineer_features(candles_df)
-    if df.empty:
-        raise ValueError("Not enough data to compute features")
-    return df[FEATURE_COLUMNS].iloc[-1:].values
+    return extract_inference_features(candles_df).features
 
 
 def get_feature_values(candles_df: pd.DataFrame) -> dict[str, float]:
@@ -108,8 +146,7 @@ def get_feature_values(candles_df: pd.DataFrame) -> dict[str, float]:
     Returns:
         Dictionary mapping feature name to value
     """
-    df = engineer_features(candles_df)
-    if df.empty:
+    try:
+        return extract_inference_features(candles_df).values
+    except ValueError:
         return {}
-    latest = df[FEATURE_COLUMNS].iloc[-1]
-    return latest.to_dict()
@@ -3,16 +3,21 @@
 Loads a trained model and generates predictions with explanations.
 """
 
+import logging
 from enum import IntEnum
 from pathlib import Path
-from typing import NamedTuple
+from typing import Any, NamedTuple, Optional
 
 import joblib
 import numpy as np
 
+from app.metrics import STAGE_PREDICT, STAGE_SIGNALS, stage_timer
+from app.ml.compiled_forest import CompiledForest
 from app.ml.features import FEATURE_COLUMNS
 from app.models.enums import SignalContribution
 
+logger = logging.getLogger(__name__)
+
 
 class PredictedAction(IntEnum):
     """Model output classes."""
@@ -31,7 +36,7 @@ class PredictionResult(NamedTuple):
 
 
 # Trading rules for signal generation
-TRADING_RULES = {
+TRADING_RULES: dict[str, list[dict[str, Any]]] = {
     "rsi_14": [
         {"threshold": 40, "operator": "<", "contribution": SignalContribution.BULLISH, "rule": "<40 = oversold zone"},
         {"threshold": 60, "operator": ">", "contribution": SignalContribution.BEARISH, "rule": ">60 = overbought zone"},
@@ -54,26 +59,122 @@ TRADING_RULES = {
 }
 
 
+# Supported inference backends for a loaded model
+BACKEND_SKLEARN = "sklearn"
+BACKEND_COMPILED = "compiled"
+BACKEND_MMAP = "mmap"
+
+BACKENDS = (BACKEND_SKLEARN, BACKEND_COMPILED, BACKEND_MMAP)
+
+
+def default_arrays_path(model_path: Path) -> Path:
+    """Directory holding the memory-mappable arrays for a model file."""
+    return model_path.with_name(f"{model_path.stem}_arrays")
+
+
+def model_fingerprint(model_path: Path) -> dict:
+    """Identify a model file version cheaply (size + modification time)."""
+    stat = model_path.stat()
+    return {"model_file": model_path.name, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
 class TradingPredictor:
     """Loads a trained model and generates predictions with explanations."""
 
-    def __init__(self, model_path: Path):
+    def __init__(
+        self,
+        model_path: Path,
+        backend: str = BACKEND_SKLEARN,
+        arrays_path: Optional[Path] = None,
+    ):
         """Initialize the predictor.
 
         Args:
             model_path: Path to the saved model file (.pkl)
+            backend: "sklearn" to call predict_proba on the model,
+                "compiled" to flatten the forest into an array-backed engine, or
+                "mmap" to serve the flattened forest from memory-mapped .npy
+                files shared by every worker process
+            arrays_path: Directory for the "mmap" backend's arrays
+                (default: `<model stem>_arrays` next to the model file)
         """
-        self.model = None
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown predictor backend: {backend}")
+
+        self.model: Optional[Any] = None
         self.model_path = model_path
+        self.backend = backend
+        self.arrays_path = arrays_path or default_arrays_path(model_path)
+        self._compiled: Optional[CompiledForest] = None
         self._load_model()
 
     def _load_model(self) -> None:
         """Load the model from disk, or use rule-based fallback."""
-        if self.model_path.exists():
-            self.model = joblib.load(self.model_path)
-        else:
+        if not self.model_path.exists():
             # Fallback to rule-based for development
             self.model = None
+            return
+
+        if self.backend == BACKEND_MMAP and self._load_arrays():
+            return
+
+        self.model = joblib.load(self.model_path)
+        if self.backend == BACKEND_COMPILED:
+            self._compile_model()
+        elif self.backend == BACKEND_MMAP:
+            self._export_arrays()
+
+    def _load_arrays(self) -> bool:
+        """Map exported arrays if they match the current model file."""
+        metadata = CompiledForest.read_metadata(self.arrays_path)
+        if metadata is None or metadata.get("source") != model_fingerprint(self.model_path):
+            return False
+        try:
+            self._compiled = CompiledForest.load(self.arrays_path, mmap=True)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Can't map model arrays in {self.arrays_path}: {e}")
+            return False
+        return True
+
+    def _export_arrays(self) -> None:
+        """Compile the loaded model, write its arrays and serve them mapped."""
+        self._compile_model()
+        if self._compiled is None:
+            return
+        try:
+            self._compiled.save(self.arrays_path, source=model_fingerprint(self.model_path))
+            self._compiled = CompiledForest.load(self.arrays_path, mmap=True)
+        except OSError as e:
+            # Another worker may have exported the same model first
+            if self._load_arrays():
+                self.model = None
+                return
+            # Read-only filesystem etc.: keep the in-memory compiled forest
+            logger.warning(f"Can't write model arrays to {self.arrays_path}: {e}")
+            return
+        # The pickled forest isn't needed once the mapped arrays serve predictions
+        self.model = None
+        logger.info(f"Exported model arrays to {self.arrays_path}")
+
+    def warm_up(self) -> None:
+        """
+        Touch the model and run one prediction so the first request is fast.
+
+        Call before forking workers (e.g. gunicorn --preload): mapped pages
+        are then already in the page cache and shared by every worker.
+        """
+        if self._compiled is not None:
+            self._compiled.touch()
+        if self.is_loaded:
+            self.predict_proba(np.zeros((1, len(FEATURE_COLUMNS))))
+
+    def _compile_model(self) -> None:
+        """Compile the loaded forest, keeping sklearn if it can't be compiled."""
+        try:
+            self._compiled = CompiledForest.from_sklearn(self.model)
+        except TypeError as e:
+            logger.warning(f"Model can't be compiled, using sklearn backend: {e}")
+            self._compiled = None
 
     def predict(self, features: np.ndarray, feature_values: dict[str, float]) -> PredictionResult:
         """
@@ -86,19 +187,60 @@ class TradingPredictor:
         Returns:
             PredictionResult with action, confidence, and explanation signals
         """
-        # Generate explanation signals first (used by both paths)
-        signals = self._generate_signals(feature_values)
+        return self.predict_batch(features, [feature_values])[0]
 
-        if self.model is None:
-            # Rule-based fallback
-            return self._rule_based_predict(feature_values, signals)
+    def predict_batch(
+        self, features: np.ndarray, feature_values: list[dict[str, float]]
+    ) -> list[PredictionResult]:
+        """
+        Generate predictions for many feature rows with a single model call.
+
+        Args:
+            features: Feature matrix of shape (n_rows, n_features)
+            feature_values: One feature name -> value dictionary per row
+
+        Returns:
+            One PredictionResult per row, in input order
+        """
+        if len(feature_values) != len(features):
+            raise ValueError("features and feature_values must have the same length")
 
-        # ML model prediction
-        probas = self.model.predict_proba(features)[0]
-        action = PredictedAction(int(np.argmax(probas)))
-        confidence = float(np.max(probas))
+        # Generate explanation signals first (used by both paths)
+        with stage_timer(STAGE_SIGNALS):
+            signals = [self._generate_signals(values) for values in feature_values]
 
-        return PredictionResult(action=action, confidence=confidence, signals=signals)
+        if not self.is_loaded:
+            # Rule-based fallback
+            return [
+                self._rule_based_predict(values, row_signals)
+                for values, row_signals in zip(feature_values, signals)
+            ]
+
+        if len(features) == 0:
+            return []
+
+        # ML model prediction (one vectorized call for the whole batch)
+        with stage_timer(STAGE_PREDICT):
+            probas = self.predict_proba(features)
+        actions = np.argmax(probas, axis=1)
+        confidences = np.max(probas, axis=1)
+
+        return [
+            PredictionResult(
+                action=PredictedAction(int(action)),
+                confidence=float(confidence),
+                signals=row_signals,
+            )
+            for action, confidence, row_signals in zip(actions, confidences, signals)
+        ]
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """Class probabilities from the loaded model (compiled engine if available)."""
+        if self._compiled is not None:
+            return self._compiled.predict_proba(features)
+        if self.model is None:
+            raise RuntimeError("No model loaded")
+        return self.model.predict_proba(features)
 
     def _rule_based_predict(
         self, feature_values: dict[str, float], signals: list[dict]
@@ -161,4 +303,18 @@ class TradingPredictor:
     @property
     def is_loaded(self) -> bool:
         """Check if a trained model is loaded."""
-        return self.model is not None
+        return self.model is not None or self._compiled is not None
+
+    @property
+    def n_features(self) -> Optional[int]:
+        """Number of input features the loaded model expects (None if rule-based)."""
+        if self._compiled is not None:
+            return self._compiled.n_features
+        if self.model is not None:
+            return getattr(self.model, "n_features_in_", None)
+        return None
+
+    @property
+    def is_compiled(self) -> bool:
+        """Check if predictions run on the compiled forest engine."""
+        return self._compiled is not None
@@ -0,0 +1,316 @@
+"""Streaming indicator state for incremental feature updates.
+
+Callers send overlapping candle windows that move forward by one candle
+per tick. Instead of recomputing every indicator over the whole window,
+`StreamingFeatureStore` keeps rolling indicator state per (symbol, interval)
+and folds in only the candles it has not seen yet, in O(1) per candle.
+
+Windowed indicators (SMA, Bollinger, returns, volatility, volume ratio) are
+identical to a full recompute. Recursive indicators (RSI, MACD) keep
+smoothing over everything the store has seen since it was last seeded, so
+they match `compute_features` over that whole history rather than over the
+latest window only.
+"""
+
+import math
+import threading
+from collections import OrderedDict, deque
+from typing import Optional
+
+import numpy as np
+
+from app.ml.feature_engine import (
+    BB_DEV,
+    BB_WINDOW,
+    FEATURE_COLUMNS,
+    MACD_FAST,
+    MACD_FIRST_ROW,
+    MACD_SIGNAL,
+    MACD_SIGNAL_FIRST_ROW,
+    MACD_SLOW,
+    RETURNS_LONG_PERIOD,
+    RSI_WINDOW,
+    SMA_LONG_WINDOW,
+    SMA_SHORT_WINDOW,
+    VOLATILITY_WINDOW,
+    VOLUME_WINDOW,
+    ema,
+    latest_features,
+)
+
+# Candles needed before the state can be seeded (all windows at full size)
+MIN_SEED_CANDLES = SMA_LONG_WINDOW
+
+# Running sums are rebuilt from the buffers this often to bound float drift
+RESUM_INTERVAL = 512
+
+RSI_ALPHA = 1.0 / RSI_WINDOW
+MACD_FAST_ALPHA = 2.0 / (MACD_FAST + 1)
+MACD_SLOW_ALPHA = 2.0 / (MACD_SLOW + 1)
+MACD_SIGNAL_ALPHA = 2.0 / (MACD_SIGNAL + 1)
+
+
+class IndicatorState:
+    """Rolling indicator state for one candle series."""
+
+    def __init__(self, timestamps: np.ndarray, close: np.ndarray, volume: np.ndarray):
+        """Seed the state from a full history (at least MIN_SEED_CANDLES long).
+
+        Args:
+            timestamps: Candle timestamps as int64, oldest first
+            close: Close prices aligned with timestamps
+            volume: Volumes aligned with timestamps
+        """
+        n = len(close)
+        if n < MIN_SEED_CANDLES:
+            raise ValueError(f"Need at least {MIN_SEED_CANDLES} candles to seed state")
+
+        self.count = n
+        self.last_timestamp = int(timestamps[-1])
+        self.last_volume = float(volume[-1])
+
+        self._closes: deque[float] = deque(
+            close[-SMA_LONG_WINDOW:].tolist(), maxlen=SMA_LONG_WINDOW
+        )
+        self._volumes: deque[float] = deque(
+            volume[-VOLUME_WINDOW:].tolist(), maxlen=VOLUME_WINDOW
+        )
+        recent = close[-(VOLATILITY_WINDOW + 1):]
+        self._returns: deque[float] = deque(
+            (recent[1:] / recent[:-1] - 1.0).tolist(), maxlen=VOLATILITY_WINDOW
+        )
+        self._resum()
+
+        # Recursive indicators over the full seed history
+        diff = np.diff(close, prepend=close[0])
+        self._avg_up = float(ema(np.where(diff > 0, diff, 0.0), RSI_ALPHA)[-1])
+        self._avg_down = float(ema(np.where(diff < 0, -diff, 0.0), RSI_ALPHA)[-1])
+        fast = ema(close, MACD_FAST_ALPHA)
+        slow = ema(close, MACD_SLOW_ALPHA)
+        self._ema_fast = float(fast[-1])
+        self._ema_slow = float(slow[-1])
+        self._signal = (
+            float(ema((fast - slow)[MACD_FIRST_ROW:], MACD_SIGNAL_ALPHA)[-1])
+            if n > MACD_FIRST_ROW
+            else 0.0
+        )
+
+    @property
+    def last_close(self) -> float:
+        """Close of the most recent candle folded into the state."""
+        return self._closes[-1]
+
+    def _resum(self) -> None:
+        """Rebuild running sums from the buffers (re-centred on the last close)."""
+        self._offset = self._closes[-1]
+        shifted = [c - self._offset for c in self._closes]
+        self._sum_short = math.fsum(shifted[-SMA_SHORT_WINDOW:])
+        self._sum_long = math.fsum(shifted)
+        self._sum_bb = math.fsum(shifted[-BB_WINDOW:])
+        self._sumsq_bb = math.fsum(x * x for x in shifted[-BB_WINDOW:])
+        self._sum_volume = math.fsum(self._volumes)
+        self._sum_returns = math.fsum(self._returns)
+        self._sumsq_returns = math.fsum(r * r for r in self._returns)
+        self._updates_since_resum = 0
+
+    def update(self, timestamp: int, close: float, volume: float) -> None:
+        """Fold one new candle into the state in O(1)."""
+        closes = self._closes
+        previous = closes[-1]
+        offset = self._offset
+        new = close - offset
+
+        # Windowed sums: add the new candle, drop the one leaving each window
+        leaving_long = closes[0] - offset
+        leaving_short = closes[-SMA_SHORT_WINDOW] - offset
+        leaving_bb = closes[-BB_WINDOW] - offset
+        self._sum_long += new - leaving_long
+        self._sum_short += new - leaving_short
+        self._sum_bb += new - leaving_bb
+        self._sumsq_bb += new * new - leaving_bb * leaving_bb
+        closes.append(close)
+
+        ret = close / previous - 1.0
+        leaving_ret = self._returns[0]
+        self._sum_returns += ret - leaving_ret
+        self._sumsq_returns += ret * ret - leaving_ret * leaving_ret
+        self._returns.append(ret)
+
+        self._sum_volume += volume - self._volumes[0]
+        self._volumes.append(volume)
+
+        # Wilder RSI averages
+        diff = close - previous
+        self._avg_up += RSI_ALPHA * ((diff if diff > 0 else 0.0) - self._avg_up)
+        self._avg_down += RSI_ALPHA * ((-diff if diff < 0 else 0.0) - self._avg_down)
+
+        # MACD EMAs (the signal line starts at the first defined MACD value)
+        self._ema_fast += MACD_FAST_ALPHA * (close - self._ema_fast)
+        self._ema_slow += MACD_SLOW_ALPHA * (close - self._ema_slow)
+        macd = self._ema_fast - self._ema_slow
+        if self.count == MACD_FIRST_ROW:
+            self._signal = macd
+        elif self.count > MACD_FIRST_ROW:
+            self._signal += MACD_SIGNAL_ALPHA * (macd - self._signal)
+
+        self.count += 1
+        self.last_timestamp = int(timestamp)
+        self.last_volume = float(volume)
+
+        self._updates_since_resum += 1
+        if self._updates_since_resum >= RESUM_INTERVAL:
+            self._resum()
+
+    def features(self) -> np.ndarray:
+        """Feature row for the latest candle, shape (1, n_features) or (0, n_features)."""
+        close = self._closes[-1]
+        row_index = self.count - 1
+
+        mean_bb = self._sum_bb / BB_WINDOW
+        bb_std = math.sqrt(max(self._sumsq_bb / BB_WINDOW - mean_bb * mean_bb, 0.0))
+        returns_var = (
+            self._sumsq_returns - self._sum_returns * self._sum_returns / VOLATILITY_WINDOW
+        ) / (VOLATILITY_WINDOW - 1)
+
+        macd = self._ema_fast - self._ema_slow if row_index >= MACD_FIRST_ROW else 0.0
+        signal = self._signal if row_index >= MACD_SIGNAL_FIRST_ROW else 0.0
+        macd_diff = macd - signal if row_index >= MACD_SIGNAL_FIRST_ROW else 0.0
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = {
+                "sma_7": self._sum_short / SMA_SHORT_WINDOW + self._offset,
+                "sma_21": self._sum_long / SMA_LONG_WINDOW + self._offset,
+                "rsi_14": (
+                    100.0
+                    if self._avg_down == 0
+                    else 100.0 - 100.0 / (1.0 + self._avg_up / self._avg_down)
+                ),
+                "macd": macd,
+                "macd_signal": signal,
+                "macd_diff": macd_diff,
+                "bb_width": np.float64(2 * BB_DEV * bb_std) / close,
+                "returns_1": self._returns[-1],
+                "returns_7": np.float64(close) / self._closes[-1 - RETURNS_LONG_PERIOD] - 1.0,
+                "volatility_7": math.sqrt(max(returns_var, 0.0)),
+                "volume_ratio": np.float64(self._volumes[-1]) / (self._sum_volume / VOLUME_WINDOW),
+            }
+            row = np.array([[values[name] for name in FEATURE_COLUMNS]], dtype=np.float64)
+
+        if np.isnan(row).any():
+            return row[:0]
+        return row
+
+
+class StreamingFeatureStore:
+    """Per-(symbol, interval) indicator states with incremental updates.
+
+    Each call receives the caller's candle window. If the window continues
+    the stored series, only the new candles are folded in; if it has a gap
+    or revises the last stored candle, the state is re-seeded from the
+    window. Windows that end before the stored series are served with a
+    stateless recompute and leave the state untouched.
+    """
+
+    def __init__(self, max_series: int = 256):
+        """Initialize the store.
+
+        Args:
+            max_series: Max number of (symbol, interval) states kept (LRU)
+        """
+        self.max_series = max_series
+        self._states: OrderedDict[tuple[str, int], IndicatorState] = OrderedDict()
+        self._locks: dict[tuple[str, int], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def latest_features(
+        self,
+        symbol: str,
+        timestamps: np.ndarray,
+        close: np.ndarray,
+        volume: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Feature row for the last candle of a window, reusing stored state.
+
+        Args:
+            symbol: Asset symbol
+            timestamps: Candle timestamps as int64, oldest first
+            close: Close prices aligned with timestamps
+            volume: Volumes aligned with timestamps
+
+        Returns:
+            Array of shape (1, n_features), or (0, n_features) if there is
+            not enough data
+        """
+        if len(close) < MIN_SEED_CANDLES:
+            return latest_features(close, volume)
+
+        key = (symbol, int(timestamps[-1] - timestamps[-2]))
+        with self._key_lock(key):
+            state = self._states.get(key)
+            if state is not None and int(timestamps[-1]) < state.last_timestamp:
+                # Stale window: don't move the stored series backwards
+                return latest_features(close, volume)
+
+            start = self._continuation(state, key[1], timestamps, close, volume)
+            if state is None or start is None:
+                state = IndicatorState(timestamps, close, volume)
+            else:
+                for i in range(start, len(close)):
+                    state.update(int(timestamps[i]), float(close[i]), float(volume[i]))
+
+            self._store(key, state)
+            return state.features()
+
+    def clear(self) -> None:
+        """Drop all stored states."""
+        with self._lock:
+            self._states.clear()
+            self._locks.clear()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    @staticmethod
+    def _continuation(
+        state: Optional[IndicatorState],
+        interval: int,
+        timestamps: np.ndarray,
+        close: np.ndarray,
+        volume: np.ndarray,
+    ) -> Optional[int]:
+        """Index of the first new candle if the window extends the state, else None."""
+        if state is None:
+            return None
+
+        idx = int(np.searchsorted(timestamps, state.last_timestamp))
+        if (
+            idx >= len(timestamps)
+            or timestamps[idx] != state.last_timestamp
+            or close[idx] != state.last_close
+            or volume[idx] != state.last_volume
+        ):
+            # Gap before the window, or the last stored candle was revised
+            return None
+
+        new_steps = np.diff(timestamps[idx:])
+        if len(new_steps) and (new_steps != interval).any():
+            # Gap inside the new candles
+            return None
+
+        return idx + 1
+
+    def _key_lock(self, key: tuple[str, int]) -> threading.Lock:
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def _store(self, key: tuple[str, int], state: IndicatorState) -> None:
+        with self._lock:
+            self._states[key] = state
+            self._states.move_to_end(key)
+            while len(self._states) > self.max_series:
+                evicted, _ = self._states.popitem(last=False)
+                self._locks.pop(evicted, None)
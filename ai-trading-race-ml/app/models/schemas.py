@@ -1,11 +1,14 @@
 """Pydantic schemas for API contracts with contract versioning and explainability."""
 
+import base64
+import binascii
 from datetime import datetime
 from decimal import Decimal
 from typing import Optional
 from uuid import uuid4
 
-from pydantic import BaseModel, Field
+import numpy as np
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
 
 from app.config import settings
 from app.models.enums import SignalContribution, TradeSide
@@ -31,6 +34,90 @@ class CandleData(BaseModel):
     volume: Decimal
 
 
+# Columns of CandleColumns.packed, in order
+PACKED_CANDLE_COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+
+
+class CandleColumns(BaseModel):
+    """
+    Candles of one symbol in columnar form.
+
+    Either send the six columns as JSON number arrays, or send `packed`: the
+    base64 of little-endian float64 values laid out column after column
+    (timestamp, open, high, low, close, volume), n values each. Timestamps
+    are epoch milliseconds. Both forms decode straight into NumPy arrays.
+    """
+
+    symbol: str
+    timestamps: list[int] = Field(default_factory=list)
+    open: list[float] = Field(default_factory=list)
+    high: list[float] = Field(default_factory=list)
+    low: list[float] = Field(default_factory=list)
+    close: list[float] = Field(default_factory=list)
+    volume: list[float] = Field(default_factory=list)
+    packed: Optional[str] = None
+
+    _timestamps: np.ndarray = PrivateAttr()
+    _ohlcv: np.ndarray = PrivateAttr()
+
+    @model_validator(mode="after")
+    def _decode(self) -> "CandleColumns":
+        """Validate column lengths and decode into arrays once."""
+        if self.packed is not None:
+            if self.timestamps or any((self.open, self.high, self.low, self.close, self.volume)):
+                raise ValueError("Send either packed or column arrays, not both")
+            try:
+                raw = base64.b64decode(self.packed, validate=True)
+            except binascii.Error as e:
+                raise ValueError(f"packed is not valid base64: {e}") from None
+            width = len(PACKED_CANDLE_COLUMNS) * 8
+            if len(raw) % width:
+                raise ValueError(f"packed length must be a multiple of {width} bytes")
+            columns = np.frombuffer(raw, dtype="<f8").reshape(len(PACKED_CANDLE_COLUMNS), -1)
+            timestamps_ms = columns[0]
+            if not np.isfinite(timestamps_ms).all():
+                raise ValueError("packed timestamps must be finite")
+            self._timestamps = timestamps_ms.astype(np.int64) * 1_000_000
+            self._ohlcv = np.ascontiguousarray(columns[1:].T, dtype=np.float64)
+            return self
+
+        ohlcv = (self.open, self.high, self.low, self.close, self.volume)
+        if any(len(column) != len(self.timestamps) for column in ohlcv):
+            raise ValueError("timestamps and OHLCV columns must have the same length")
+        self._timestamps = np.asarray(self.timestamps, dtype=np.int64) * 1_000_000
+        self._ohlcv = np.array(ohlcv, dtype=np.float64).T.copy()
+        return self
+
+    def to_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        """Timestamps as int64 nanoseconds and an (n, 5) float64 OHLCV array."""
+        return self._timestamps, self._ohlcv
+
+
+class CandleWindow(BaseModel):
+    """
+    Candles of one symbol to read from the service's candle buffer.
+
+    Attributes:
+        symbol: Symbol whose retained candles are used
+        end: Latest candle time to include (default: the newest retained)
+        length: Number of candles (default: all retained)
+    """
+
+    symbol: str
+    end: Optional[datetime] = None
+    length: Optional[int] = Field(default=None, ge=1)
+
+
+class CandlePushRequest(BaseModel):
+    """Candles to add to the service's candle buffer."""
+
+    candles: list[CandleData] = Field(default_factory=list)
+    candle_columns: list[CandleColumns] = Field(default_factory=list, alias="candleColumns")
+
+    class Config:
+        populate_by_name = True
+
+
 class PositionData(BaseModel):
     """Current position in an asset."""
 
@@ -53,6 +140,15 @@ class PortfolioState(BaseModel):
         populate_by_name = True
 
 
+def _check_candle_sources(candles: list[CandleData], candle_columns: list[CandleColumns]) -> None:
+    """Reject symbols sent twice in candleColumns or in both candle forms."""
+    column_symbols = [c.symbol for c in candle_columns]
+    if len(set(column_symbols)) != len(column_symbols):
+        raise ValueError("candleColumns contains a symbol more than once")
+    if candle_columns and {c.symbol for c in candles} & set(column_symbols):
+        raise ValueError("A symbol can't be sent in both candles and candleColumns")
+
+
 class AgentContextRequest(BaseModel):
     """
     Request with contract versioning for safe API evolution.
@@ -63,6 +159,12 @@ class AgentContextRequest(BaseModel):
         agent_id: ID of the agent requesting a decision
         portfolio: Current portfolio state
         candles: Recent market candles for analysis
+        candle_columns: The same data in columnar form, one entry per symbol
+            (cheaper to parse for long windows; may be combined with candles
+            for other symbols)
+        candle_windows: Windows to read from the candle buffer instead of
+            sending them; candles sent for the same symbol are appended to
+            the buffer first
         instructions: Optional agent-specific instructions
     """
 
@@ -70,9 +172,59 @@ class AgentContextRequest(BaseModel):
     request_id: str = Field(default_factory=lambda: str(uuid4()), alias="requestId")
     agent_id: str = Field(alias="agentId")
     portfolio: PortfolioState
-    candles: list[CandleData]
+    candles: list[CandleData] = Field(default_factory=list)
+    candle_columns: list[CandleColumns] = Field(default_factory=list, alias="candleColumns")
+    candle_windows: list[CandleWindow] = Field(default_factory=list, alias="candleWindows")
     instructions: str = ""
 
+    # Candle series resolved against the candle buffer (list[CandleSeries])
+    _resolved_series: Optional[list] = PrivateAttr(default=None)
+
+    @model_validator(mode="after")
+    def _check_column_symbols(self) -> "AgentContextRequest":
+        """Each symbol must come from exactly one source."""
+        _check_candle_sources(self.candles, self.candle_columns)
+        window_symbols = [w.symbol for w in self.candle_windows]
+        if len(set(window_symbols)) != len(window_symbols):
+            raise ValueError("candleWindows contains a symbol more than once")
+        return self
+
+    def resolved_series(self) -> Optional[list]:
+        """Candle series set by set_resolved_series, if any."""
+        return self._resolved_series
+
+    def set_resolved_series(self, series: list) -> None:
+        """Attach the request's candle series (kept when pickled to a worker)."""
+        self._resolved_series = series
+
+    class Config:
+        populate_by_name = True
+
+
+class AgentSessionUpdate(BaseModel):
+    """
+    Incremental update of a streaming agent session (see /predict/stream).
+
+    Attributes:
+        request_id: Identifier of the decision it triggers
+        portfolio: New portfolio state (default: unchanged)
+        candles: New candles, added to the session's candle windows
+        candle_columns: New candles in columnar form
+        instructions: New agent instructions (default: unchanged)
+    """
+
+    request_id: str = Field(default_factory=lambda: str(uuid4()), alias="requestId")
+    portfolio: Optional[PortfolioState] = None
+    candles: list[CandleData] = Field(default_factory=list)
+    candle_columns: list[CandleColumns] = Field(default_factory=list, alias="candleColumns")
+    instructions: Optional[str] = None
+
+    @model_validator(mode="after")
+    def _check_column_symbols(self) -> "AgentSessionUpdate":
+        """Each symbol must come from exactly one source."""
+        _check_candle_sources(self.candles, self.candle_columns)
+        return self
+
     class Config:
         populate_by_name = True
 
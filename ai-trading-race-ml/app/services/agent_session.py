@@ -0,0 +1,122 @@
+"""State of a long-lived agent session streaming decisions (/predict/stream).
+
+An agent subscribes with a full context, as it would send to /predict, and
+then only sends what changed: new candles, a new portfolio, new
+instructions. The session keeps the agent's context and one candle window
+per symbol, so every update becomes a complete request for the
+DecisionService without the client resending history.
+
+A symbol's window length is fixed when the symbol first arrives: the
+number of candles it was sent with, or the length of its candleWindows
+entry. As new candles are appended, the window slides forward, so a
+session decides on the same candles as a client that polls /predict with a
+window of that length.
+
+Symbols named in the subscription's candleWindows are read from the shared
+CandleBuffer, and candles sent for them are appended there, as for
+/predict. Every other symbol lives in a buffer of the session's own, and
+reaches the shared buffer only with `ingest`, so a stream client can't
+change the candles other clients' windows read.
+"""
+
+from typing import Any, Optional
+
+from app.models.schemas import AgentContextRequest, AgentSessionUpdate
+from app.services.candle_buffer import CandleBuffer
+from app.services.candle_series import sent_series
+
+
+class AgentSession:
+    """Context and candle windows of one streaming agent."""
+
+    def __init__(
+        self,
+        context: AgentContextRequest,
+        buffer: Optional[CandleBuffer] = None,
+        ingest: bool = False,
+        capacity: int = 1000,
+    ):
+        """Initialize the session from its subscription.
+
+        Args:
+            context: Full agent context the session starts from
+            buffer: Shared candle buffer the candleWindows are read from
+                (None: windows only see candles sent in the session)
+            ingest: Also add the session's other candles to the shared buffer
+            capacity: Candles the session retains per symbol of its own
+
+        Raises:
+            ValueError: If a candle window sets an end (windows always end
+                with the latest candle)
+        """
+        if any(ref.end is not None for ref in context.candle_windows):
+            raise ValueError("candleWindows of a stream can't set an end")
+        self.context = context
+        self.shared = buffer
+        self.own = CandleBuffer(capacity=capacity)
+        self.ingest = ingest
+        # None = every candle the buffer retains for the symbol
+        self.windows: dict[str, Optional[int]] = {
+            ref.symbol: ref.length for ref in context.candle_windows
+        }
+        self.shared_symbols = set(self.windows) if buffer is not None else set()
+        self.ticks = 0
+
+    @property
+    def agent_id(self) -> str:
+        """ID of the session's agent."""
+        return self.context.agent_id
+
+    def _buffer(self, symbol: str) -> CandleBuffer:
+        """Buffer a symbol's window is read from."""
+        if self.shared is not None and symbol in self.shared_symbols:
+            return self.shared
+        return self.own
+
+    def tick(self, update: Optional[AgentSessionUpdate] = None) -> AgentContextRequest:
+        """
+        Apply an update and build the request to decide on.
+
+        Args:
+            update: Changes since the previous tick (None for the
+                subscription itself)
+
+        Returns:
+            The agent's context with its candle series resolved
+
+        Raises:
+            ValueError: If a window's symbol has no retained candles (e.g.
+                evicted from a shared buffer)
+        """
+        if update is not None:
+            changes: dict[str, Any] = {
+                "request_id": update.request_id,
+                "candles": update.candles,
+                "candle_columns": update.candle_columns,
+                "candle_windows": [],
+            }
+            if update.portfolio is not None:
+                changes["portfolio"] = update.portfolio
+            if update.instructions is not None:
+                changes["instructions"] = update.instructions
+            self.context = self.context.model_copy(update=changes)
+
+        for series in sent_series(self.context):
+            if not len(series):
+                continue
+            if series.symbol not in self.windows:
+                self.windows[series.symbol] = len(series)
+            buffer = self._buffer(series.symbol)
+            buffer.append_series(series)
+            if self.ingest and self.shared is not None and buffer is self.own:
+                self.shared.append_series(series)
+
+        resolved = []
+        for symbol in sorted(self.windows):
+            try:
+                resolved.append(self._buffer(symbol).window(symbol, length=self.windows[symbol]))
+            except KeyError:
+                raise ValueError(f"No candles retained for {symbol}") from None
+        self.context.set_resolved_series(resolved)
+        self.ticks += 1
+        return self.context
@@ -0,0 +1,344 @@
+"""Walk-forward backtests of the live decision logic over long histories.
+
+A backtest replays what the service would have decided at every bar,
+without going through `/predict`:
+
+1. Features for every bar of every symbol are computed in one vectorized
+   pass per symbol (`compute_features`), and all bars are predicted in
+   large batches.
+2. The portfolio is then simulated bar by bar in time order: orders are
+   sized with the same `order_quantity` as live decisions and filled at the
+   bar's close with the accounting rules of the race portfolio service
+   (buys need enough cash, sells need enough holdings).
+
+Predictions don't depend on the portfolio, so one `predict_history` call
+can be simulated under many configurations.
+
+Features come from the full history up to each bar rather than from the
+shorter window a client sends to /predict. Windowed indicators are equal;
+recursive ones (RSI, MACD) differ only while the live window is too short
+for them to converge.
+"""
+
+import time
+from decimal import Decimal, localcontext
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.ml.feature_engine import FEATURE_COLUMNS, compute_features
+from app.ml.predictor import PredictedAction, TradingPredictor
+from app.models.enums import TradeSide
+from app.services.candle_series import CandleSeries
+from app.services.decision_service import (
+    BASE_POSITION_FRACTION,
+    MAX_SIZING_CONFIDENCE,
+    order_quantity,
+)
+
+# Marks a bar without a prediction (symbol not trading yet, or warm-up)
+NO_ACTION = -1
+
+# Feature rows passed to the model at once
+PREDICT_CHUNK_ROWS = 100_000
+
+# Decimal digits for simulated accounting: compounding over years of bars can
+# outgrow the default 28 digits that quantities are quantized within
+SIMULATION_PRECISION = 60
+
+
+class BacktestConfig(NamedTuple):
+    """Portfolio and order sizing parameters of a simulated agent."""
+
+    starting_cash: Decimal = Decimal("100000")
+    position_fraction: Decimal = BASE_POSITION_FRACTION
+    max_confidence: float = MAX_SIZING_CONFIDENCE
+    min_confidence: float = 0.0  # Ignore predictions less confident than this
+    decision_every: int = 1  # Decide on every n-th bar of the timeline
+
+
+class BarPredictions(NamedTuple):
+    """Model decisions for every bar, aligned on a common timeline."""
+
+    symbols: list[str]
+    timestamps: np.ndarray  # int64 ns, union of all symbols' bars, ascending
+    close: np.ndarray  # (n_times, n_symbols) float64, forward-filled, NaN before first bar
+    action: np.ndarray  # (n_times, n_symbols) int8 PredictedAction, NO_ACTION if none
+    confidence: np.ndarray  # (n_times, n_symbols) float64
+    bars: int  # Symbol bars in the input
+    feature_seconds: float
+    predict_seconds: float
+
+
+class Trade(NamedTuple):
+    """One filled order."""
+
+    timestamp: int  # ns since epoch
+    symbol: str
+    side: TradeSide
+    quantity: Decimal
+    price: Decimal
+    confidence: float
+
+
+class BacktestResult(NamedTuple):
+    """Equity curve, trade log and statistics of a backtest."""
+
+    timestamps: np.ndarray  # int64 ns
+    equity: np.ndarray  # float64 portfolio value after each timestamp
+    cash: np.ndarray  # float64 cash after each timestamp
+    trades: list[Trade]
+    stats: dict
+
+    def equity_frame(self) -> pd.DataFrame:
+        """Equity curve as a DataFrame indexed by timestamp."""
+        return pd.DataFrame(
+            {"equity": self.equity, "cash": self.cash},
+            index=pd.to_datetime(self.timestamps, unit="ns", utc=True),
+        )
+
+    def trades_frame(self) -> pd.DataFrame:
+        """Trade log as a DataFrame."""
+        frame = pd.DataFrame(self.trades, columns=Trade._fields)
+        frame["side"] = [trade.side.value for trade in self.trades]
+        frame["timestamp"] = pd.to_datetime(frame["timestamp"], unit="ns", utc=True)
+        return frame
+
+
+def _forward_fill(values: np.ndarray) -> np.ndarray:
+    """Replace NaNs in a 1-D array with the last preceding value."""
+    index = np.where(np.isnan(values), 0, np.arange(len(values)))
+    np.maximum.accumulate(index, out=index)
+    filled = values[index]
+    # Leading NaNs stay NaN (index 0 points at a NaN itself)
+    return filled
+
+
+def predict_history(
+    predictor: TradingPredictor,
+    series: list[CandleSeries],
+    chunk_rows: int = PREDICT_CHUNK_ROWS,
+) -> BarPredictions:
+    """
+    Predict an action for every bar of every symbol.
+
+    Args:
+        predictor: Model to replay (rule-based fallback if none is loaded)
+        series: One candle series per symbol, any lengths and time ranges
+        chunk_rows: Feature rows per model call
+
+    Returns:
+        BarPredictions on the union of all symbols' timestamps
+    """
+    symbols = [s.symbol for s in series]
+    timestamps = np.unique(np.concatenate([s.timestamps for s in series]))
+    n_times, n_symbols = len(timestamps), len(series)
+
+    close = np.full((n_times, n_symbols), np.nan)
+    action = np.full((n_times, n_symbols), NO_ACTION, dtype=np.int8)
+    confidence = np.zeros((n_times, n_symbols))
+
+    # Features of every bar in one pass per symbol
+    start = time.perf_counter()
+    feature_blocks: list[np.ndarray] = []
+    positions: list[tuple[int, np.ndarray]] = []  # (symbol column, timeline rows)
+    for column, s in enumerate(series):
+        rows = np.searchsorted(timestamps, s.timestamps)
+        close[rows, column] = s.close
+        close[:, column] = _forward_fill(close[:, column])
+
+        features = compute_features(s.close, s.volume)
+        valid = ~np.isnan(features).any(axis=1)
+        feature_blocks.append(features[valid])
+        positions.append((column, rows[valid]))
+    features = np.concatenate(feature_blocks) if feature_blocks else np.empty((0, 0))
+    feature_seconds = time.perf_counter() - start
+
+    # All bars predicted in large batches
+    start = time.perf_counter()
+    actions = np.empty(len(features), dtype=np.int8)
+    confidences = np.empty(len(features))
+    for lo in range(0, len(features), chunk_rows):
+        chunk = features[lo:lo + chunk_rows]
+        if predictor.is_loaded:
+            probas = predictor.predict_proba(chunk)
+            actions[lo:lo + len(chunk)] = np.argmax(probas, axis=1)
+            confidences[lo:lo + len(chunk)] = np.max(probas, axis=1)
+        else:
+            values = [dict(zip(FEATURE_COLUMNS, row.tolist())) for row in chunk]
+            results = predictor.predict_batch(chunk, values)
+            actions[lo:lo + len(chunk)] = [int(r.action) for r in results]
+            confidences[lo:lo + len(chunk)] = [r.confidence for r in results]
+    predict_seconds = time.perf_counter() - start
+
+    offset = 0
+    for column, rows in positions:
+        action[rows, column] = actions[offset:offset + len(rows)]
+        confidence[rows, column] = confidences[offset:offset + len(rows)]
+        offset += len(rows)
+
+    return BarPredictions(
+        symbols=symbols,
+        timestamps=timestamps,
+        close=close,
+        action=action,
+        confidence=confidence,
+        bars=sum(len(s) for s in series),
+        feature_seconds=feature_seconds,
+        predict_seconds=predict_seconds,
+    )
+
+
+def simulate(
+    predictions: BarPredictions, config: BacktestConfig = BacktestConfig()
+) -> BacktestResult:
+    """
+    Replay the decisions bar by bar against a portfolio.
+
+    At each decision time, orders for all symbols are sized from the same
+    portfolio snapshot (as one /predict call would be), then filled in
+    symbol order at the bar's close. Buys beyond the available cash and
+    sells beyond the holdings are rejected, as the race portfolio does.
+
+    Args:
+        predictions: Output of predict_history
+        config: Agent parameters
+
+    Returns:
+        BacktestResult with equity curve, trade log and statistics
+    """
+    start = time.perf_counter()
+    n_times, n_symbols = predictions.close.shape
+    symbols = predictions.symbols
+
+    actionable = (predictions.action == PredictedAction.BUY) | (
+        predictions.action == PredictedAction.SELL
+    )
+    if config.min_confidence > 0:
+        actionable &= predictions.confidence >= config.min_confidence
+    if config.decision_every > 1:
+        actionable[np.arange(n_times) % config.decision_every != 0] = False
+
+    cash = config.starting_cash
+    holdings = [Decimal(0)] * n_symbols
+    trades: list[Trade] = []
+    rejected = {TradeSide.BUY: 0, TradeSide.SELL: 0}
+
+    # Fills as (time index, symbol, quantity change, cash change) for the equity curve
+    fill_times: list[int] = []
+    fill_symbols: list[int] = []
+    fill_quantities: list[float] = []
+    fill_cash: list[float] = []
+
+    with localcontext() as ctx:
+        ctx.prec = SIMULATION_PRECISION
+        for t in np.flatnonzero(actionable.any(axis=1)):
+            row_close = predictions.close[t]
+            prices = {}
+
+            def price(column: int) -> Decimal:
+                if column not in prices:
+                    prices[column] = Decimal(repr(float(row_close[column])))
+                return prices[column]
+
+            portfolio_value = cash + sum(
+                quantity * price(column)
+                for column, quantity in enumerate(holdings)
+                if quantity
+            )
+
+            for column in np.flatnonzero(actionable[t]).tolist():
+                quantity = order_quantity(
+                    float(predictions.confidence[t, column]),
+                    portfolio_value,
+                    price(column),
+                    position_fraction=config.position_fraction,
+                    max_confidence=config.max_confidence,
+                )
+                if quantity is None:
+                    continue
+
+                notional = quantity * price(column)
+                if predictions.action[t, column] == PredictedAction.BUY:
+                    side = TradeSide.BUY
+                    if notional > cash:
+                        rejected[side] += 1
+                        continue
+                    cash -= notional
+                    holdings[column] += quantity
+                    delta = float(quantity)
+                else:
+                    side = TradeSide.SELL
+                    if holdings[column] < quantity:
+                        rejected[side] += 1
+                        continue
+                    cash += notional
+                    holdings[column] -= quantity
+                    delta = -float(quantity)
+
+                trades.append(
+                    Trade(
+                        int(predictions.timestamps[t]),
+                        symbols[column],
+                        side,
+                        quantity,
+                        price(column),
+                        float(predictions.confidence[t, column]),
+                    )
+                )
+                fill_times.append(int(t))
+                fill_symbols.append(int(column))
+                fill_quantities.append(delta)
+                fill_cash.append(-delta * float(row_close[column]))
+
+    # Equity curve from cumulative fills, without per-bar Python work
+    quantity_changes = np.zeros((n_times, n_symbols))
+    np.add.at(quantity_changes, (fill_times, fill_symbols), fill_quantities)
+    held = np.cumsum(quantity_changes, axis=0)
+    cash_changes = np.zeros(n_times)
+    np.add.at(cash_changes, fill_times, fill_cash)
+    cash_curve = float(config.starting_cash) + np.cumsum(cash_changes)
+    equity = cash_curve + (held * np.nan_to_num(predictions.close)).sum(axis=1)
+    simulate_seconds = time.perf_counter() - start
+
+    starting = float(config.starting_cash)
+    peak = np.maximum.accumulate(equity) if n_times else equity
+    total_seconds = predictions.feature_seconds + predictions.predict_seconds + simulate_seconds
+    stats = {
+        "symbols": n_symbols,
+        "bars": predictions.bars,
+        "timeline": n_times,
+        "trades": len(trades),
+        "buys": sum(t.side == TradeSide.BUY for t in trades),
+        "sells": sum(t.side == TradeSide.SELL for t in trades),
+        "rejected_buys": rejected[TradeSide.BUY],
+        "rejected_sells": rejected[TradeSide.SELL],
+        "final_equity": float(equity[-1]) if n_times else starting,
+        "total_return": float(equity[-1] / starting - 1) if n_times else 0.0,
+        "max_drawdown": float((1 - equity / peak).max()) if n_times else 0.0,
+        "feature_seconds": round(predictions.feature_seconds, 4),
+        "predict_seconds": round(predictions.predict_seconds, 4),
+        "simulate_seconds": round(simulate_seconds, 4),
+        "bars_per_second": round(predictions.bars / total_seconds, 1) if total_seconds else None,
+    }
+    return BacktestResult(predictions.timestamps, equity, cash_curve, trades, stats)
+
+
+def run_backtest(
+    predictor: TradingPredictor,
+    series: list[CandleSeries],
+    config: Optional[BacktestConfig] = None,
+) -> BacktestResult:
+    """
+    Predict every bar and simulate one agent over the history.
+
+    Args:
+        predictor: Model to replay
+        series: One candle series per symbol
+        config: Agent parameters (default: live sizing, 100k starting cash)
+
+    Returns:
+        BacktestResult
+    """
+    return simulate(predict_history(predictor, series), config or BacktestConfig())
@@ -1,138 +1,299 @@
 """Redis cache service for idempotency and response deduplication."""
 
-import json
+import asyncio
 import logging
-from typing import Optional
+from typing import NamedTuple, Optional, cast
 
-import redis
+import redis.asyncio as aioredis
 from redis.exceptions import RedisError
 
 from app.config import settings
+from app.services.lru_cache import CacheStats, LRUCache
 
 logger = logging.getLogger(__name__)
 
 
-class CacheService:
+# L1 marker for a key known to be missing from Redis (negative caching)
+_MISSING = object()
+
+# Redis hash fields of a cached response
+_BODY_FIELD = b"body"
+_STATUS_FIELD = b"status"
+_CONTENT_TYPE_FIELD = b"content_type"
+
+
+class CachedResponse(NamedTuple):
+    """A cached HTTP response: raw body bytes, status and content type."""
+
+    body: bytes
+    status_code: int
+    content_type: bytes = b"application/json"
+
+
+def _l1_entry_size(value: object) -> int:
+    """Approximate memory held by an L1 entry."""
+    if isinstance(value, CachedResponse):
+        return len(value.body) + 128
+    return 64
+
+
+class TieredCacheStats(NamedTuple):
+    """Per-tier counters for AsyncCacheService."""
+
+    l1: CacheStats  # In-process LRU (hits include negative hits)
+    l1_negative_hits: int  # L1 hits on a cached miss
+    l2_hits: int  # Redis
+    l2_misses: int
+    l2_errors: int
+    l2_writes: int
+
+
+class AsyncCacheService:
     """
-    Redis-based cache service for request idempotency.
-    
-    Caches responses by idempotency key to prevent duplicate processing
-    of the same request within the TTL window (default 1 hour).
+    asyncio-native two-level cache for request idempotency.
+
+    L1 is a size-bounded in-process LRU with TTL; L2 is Redis, built on
+    `redis.asyncio` with a shared connection pool so round trips never block
+    the event loop. Responses are stored as a Redis hash of raw body bytes,
+    status and content type, so neither side re-encodes the body. Retries that
+    land on the same worker are served from L1 without a network hop, and
+    Redis misses are remembered briefly (negative caching). L1 only fronts a
+    connected Redis: without Redis, no response is replayed.
+
+    Also coalesces in-flight work: while one request computes the response
+    for an idempotency key, later requests with the same key wait for it
+    instead of running the model again.
     """
 
     def __init__(self):
-        """Initialize Redis connection if enabled."""
-        self._redis_client: Optional[redis.Redis] = None
-        
-        if settings.redis_enabled:
-            try:
-                self._redis_client = redis.Redis(
-                    host=settings.redis_host,
-                    port=settings.redis_port,
-                    db=settings.redis_db,
-                    password=settings.redis_password,
-                    decode_responses=True,
-                    socket_connect_timeout=5,
-                    socket_timeout=5,
-                )
-                # Test connection
-                self._redis_client.ping()
-                logger.info(
-                    f"Redis cache connected: {settings.redis_host}:{settings.redis_port}"
-                )
-            except RedisError as e:
-                logger.warning(f"Redis connection failed, cache disabled: {e}")
-                self._redis_client = None
+        """Create the client lazily; call `connect` from the event loop."""
+        self._redis_client: Optional[aioredis.Redis] = None
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self._l1: Optional[LRUCache[object]] = (
+            LRUCache(
+                ttl_seconds=settings.idempotency_l1_ttl_seconds,
+                max_entries=settings.idempotency_l1_max_entries,
+                max_bytes=settings.idempotency_l1_max_bytes,
+                sizeof=_l1_entry_size,
+            )
+            if settings.idempotency_l1_max_entries > 0
+            else None
+        )
+        self._l1_negative_hits = 0
+        self._l2_hits = 0
+        self._l2_misses = 0
+        self._l2_errors = 0
+        self._l2_writes = 0
+
+    async def connect(self) -> None:
+        """Open the connection pool if Redis is enabled (cache disabled on failure)."""
+        if not settings.redis_enabled or self._redis_client is not None:
+            return
+
+        pool = aioredis.ConnectionPool(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            db=settings.redis_db,
+            password=settings.redis_password,
+            socket_connect_timeout=settings.redis_socket_timeout_seconds,
+            socket_timeout=settings.redis_socket_timeout_seconds,
+            max_connections=settings.redis_max_connections,
+        )
+        client = aioredis.Redis(connection_pool=pool)
+        try:
+            await client.ping()
+        except RedisError as e:
+            logger.warning(f"Redis connection failed, cache disabled: {e}")
+            await client.aclose(close_connection_pool=True)
+            return
+
+        self._redis_client = client
+        logger.info(f"Async Redis cache connected: {settings.redis_host}:{settings.redis_port}")
 
     @property
     def is_available(self) -> bool:
         """Check if Redis is available."""
         return self._redis_client is not None
 
-    def get(self, idempotency_key: str) -> Optional[dict]:
+    @property
+    def client(self) -> Optional[aioredis.Redis]:
+        """The connected Redis client, for sharing its pool (None if unavailable)."""
+        return self._redis_client
+
+    @staticmethod
+    def _redis_key(idempotency_key: str) -> str:
+        """Redis key of a response hash (v1 entries were JSON strings)."""
+        return f"idempotency:v2:{idempotency_key}"
+
+    async def get(self, idempotency_key: str) -> Optional[CachedResponse]:
         """
-        Get cached response by idempotency key.
-        
+        Get cached response by idempotency key, from L1 first, then Redis.
+
         Args:
             idempotency_key: Unique key for the request
-            
+
         Returns:
-            Cached response dict or None if not found/expired
+            CachedResponse or None if not found/expired
         """
-        if not self.is_available:
+        client = self._redis_client
+        if client is None:
             return None
 
+        if self._l1 is not None:
+            local = self._l1.get(idempotency_key)
+            if local is _MISSING:
+                self._l1_negative_hits += 1
+                return None
+            if isinstance(local, CachedResponse):
+                logger.debug(f"L1 cache HIT for key: {idempotency_key}")
+                return local
+
         try:
-            cached = self._redis_client.get(f"idempotency:{idempotency_key}")
-            if cached:
+            fields = cast(
+                dict[bytes, bytes], await client.hgetall(self._redis_key(idempotency_key))
+            )
+            if fields:
                 logger.info(f"Cache HIT for key: {idempotency_key}")
-                return json.loads(cached)
+                response = CachedResponse(
+                    body=fields[_BODY_FIELD],
+                    status_code=int(fields[_STATUS_FIELD]),
+                    content_type=fields[_CONTENT_TYPE_FIELD],
+                )
+                self._l2_hits += 1
+                self._set_local(idempotency_key, response)
+                return response
             logger.debug(f"Cache MISS for key: {idempotency_key}")
+            self._l2_misses += 1
+            self._set_local(
+                idempotency_key, _MISSING, ttl_seconds=settings.idempotency_l1_negative_ttl_seconds
+            )
             return None
-        except (RedisError, json.JSONDecodeError) as e:
+        except (RedisError, KeyError, ValueError) as e:
             logger.error(f"Error reading from cache: {e}")
+            self._l2_errors += 1
             return None
 
-    def set(self, idempotency_key: str, response: dict) -> bool:
+    async def set(self, idempotency_key: str, response: CachedResponse) -> bool:
         """
-        Cache a response with TTL.
-        
+        Cache a response with TTL in both tiers.
+
         Args:
             idempotency_key: Unique key for the request
-            response: Response dict to cache
-            
+            response: Response to cache
+
         Returns:
-            True if cached successfully, False otherwise
+            True if cached in Redis successfully, False otherwise
         """
-        if not self.is_available:
+        client = self._redis_client
+        if client is None:
             return False
 
+        self._set_local(idempotency_key, response)
+        key = self._redis_key(idempotency_key)
         try:
-            serialized = json.dumps(response)
-            self._redis_client.setex(
-                f"idempotency:{idempotency_key}",
-                settings.redis_ttl_seconds,
-                serialized,
+            # HSET + EXPIRE in one round trip
+            pipe = client.pipeline(transaction=True)
+            pipe.hset(
+                key,
+                mapping={
+                    _BODY_FIELD: response.body,
+                    _STATUS_FIELD: response.status_code,
+                    _CONTENT_TYPE_FIELD: response.content_type,
+                },
             )
+            pipe.expire(key, settings.redis_ttl_seconds)
+            await pipe.execute()
+            self._l2_writes += 1
             logger.info(
                 f"Cached response for key: {idempotency_key} "
                 f"(TTL: {settings.redis_ttl_seconds}s)"
             )
             return True
-        except (RedisError, TypeError) as e:
+        except RedisError as e:
             logger.error(f"Error writing to cache: {e}")
+            self._l2_errors += 1
             return False
 
-    def delete(self, idempotency_key: str) -> bool:
+    async def delete(self, idempotency_key: str) -> bool:
         """
         Delete a cached response.
-        
+
         Args:
             idempotency_key: Key to delete
-            
+
         Returns:
             True if deleted successfully
         """
-        if not self.is_available:
+        if self._l1 is not None:
+            self._l1.delete(idempotency_key)
+        client = self._redis_client
+        if client is None:
             return False
 
         try:
-            self._redis_client.delete(f"idempotency:{idempotency_key}")
+            await client.delete(self._redis_key(idempotency_key))
             logger.debug(f"Deleted cache key: {idempotency_key}")
             return True
         except RedisError as e:
             logger.error(f"Error deleting from cache: {e}")
             return False
 
-    def close(self):
-        """Close Redis connection."""
+    @property
+    def stats(self) -> TieredCacheStats:
+        """Hit/miss counters for each cache tier."""
+        return TieredCacheStats(
+            l1=self._l1.stats if self._l1 is not None else CacheStats(0, 0, 0, 0, 0, 0),
+            l1_negative_hits=self._l1_negative_hits,
+            l2_hits=self._l2_hits,
+            l2_misses=self._l2_misses,
+            l2_errors=self._l2_errors,
+            l2_writes=self._l2_writes,
+        )
+
+    def _set_local(
+        self, idempotency_key: str, value: object, ttl_seconds: Optional[float] = None
+    ) -> None:
+        """Store a value (or the missing marker) in L1, never outliving Redis."""
+        if self._l1 is not None:
+            ttl = self._l1.ttl_seconds if ttl_seconds is None else ttl_seconds
+            self._l1.set(idempotency_key, value, ttl_seconds=min(ttl, settings.redis_ttl_seconds))
+
+    def join_in_flight(self, idempotency_key: str) -> Optional[asyncio.Future]:
+        """
+        Register as the request computing a key, or join the one that is.
+
+        Args:
+            idempotency_key: Unique key for the request
+
+        Returns:
+            None if the caller now owns the key and must call `finish_in_flight`;
+            otherwise a future resolving to the owner's CachedResponse
+            (or None if the owner produced nothing cacheable)
+        """
+        future = self._in_flight.get(idempotency_key)
+        if future is not None:
+            return future
+        self._in_flight[idempotency_key] = asyncio.get_running_loop().create_future()
+        return None
+
+    def finish_in_flight(
+        self, idempotency_key: str, response: Optional[CachedResponse]
+    ) -> None:
+        """Release a key taken with `join_in_flight` and wake its waiters."""
+        future = self._in_flight.pop(idempotency_key, None)
+        if future is not None and not future.done():
+            future.set_result(response)
+
+    async def close(self) -> None:
+        """Close the Redis connection pool."""
         if self._redis_client:
             try:
-                self._redis_client.close()
-                logger.info("Redis connection closed")
+                await self._redis_client.aclose(close_connection_pool=True)
+                logger.info("Async Redis connection closed")
             except RedisError as e:
                 logger.error(f"Error closing Redis connection: {e}")
+            self._redis_client = None
 
 
-# Global cache instance
-cache_service = CacheService()
+# Global cache instance (connected in the app lifespan)
+async_cache_service = AsyncCacheService()
@@ -0,0 +1,231 @@
+"""Recent candles retained per symbol, so clients only send new bars.
+
+Every /predict call normally carries the full candle window of each
+symbol, so the same candles are serialized, sent and parsed for every
+agent on every tick. With the buffer enabled, the service keeps the latest
+`capacity` candles of each symbol. Candles are fed by `POST /candles`, by
+the new candles of requests that use windows and, if configured, by every
+predict request. A request can then name a window instead of sending it:
+
+    "candles": [<only the newest BTC candle>],
+    "candleWindows": [{"symbol": "BTC", "length": 200}]
+
+Candles sent for a symbol that also has a window are appended first (a
+delta), and the window is read from the buffer afterwards. The buffer keeps
+one series per symbol, so all clients must use the same candle interval
+for a symbol.
+
+The buffer is shared by every client with the API key: a candle one client
+sends, including a replacement of the latest candle, is what the others'
+windows read. Only trusted clients should feed it.
+"""
+
+import threading
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Optional
+
+import numpy as np
+
+from app.models.schemas import AgentContextRequest
+from app.services.candle_series import CandleSeries, _epoch_ns, sent_series, sort_series
+
+
+class _SymbolBuffer:
+    """
+    Latest candles of one symbol in preallocated arrays.
+
+    Rows live in [start, end) of arrays twice the capacity, so appends are
+    plain writes and every window is a contiguous slice. When the arrays
+    fill up, the retained rows are moved back to the front (amortized O(1)
+    per candle).
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = np.empty(2 * capacity, dtype=np.int64)
+        self.ohlcv = np.empty((2 * capacity, 5), dtype=np.float64)
+        self.start = 0
+        self.end = 0
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def append(self, timestamps: np.ndarray, ohlcv: np.ndarray) -> int:
+        """Append sorted, unique candles; returns how many were new or updated."""
+        if len(self):
+            last = self.timestamps[self.end - 1]
+            keep = timestamps >= last
+            timestamps, ohlcv = timestamps[keep], ohlcv[keep]
+            if len(timestamps) and timestamps[0] == last:
+                # The latest candle again, e.g. still forming: newest values win
+                self.ohlcv[self.end - 1] = ohlcv[0]
+                updated, timestamps, ohlcv = 1, timestamps[1:], ohlcv[1:]
+            else:
+                updated = 0
+        else:
+            updated = 0
+
+        n = len(timestamps)
+        if n >= self.capacity:
+            self.timestamps[:self.capacity] = timestamps[-self.capacity:]
+            self.ohlcv[:self.capacity] = ohlcv[-self.capacity:]
+            self.start, self.end = 0, self.capacity
+            return updated + n
+
+        if self.end + n > len(self.timestamps):
+            kept = min(len(self), self.capacity - n)
+            self.timestamps[:kept] = self.timestamps[self.end - kept:self.end]
+            self.ohlcv[:kept] = self.ohlcv[self.end - kept:self.end]
+            self.start, self.end = 0, kept
+        self.timestamps[self.end:self.end + n] = timestamps
+        self.ohlcv[self.end:self.end + n] = ohlcv
+        self.end += n
+        self.start = max(self.start, self.end - self.capacity)
+        return updated + n
+
+    def window(self, end: Optional[int], length: Optional[int]) -> tuple[np.ndarray, np.ndarray]:
+        """Copies of the last `length` candles at or before `end`."""
+        hi = self.end
+        if end is not None:
+            hi = self.start + int(
+                np.searchsorted(self.timestamps[self.start:self.end], end, side="right")
+            )
+        lo = self.start if length is None else max(self.start, hi - length)
+        return self.timestamps[lo:hi].copy(), self.ohlcv[lo:hi].copy()
+
+
+class CandleBuffer:
+    """Bounded, thread-safe store of recent candles for many symbols."""
+
+    def __init__(self, capacity: int = 1000, max_symbols: int = 1000):
+        """Initialize the buffer.
+
+        Args:
+            capacity: Candles retained per symbol (older ones are dropped)
+            max_symbols: Symbols retained; the least recently used is evicted
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.max_symbols = max_symbols
+        self._buffers: OrderedDict[str, _SymbolBuffer] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._buffers)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._buffers
+
+    def rows(self, symbol: str) -> int:
+        """Candles retained for a symbol (0 if none)."""
+        with self._lock:
+            buffer = self._buffers.get(symbol)
+            return len(buffer) if buffer is not None else 0
+
+    def append(self, symbol: str, timestamps: np.ndarray, ohlcv: np.ndarray) -> int:
+        """
+        Add candles of a symbol.
+
+        Candles older than the latest retained one are ignored; one with the
+        same timestamp replaces it.
+
+        Args:
+            symbol: Symbol the candles belong to
+            timestamps: int64 ns since epoch, shape (n,), any order
+            ohlcv: float64 open/high/low/close/volume, shape (n, 5)
+
+        Returns:
+            Number of candles added or updated
+        """
+        if len(timestamps) == 0:
+            return 0
+        series = sort_series(symbol, timestamps, ohlcv, Decimal(0))
+        timestamps, ohlcv = series.timestamps, series.ohlcv
+        # Repeated timestamps in one batch: keep the last one sent
+        last = np.ones(len(timestamps), dtype=bool)
+        last[:-1] = timestamps[1:] != timestamps[:-1]
+        if not last.all():
+            timestamps, ohlcv = timestamps[last], ohlcv[last]
+
+        with self._lock:
+            buffer = self._buffers.get(symbol)
+            if buffer is None:
+                buffer = self._buffers[symbol] = _SymbolBuffer(self.capacity)
+                while len(self._buffers) > self.max_symbols:
+                    self._buffers.popitem(last=False)
+            else:
+                self._buffers.move_to_end(symbol)
+            return buffer.append(timestamps, ohlcv)
+
+    def append_series(self, series: CandleSeries) -> int:
+        """Add the candles of a CandleSeries (see append)."""
+        return self.append(series.symbol, series.timestamps, series.ohlcv)
+
+    def window(
+        self, symbol: str, end: Optional[int] = None, length: Optional[int] = None
+    ) -> CandleSeries:
+        """
+        Retained candles of a symbol, as a series independent of the buffer.
+
+        Args:
+            symbol: Symbol to read
+            end: Latest candle timestamp (ns) to include (None = newest)
+            length: Number of candles (None = all retained up to `end`)
+
+        Returns:
+            CandleSeries of at most `length` candles
+
+        Raises:
+            KeyError: If no candles are retained for the symbol
+        """
+        with self._lock:
+            buffer = self._buffers.get(symbol)
+            if buffer is None:
+                raise KeyError(symbol)
+            self._buffers.move_to_end(symbol)
+            timestamps, ohlcv = buffer.window(end, length)
+        latest_close = Decimal(repr(float(ohlcv[-1, 3]))) if len(ohlcv) else Decimal(0)
+        return CandleSeries(symbol, timestamps, ohlcv, latest_close)
+
+    def resolve(self, context: AgentContextRequest, ingest: bool = False) -> list[CandleSeries]:
+        """
+        Candle series of a request, with its windows read from the buffer.
+
+        The result is attached to the request, so a DecisionService (in
+        any process) uses it instead of regrouping the candles.
+
+        Args:
+            context: Agent request
+            ingest: Also add the candles of symbols without a window
+
+        Returns:
+            One CandleSeries per symbol, ordered by symbol name
+
+        Raises:
+            ValueError: If a window names a symbol with no retained candles
+        """
+        sent = sent_series(context)
+        window_symbols = {ref.symbol for ref in context.candle_windows}
+        for series in sent:
+            # Candles of a windowed symbol are a delta and always appended
+            if ingest or series.symbol in window_symbols:
+                self.append_series(series)
+
+        by_symbol = {series.symbol: series for series in sent}
+        for ref in context.candle_windows:
+            end = _epoch_ns(ref.end) if ref.end is not None else None
+            try:
+                by_symbol[ref.symbol] = self.window(ref.symbol, end, ref.length)
+            except KeyError:
+                raise ValueError(f"No candles retained for {ref.symbol}") from None
+
+        resolved = [by_symbol[symbol] for symbol in sorted(by_symbol)]
+        context.set_resolved_series(resolved)
+        return resolved
+
+    def clear(self) -> None:
+        """Drop every retained candle."""
+        with self._lock:
+            self._buffers.clear()
@@ -0,0 +1,136 @@
+"""Per-symbol candle series in array form.
+
+A request's candles arrive as one flat list mixing every symbol. They are
+split by symbol in a single pass and converted to NumPy arrays once, so the
+rest of the pipeline (dedup, features, order sizing) never rescans the list.
+Candles sent in columnar form are already arrays and are used as they are.
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import NamedTuple
+
+import numpy as np
+
+from app.models.schemas import AgentContextRequest, CandleColumns, CandleData
+from app.services.feature_cache import FeatureCache
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class CandleSeries(NamedTuple):
+    """Candles of one symbol, sorted by time."""
+
+    symbol: str
+    timestamps: np.ndarray  # int64 nanoseconds since epoch, ascending
+    ohlcv: np.ndarray  # float64, shape (n, 5): open/high/low/close/volume
+    latest_close: Decimal  # Close of the last candle as sent (used for sizing)
+
+    @property
+    def close(self) -> np.ndarray:
+        return self.ohlcv[:, 3]
+
+    @property
+    def volume(self) -> np.ndarray:
+        return self.ohlcv[:, 4]
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def content_key(self) -> bytes:
+        """Digest of the series contents (see FeatureCache.key_for)."""
+        return FeatureCache.key_for(self.timestamps, self.ohlcv)
+
+
+def _epoch_ns(timestamp: datetime) -> int:
+    """Exact nanoseconds since epoch (naive datetimes are taken as UTC)."""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    delta = timestamp - _EPOCH
+    return ((delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds) * 1000
+
+
+def context_series(context: AgentContextRequest) -> list[CandleSeries]:
+    """
+    All candle series of a request.
+
+    Series already resolved against the candle buffer (see
+    CandleBuffer.resolve) are returned as they are.
+
+    Args:
+        context: Agent request
+
+    Returns:
+        One CandleSeries per symbol, ordered by symbol name
+
+    Raises:
+        ValueError: If the request names candle windows that weren't resolved
+    """
+    resolved = context.resolved_series()
+    if resolved is not None:
+        return resolved
+    if context.candle_windows:
+        raise ValueError("candleWindows require the candle buffer to be enabled")
+    return sent_series(context)
+
+
+def sent_series(context: AgentContextRequest) -> list[CandleSeries]:
+    """
+    Candle series sent in a request, from row and columnar candles.
+
+    Args:
+        context: Agent request
+
+    Returns:
+        One CandleSeries per symbol, ordered by symbol name
+    """
+    series = group_candles(context.candles)
+    if not context.candle_columns:
+        return series
+    series.extend(series_from_columns(columns) for columns in context.candle_columns)
+    return sorted(series, key=lambda s: s.symbol)
+
+
+def series_from_columns(columns: CandleColumns) -> CandleSeries:
+    """Build a CandleSeries from columnar candles without per-candle objects."""
+    timestamps, ohlcv = columns.to_arrays()
+    latest_close = Decimal(repr(float(ohlcv[-1, 3]))) if len(ohlcv) else Decimal(0)
+    return sort_series(columns.symbol, timestamps, ohlcv, latest_close)
+
+
+def group_candles(candles: list[CandleData]) -> list[CandleSeries]:
+    """
+    Split a mixed candle list into one series per symbol in a single pass.
+
+    Args:
+        candles: Candles for any number of symbols, in any order
+
+    Returns:
+        One CandleSeries per symbol, ordered by symbol name
+    """
+    rows: dict[str, list[tuple]] = {}
+    latest: dict[str, Decimal] = {}
+    for c in candles:
+        rows.setdefault(c.symbol, []).append(
+            (_epoch_ns(c.timestamp), c.open, c.high, c.low, c.close, c.volume)
+        )
+        latest[c.symbol] = c.close
+
+    series = []
+    for symbol in sorted(rows):
+        data = rows[symbol]
+        timestamps = np.fromiter((r[0] for r in data), dtype=np.int64, count=len(data))
+        ohlcv = np.array([r[1:] for r in data], dtype=np.float64)
+        series.append(sort_series(symbol, timestamps, ohlcv, latest[symbol]))
+    return series
+
+
+def sort_series(
+    symbol: str, timestamps: np.ndarray, ohlcv: np.ndarray, latest_close: Decimal
+) -> CandleSeries:
+    """Build a CandleSeries, sorting by timestamp if needed."""
+    if len(timestamps) > 1 and (np.diff(timestamps) < 0).any():
+        order = np.argsort(timestamps, kind="stable")
+        timestamps = timestamps[order]
+        ohlcv = ohlcv[order]
+    return CandleSeries(symbol, timestamps, ohlcv, latest_close)
@@ -0,0 +1,250 @@
+"""Columnar on-disk candle store with memory-mapped range reads.
+
+Each symbol is a directory of two append-only, fixed-width files:
+
+    <root>/<symbol>/timestamp.i64   int64 ns since epoch, strictly ascending
+    <root>/<symbol>/ohlcv.f64       float64 rows of open/high/low/close/volume
+
+Both are raw arrays (no header), so appending is a plain file append and
+reading is a memory map of the current length. The sorted timestamp column
+is the time index: a range read is two binary searches on the mapped
+timestamps and returns views into the maps, without copying or parsing.
+The OHLCV columns are interleaved per row so a window is one contiguous
+(n, 5) block, the layout CandleSeries and the feature engine use.
+
+Appends write the OHLCV rows before the timestamps, and a symbol's length
+is the number of complete rows in both files, so readers never see a
+partially written candle. There is a single writer per symbol.
+"""
+
+import os
+import re
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import NamedTuple, Optional, Union
+
+import numpy as np
+
+from app.services.candle_series import CandleSeries, _epoch_ns, sort_series
+
+TIMESTAMP_FILE = "timestamp.i64"
+OHLCV_FILE = "ohlcv.f64"
+OHLCV_COLUMNS = ("open", "high", "low", "close", "volume")
+ROW_BYTES = len(OHLCV_COLUMNS) * 8
+
+# Symbols are directory names
+_SYMBOL_PATTERN = re.compile(r"^[A-Za-z0-9_-][A-Za-z0-9._-]*$")
+
+Timestamp = Union[int, datetime, np.datetime64]
+
+
+class _Mapped(NamedTuple):
+    rows: int
+    timestamps: np.ndarray
+    ohlcv: np.ndarray
+
+
+def _to_ns(value: Timestamp) -> int:
+    """Nanoseconds since epoch of an int (already ns), datetime or datetime64."""
+    if isinstance(value, datetime):
+        return _epoch_ns(value)
+    if isinstance(value, np.datetime64):
+        return int(value.astype("datetime64[ns]").astype(np.int64))
+    return int(value)
+
+
+class CandleStore:
+    """Per-symbol candle columns on disk, read through memory maps."""
+
+    def __init__(self, root: Union[str, Path]):
+        """Initialize the store.
+
+        Args:
+            root: Directory holding one subdirectory per symbol (created on append)
+        """
+        self.root = Path(root)
+        self._maps: dict[str, _Mapped] = {}
+
+    def _symbol_dir(self, symbol: str) -> Path:
+        if not _SYMBOL_PATTERN.match(symbol):
+            raise ValueError(f"Invalid symbol for the candle store: {symbol!r}")
+        return self.root / symbol
+
+    def symbols(self) -> list[str]:
+        """Stored symbols, sorted by name."""
+        if not self.root.is_dir():
+            return []
+        return sorted(
+            path.name for path in self.root.iterdir() if (path / TIMESTAMP_FILE).exists()
+        )
+
+    def __contains__(self, symbol: str) -> bool:
+        return (self._symbol_dir(symbol) / TIMESTAMP_FILE).exists()
+
+    def rows(self, symbol: str) -> int:
+        """Number of complete candles stored for a symbol (0 if none)."""
+        directory = self._symbol_dir(symbol)
+        try:
+            timestamp_bytes = os.path.getsize(directory / TIMESTAMP_FILE)
+            ohlcv_bytes = os.path.getsize(directory / OHLCV_FILE)
+        except FileNotFoundError:
+            return 0
+        return min(timestamp_bytes // 8, ohlcv_bytes // ROW_BYTES)
+
+    def _mapped(self, symbol: str) -> _Mapped:
+        """Maps of a symbol's columns, reopened when the symbol has grown."""
+        rows = self.rows(symbol)
+        mapped = self._maps.get(symbol)
+        if mapped is not None and mapped.rows == rows:
+            return mapped
+
+        directory = self._symbol_dir(symbol)
+        if rows == 0:
+            mapped = _Mapped(0, np.empty(0, dtype=np.int64), np.empty((0, 5)))
+        else:
+            mapped = _Mapped(
+                rows,
+                np.memmap(directory / TIMESTAMP_FILE, dtype=np.int64, mode="r", shape=(rows,)),
+                np.memmap(directory / OHLCV_FILE, dtype=np.float64, mode="r", shape=(rows, 5)),
+            )
+        self._maps[symbol] = mapped
+        return mapped
+
+    def last_timestamp(self, symbol: str) -> Optional[int]:
+        """Timestamp (ns) of the latest stored candle, or None."""
+        mapped = self._mapped(symbol)
+        return int(mapped.timestamps[-1]) if mapped.rows else None
+
+    def append(self, symbol: str, timestamps: np.ndarray, ohlcv: np.ndarray) -> int:
+        """
+        Append candles to a symbol.
+
+        The batch is sorted by time; candles at or before the latest stored
+        one (and repeated timestamps within the batch) are skipped, so
+        overlapping batches can be appended as they arrive.
+
+        Args:
+            symbol: Symbol name (letters, digits, '.', '_' and '-')
+            timestamps: int64 ns since epoch, shape (n,)
+            ohlcv: float64 open/high/low/close/volume, shape (n, 5)
+
+        Returns:
+            Number of candles appended
+
+        Raises:
+            ValueError: If the symbol name or the array shapes are invalid
+        """
+        directory = self._symbol_dir(symbol)
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        ohlcv = np.asarray(ohlcv, dtype=np.float64)
+        if ohlcv.shape != (len(timestamps), len(OHLCV_COLUMNS)):
+            raise ValueError(
+                f"ohlcv must have shape ({len(timestamps)}, 5), got {ohlcv.shape}"
+            )
+
+        series = sort_series(symbol, timestamps, ohlcv, Decimal(0))
+        timestamps, ohlcv = series.timestamps, series.ohlcv
+        keep = np.ones(len(timestamps), dtype=bool)
+        keep[1:] = timestamps[1:] != timestamps[:-1]
+        last = self.last_timestamp(symbol)
+        if last is not None:
+            keep &= timestamps > last
+        if not keep.all():
+            timestamps, ohlcv = timestamps[keep], ohlcv[keep]
+        if len(timestamps) == 0:
+            return 0
+
+        directory.mkdir(parents=True, exist_ok=True)
+        rows = self.rows(symbol)
+        # Drop a partial row left by an interrupted append, then OHLCV first:
+        # the timestamps written last are what make the rows visible
+        with open(directory / OHLCV_FILE, "ab") as ohlcv_file:
+            ohlcv_file.truncate(rows * ROW_BYTES)
+            ohlcv_file.write(np.ascontiguousarray(ohlcv).tobytes())
+        with open(directory / TIMESTAMP_FILE, "ab") as timestamp_file:
+            timestamp_file.truncate(rows * 8)
+            timestamp_file.write(np.ascontiguousarray(timestamps).tobytes())
+        return len(timestamps)
+
+    def append_series(self, series: CandleSeries) -> int:
+        """Append a CandleSeries (see append)."""
+        return self.append(series.symbol, series.timestamps, series.ohlcv)
+
+    def import_parquet(self, symbol: str, path: Union[str, Path]) -> int:
+        """
+        Append the candles of a Parquet file, one row group at a time.
+
+        The file needs timestamp/open/high/low/close/volume columns (as
+        written by scripts/generate_training_data.py). Columns are converted
+        from Arrow to NumPy directly, without building DataFrames.
+
+        Returns:
+            Number of candles appended
+        """
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        appended = 0
+        for group in range(parquet.num_row_groups):
+            table = parquet.read_row_group(group, columns=["timestamp", *OHLCV_COLUMNS])
+            timestamps = (
+                table.column("timestamp").to_numpy().astype("datetime64[ns]").astype(np.int64)
+            )
+            ohlcv = np.column_stack([table.column(name).to_numpy() for name in OHLCV_COLUMNS])
+            appended += self.append(symbol, timestamps, ohlcv)
+        return appended
+
+    def read(
+        self,
+        symbol: str,
+        start: Optional[Timestamp] = None,
+        end: Optional[Timestamp] = None,
+    ) -> CandleSeries:
+        """
+        Candles of a symbol in [start, end), as views of the mapped files.
+
+        Args:
+            symbol: Stored symbol
+            start: First timestamp included (ns, datetime or datetime64; None = first)
+            end: First timestamp excluded (None = after the last)
+
+        Returns:
+            Read-only CandleSeries (no data is copied)
+
+        Raises:
+            KeyError: If the symbol isn't stored
+        """
+        if symbol not in self:
+            raise KeyError(symbol)
+        mapped = self._mapped(symbol)
+        lo = 0 if start is None else int(np.searchsorted(mapped.timestamps, _to_ns(start)))
+        hi = (
+            mapped.rows
+            if end is None
+            else int(np.searchsorted(mapped.timestamps, _to_ns(end)))
+        )
+        return self._series(symbol, mapped, lo, max(lo, hi))
+
+    def window(self, symbol: str, end: Optional[Timestamp], length: int) -> CandleSeries:
+        """
+        The last `length` candles at or before `end` (None = latest).
+
+        Raises:
+            KeyError: If the symbol isn't stored
+        """
+        if symbol not in self:
+            raise KeyError(symbol)
+        mapped = self._mapped(symbol)
+        hi = (
+            mapped.rows
+            if end is None
+            else int(np.searchsorted(mapped.timestamps, _to_ns(end), side="right"))
+        )
+        return self._series(symbol, mapped, max(0, hi - length), hi)
+
+    @staticmethod
+    def _series(symbol: str, mapped: _Mapped, lo: int, hi: int) -> CandleSeries:
+        ohlcv = mapped.ohlcv[lo:hi]
+        latest_close = Decimal(repr(float(ohlcv[-1, 3]))) if hi > lo else Decimal(0)
+        return CandleSeries(symbol, mapped.timestamps[lo:hi], ohlcv, latest_close)
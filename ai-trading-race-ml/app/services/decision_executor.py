@@ -0,0 +1,176 @@
+"""Bounded execution of decision work off the event loop.
+
+Feature engineering and model inference are CPU-bound. Running them
+directly inside an `async def` handler blocks the uvicorn event loop, so
+`/health` and every other request stall behind a slow prediction. The
+executor sends that work to a bounded thread or process pool, rejects new
+work once the pool and its queue are full, and bounds how long a request
+waits for its result.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Optional
+
+from app import metrics
+from app.services.decision_service import DecisionService, create_decision_service
+
+logger = logging.getLogger(__name__)
+
+EXECUTION_INLINE = "inline"
+EXECUTION_THREAD = "thread"
+EXECUTION_PROCESS = "process"
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised when all workers are busy and the queue is full."""
+
+
+class DecisionTimeoutError(Exception):
+    """Raised when a decision doesn't complete within the request timeout."""
+
+
+# Per-process service used by process-pool workers
+_worker_service: Optional[DecisionService] = None
+
+
+def _init_worker(model_version: str) -> None:
+    """Process-pool initializer: load the model once per worker."""
+    global _worker_service
+    metrics.set_model_version(model_version)
+    _worker_service = create_decision_service(model_version)
+
+
+def _run_in_worker(method: str, *args: Any) -> Any:
+    """Call a DecisionService method inside a process-pool worker."""
+    return getattr(_worker_service, method)(*args)
+
+
+class DecisionExecutor:
+    """
+    Runs DecisionService methods inline, in a thread pool, or in a process pool.
+
+    At most `max_workers + max_queue` calls are in flight at once; beyond
+    that `run` raises ExecutorSaturatedError so the caller can shed load.
+    A call that times out keeps its slot until the worker actually finishes.
+    """
+
+    def __init__(
+        self,
+        service: DecisionService,
+        mode: str = EXECUTION_THREAD,
+        max_workers: int = 4,
+        max_queue: int = 16,
+        timeout_seconds: Optional[float] = 30.0,
+    ):
+        """Initialize the executor.
+
+        Args:
+            service: Decision service used inline and by thread workers
+            mode: "inline", "thread" or "process"
+            max_workers: Number of pool workers
+            max_queue: Calls allowed to wait for a worker before rejecting
+            timeout_seconds: Max time a caller waits for a result (None = no limit)
+        """
+        if mode not in (EXECUTION_INLINE, EXECUTION_THREAD, EXECUTION_PROCESS):
+            raise ValueError(f"Unknown execution mode: {mode}")
+
+        self.service = service
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout_seconds = timeout_seconds
+        self._in_flight = 0
+        self._pool: Optional[Executor] = self._create_pool()
+
+    def _create_pool(self) -> Optional[Executor]:
+        """Build the pool for the execution mode (None when inline)."""
+        if self.mode == EXECUTION_THREAD:
+            return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="decision")
+        if self.mode == EXECUTION_PROCESS:
+            # Spawn (not fork) so workers don't inherit the event loop's threads
+            return ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.service.model_version,),
+            )
+        return None
+
+    @property
+    def capacity(self) -> int:
+        """Max number of calls running or queued at once."""
+        return self.max_workers + self.max_queue
+
+    @property
+    def in_flight(self) -> int:
+        """Number of calls currently running or queued."""
+        return self._in_flight
+
+    async def run(self, method: str, *args: Any) -> Any:
+        """
+        Call a DecisionService method according to the execution mode.
+
+        Args:
+            method: Name of the DecisionService method, e.g. "generate_decision"
+            *args: Arguments for the method (must be picklable in process mode)
+
+        Returns:
+            The method's return value
+
+        Raises:
+            ExecutorSaturatedError: If the pool and its queue are full
+            DecisionTimeoutError: If the result isn't ready within the timeout
+        """
+        if self._pool is None:
+            return getattr(self.service, method)(*args)
+
+        if self._in_flight >= self.capacity:
+            raise ExecutorSaturatedError(
+                f"Decision pool saturated ({self._in_flight} calls in flight)"
+            )
+
+        loop = asyncio.get_running_loop()
+        if self.mode == EXECUTION_PROCESS:
+            future = loop.run_in_executor(self._pool, _run_in_worker, method, *args)
+        else:
+            future = loop.run_in_executor(self._pool, getattr(self.service, method), *args)
+
+        self._in_flight += 1
+        future.add_done_callback(self._release)
+
+        try:
+            # shield: a timed-out caller must not cancel the bookkeeping future
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            raise DecisionTimeoutError(
+                f"Decision not ready after {self.timeout_seconds}s"
+            ) from None
+
+    def _release(self, future: asyncio.Future) -> None:
+        """Free a slot once the worker finishes (runs on the event loop)."""
+        self._in_flight -= 1
+        if not future.cancelled() and future.exception() is not None:
+            # Retrieved here so abandoned (timed-out) calls don't warn on GC
+            logger.debug(f"Decision call failed: {future.exception()}")
+
+    def recycle_workers(self) -> None:
+        """
+        Start fresh process workers, e.g. after the model file changed.
+
+        New calls go to the new pool; calls already submitted to the old one
+        finish there. Thread and inline modes share the service object, so
+        they need no recycling.
+        """
+        if self.mode != EXECUTION_PROCESS or self._pool is None:
+            return
+        old_pool, self._pool = self._pool, self._create_pool()
+        old_pool.shutdown(wait=False)
+
+    def shutdown(self) -> None:
+        """Stop the pool without waiting for abandoned calls."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
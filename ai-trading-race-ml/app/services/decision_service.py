@@ -3,35 +3,141 @@
 Converts market data to features, runs prediction, and generates trading decisions.
 """
 
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from decimal import Decimal
+from pathlib import Path
 from typing import Optional
 
-import pandas as pd
+import numpy as np
 
 from app.config import settings
-from app.ml.features import get_feature_values, prepare_inference_features
-from app.ml.predictor import PredictedAction, TradingPredictor
+from app.metrics import (
+    STAGE_CANDLES,
+    STAGE_FEATURES,
+    SYMBOL_FEATURE_DURATION,
+    observe_stage,
+    record_decision,
+    symbol_label,
+)
+from app.ml.feature_engine import latest_features
+from app.ml.features import InferenceFeatures, inference_features_from_row
+from app.ml.predictor import PredictedAction, PredictionResult, TradingPredictor
+from app.ml.streaming_features import StreamingFeatureStore
 from app.models.enums import TradeSide
 from app.models.schemas import (
     AgentContextRequest,
     AgentDecisionResponse,
-    CandleData,
     ExplanationSignal,
     TradeOrderResponse,
 )
+from app.services.candle_series import CandleSeries, context_series
+from app.services.feature_cache import FeatureCache
+
+
+# Candles needed for basic indicators
+MIN_CANDLES = 7
+
+# Order sizing: up to 10% of portfolio value, scaled by confidence (capped)
+BASE_POSITION_FRACTION = Decimal("0.1")
+MAX_SIZING_CONFIDENCE = 0.9
+MIN_ORDER_QUANTITY = Decimal("0.00001")
+QUANTITY_STEP = Decimal("0.00000001")
+
+
+def order_quantity(
+    confidence: float,
+    portfolio_value: Decimal,
+    price: Decimal,
+    position_fraction: Decimal = BASE_POSITION_FRACTION,
+    max_confidence: float = MAX_SIZING_CONFIDENCE,
+) -> Optional[Decimal]:
+    """
+    Quantity to trade for a prediction, as sized for live decisions.
+
+    Args:
+        confidence: Model confidence of the predicted action
+        portfolio_value: Total portfolio value
+        price: Price the order is sized at
+        position_fraction: Fraction of portfolio value at full confidence
+        max_confidence: Confidence above which orders don't grow
+
+    Returns:
+        Quantity rounded to 8 decimals, or None if the price is invalid or
+        the quantity is below the minimum
+    """
+    # Calculate position size based on confidence
+    size_multiplier = Decimal(str(min(confidence, max_confidence)))
+    trade_value = portfolio_value * position_fraction * size_multiplier
+
+    if price <= 0:
+        return None
+
+    quantity = trade_value / price
+
+    # Ensure minimum quantity
+    if quantity < MIN_ORDER_QUANTITY:
+        return None
+    return quantity.quantize(QUANTITY_STEP)
 
 
 class DecisionService:
     """Orchestrates the ML prediction pipeline."""
 
-    def __init__(self, predictor: TradingPredictor):
+    def __init__(
+        self,
+        predictor: TradingPredictor,
+        feature_store: Optional[StreamingFeatureStore] = None,
+        feature_cache: Optional[FeatureCache] = None,
+        feature_workers: int = 1,
+        model_version: str = settings.model_version,
+    ):
         """Initialize with a predictor instance.
 
         Args:
             predictor: The ML predictor to use for decisions
+            feature_store: Optional streaming indicator state; when set,
+                features are updated incrementally from new candles only
+            feature_cache: Optional content-addressed cache of computed
+                features (unused when a feature store is set, since streamed
+                features depend on more than the window contents)
+            feature_workers: Threads computing features for independent
+                symbols concurrently (1 = one after another)
+            model_version: Version reported in decisions made by `predictor`
         """
-        self.predictor = predictor
+        # Predictor and its version, swapped together (see swap_model)
+        self._model: tuple[TradingPredictor, str] = (predictor, model_version)
+        self.feature_store = feature_store
+        self.feature_cache = feature_cache
+        self._feature_pool = (
+            ThreadPoolExecutor(max_workers=feature_workers, thread_name_prefix="features")
+            if feature_workers > 1
+            else None
+        )
+
+    @property
+    def predictor(self) -> TradingPredictor:
+        """The predictor serving decisions."""
+        return self._model[0]
+
+    @property
+    def model_version(self) -> str:
+        """Version of the predictor serving decisions."""
+        return self._model[1]
+
+    def swap_model(self, predictor: TradingPredictor, model_version: str) -> None:
+        """
+        Replace the predictor and its version in one assignment.
+
+        Decisions already running finish with the model they started with,
+        and report its version.
+
+        Args:
+            predictor: New predictor
+            model_version: Version to report for it
+        """
+        self._model = (predictor, model_version)
 
     def generate_decision(self, context: AgentContextRequest) -> AgentDecisionResponse:
         """
@@ -43,34 +149,76 @@ class DecisionService:
         Returns:
             AgentDecisionResponse with orders and explanation signals
         """
-        orders: list[TradeOrderResponse] = []
-        all_signals: list[ExplanationSignal] = []
-        reasoning_parts: list[str] = []
+        return self.generate_decisions([context])[0]
+
+    def generate_decisions(
+        self, contexts: list[AgentContextRequest]
+    ) -> list[AgentDecisionResponse]:
+        """
+        Generate trading decisions for many agents with one model call.
 
-        # Process each asset (BTC, ETH)
-        for symbol in ["BTC", "ETH"]:
-            symbol_candles = [c for c in context.candles if c.symbol == symbol]
+        Each context's candles (row or columnar) are grouped by symbol in
+        one pass. Candle series shared between agents are only featurized
+        once, and all feature rows are stacked into a single matrix for the
+        predictor.
 
-            if len(symbol_candles) < 7:
-                # Not enough data for basic indicators
-                continue
+        Args:
+            contexts: Requests with portfolio state and market candles
+
+        Returns:
+            One AgentDecisionResponse per context, in input order
+        """
+        # Unique candle series, in first-seen order
+        series_index: dict[tuple[str, bytes], int] = {}
+        unique_series: list[tuple[CandleSeries, bytes]] = []
+        # Per context: (symbol, unique series index, latest close) to predict on
+        plans: list[list[tuple[str, int, Decimal]]] = []
+
+        for context in contexts:
+            plan: list[tuple[str, int, Decimal]] = []
+
+            start = time.perf_counter()
+            all_series = context_series(context)
+            observe_stage(STAGE_CANDLES, time.perf_counter() - start)
+
+            for series in all_series:
+                if len(series) < MIN_CANDLES:
+                    # Not enough data for basic indicators
+                    continue
+
+                content_key = series.content_key()
+                key = (series.symbol, content_key)
+                if key not in series_index:
+                    series_index[key] = len(unique_series)
+                    unique_series.append((series, content_key))
+                plan.append((series.symbol, series_index[key], series.latest_close))
 
-            # Convert to DataFrame
-            df = self._candles_to_dataframe(symbol_candles)
+            plans.append(plan)
 
-            try:
-                # Get features
-                features = prepare_inference_features(df)
-                feature_values = get_feature_values(df)
-            except ValueError:
-                # Skip if feature computation fails
+        # Features per unique series (None if unusable), possibly concurrently
+        extracted = self._featurize_all(unique_series)
+        rows: list[Optional[int]] = []
+        feature_rows: list[np.ndarray] = []
+        feature_dicts: list[dict[str, float]] = []
+        for item in extracted:
+            if item is None:
+                rows.append(None)
                 continue
+            rows.append(len(feature_rows))
+            feature_rows.append(item.features)
+            feature_dicts.append(item.values)
 
-            # Run prediction
-            result = self.predictor.predict(features, feature_values)
+        # Run prediction once for the whole batch, with one model throughout
+        predictor, model_version = self._model
+        results = (
+            predictor.predict_batch(np.vstack(feature_rows), feature_dicts)
+            if feature_rows
+            else []
+        )
 
-            # Convert signals to schema objects
-            signals = [
+        # Convert signals to schema objects (once per unique series)
+        row_signals = [
+            [
                 ExplanationSignal(
                     feature=s["feature"],
                     value=s["value"],
@@ -80,11 +228,89 @@ class DecisionService:
                 )
                 for s in result.signals
             ]
-            all_signals.extend(signals)
+            for result in results
+        ]
+
+        responses = []
+        for context, plan in zip(contexts, plans):
+            # Symbols with a prediction row (enough candles for features)
+            symbol_rows: list[tuple[str, int, Decimal]] = []
+            for symbol, index, latest_close in plan:
+                row = rows[index]
+                if row is not None:
+                    symbol_rows.append((symbol, row, latest_close))
+            responses.append(
+                self._build_response(context, symbol_rows, results, row_signals, model_version)
+            )
+        return responses
+
+    def _featurize_all(
+        self, unique_series: list[tuple[CandleSeries, bytes]]
+    ) -> list[Optional[InferenceFeatures]]:
+        """Featurize every unique series, on the feature pool if there is one."""
+        if self._feature_pool is None or len(unique_series) < 2:
+            return [self._featurize(series, key) for series, key in unique_series]
+        return list(
+            self._feature_pool.map(lambda item: self._featurize(*item), unique_series)
+        )
+
+    def _featurize(self, series: CandleSeries, content_key: bytes) -> Optional[InferenceFeatures]:
+        """Compute features for one candle series.
+
+        Returns:
+            InferenceFeatures, or None if features can't be computed
+        """
+        start = time.perf_counter()
+        try:
+            # Get model input and explanation values from one computation
+            return self._extract_features(series, content_key)
+        except ValueError:
+            # Skip if feature computation fails
+            return None
+        finally:
+            elapsed = time.perf_counter() - start
+            observe_stage(STAGE_FEATURES, elapsed)
+            SYMBOL_FEATURE_DURATION.labels(symbol_label(series.symbol)).observe(elapsed)
+
+    def _extract_features(self, series: CandleSeries, content_key: bytes) -> InferenceFeatures:
+        """Compute the latest features, incrementally or from cache if configured."""
+        if self.feature_store is not None:
+            return inference_features_from_row(
+                self.feature_store.latest_features(
+                    series.symbol, series.timestamps, series.close, series.volume
+                )
+            )
+
+        def compute() -> InferenceFeatures:
+            return inference_features_from_row(latest_features(series.close, series.volume))
+
+        if self.feature_cache is not None:
+            return self.feature_cache.get_or_compute(content_key, compute)
+        return compute()
+
+    def _build_response(
+        self,
+        context: AgentContextRequest,
+        plan: list[tuple[str, int, Decimal]],
+        results: list[PredictionResult],
+        row_signals: list[list[ExplanationSignal]],
+        model_version: str,
+    ) -> AgentDecisionResponse:
+        """Turn the predictions for one agent into its decision response."""
+        orders: list[TradeOrderResponse] = []
+        all_signals: list[ExplanationSignal] = []
+        reasoning_parts: list[str] = []
+
+        for symbol, row, latest_close in plan:
+            result = results[row]
+            all_signals.extend(row_signals[row])
+            record_decision(symbol, result.action.name)
 
             # Generate order if not HOLD
             if result.action != PredictedAction.HOLD:
-                order = self._create_order(result.action, result.confidence, symbol, context)
+                order = self._create_order(
+                    result.action, result.confidence, symbol, latest_close, context
+                )
                 if order:
                     orders.append(order)
                     reasoning_parts.append(
@@ -95,63 +321,75 @@ class DecisionService:
         return AgentDecisionResponse(
             request_id=context.request_id,
             agent_id=context.agent_id,
+            model_version=model_version,
             created_at=datetime.now(timezone.utc),
             orders=orders,
             signals=all_signals,
             reasoning="; ".join(reasoning_parts) if reasoning_parts else "No trading signals",
         )
 
-    def _candles_to_dataframe(self, candles: list[CandleData]) -> pd.DataFrame:
-        """Convert candle data to pandas DataFrame."""
-        data = [
-            {
-                "timestamp": c.timestamp,
-                "open": float(c.open),
-                "high": float(c.high),
-                "low": float(c.low),
-                "close": float(c.close),
-                "volume": float(c.volume),
-            }
-            for c in candles
-        ]
-        return pd.DataFrame(data).sort_values("timestamp")
+    def close(self) -> None:
+        """Stop the feature thread pool."""
+        if self._feature_pool is not None:
+            self._feature_pool.shutdown(wait=False)
+            self._feature_pool = None
 
     def _create_order(
         self,
         action: PredictedAction,
         confidence: float,
         symbol: str,
+        current_price: Decimal,
         context: AgentContextRequest,
     ) -> Optional[TradeOrderResponse]:
-        """Create a trade order based on prediction."""
-        # Calculate position size based on confidence
-        base_size = Decimal("0.1")  # 10% of portfolio
-        size_multiplier = Decimal(str(min(confidence, 0.9)))
-
-        portfolio_value = context.portfolio.total_value
-        trade_value = portfolio_value * base_size * size_multiplier
-
-        # Get current price from latest candle
-        latest_candle = next(
-            (c for c in reversed(context.candles) if c.symbol == symbol),
-            None,
-        )
-        if not latest_candle:
-            return None
-
-        current_price = latest_candle.close
-        if current_price <= 0:
-            return None
-
-        quantity = trade_value / current_price
-
-        # Ensure minimum quantity
-        if quantity < Decimal("0.00001"):
+        """Create a trade order sized from the symbol's latest close."""
+        quantity = order_quantity(confidence, context.portfolio.total_value, current_price)
+        if quantity is None:
             return None
 
         return TradeOrderResponse(
             asset_symbol=symbol,
             side=TradeSide.BUY if action == PredictedAction.BUY else TradeSide.SELL,
-            quantity=quantity.quantize(Decimal("0.00000001")),
+            quantity=quantity,
             limit_price=None,
         )
+
+
+def create_predictor() -> TradingPredictor:
+    """Load the configured model with the configured backend."""
+    return TradingPredictor(
+        Path(settings.model_path),
+        backend=settings.predictor_backend,
+        arrays_path=Path(settings.model_arrays_path) if settings.model_arrays_path else None,
+    )
+
+
+def create_decision_service(model_version: Optional[str] = None) -> DecisionService:
+    """
+    Build a DecisionService (predictor, feature store/cache) from settings.
+
+    Args:
+        model_version: Version reported for the loaded model (default:
+            settings.model_version)
+    """
+    predictor = create_predictor()
+    feature_store = (
+        StreamingFeatureStore(max_series=settings.streaming_features_max_series)
+        if settings.streaming_features_enabled
+        else None
+    )
+    feature_cache = (
+        FeatureCache(
+            max_bytes=settings.feature_cache_max_bytes,
+            ttl_seconds=settings.feature_cache_ttl_seconds,
+        )
+        if settings.feature_cache_enabled
+        else None
+    )
+    return DecisionService(
+        predictor,
+        feature_store=feature_store,
+        feature_cache=feature_cache,
+        feature_workers=settings.feature_workers,
+        model_version=model_version or settings.model_version,
+    )
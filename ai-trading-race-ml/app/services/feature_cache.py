@@ -0,0 +1,83 @@
+"""Content-addressed cache for computed inference features.
+
+Agents in the same race usually send identical candle histories, so the
+latest feature row is cached under a hash of the candle arrays themselves
+(timestamps + OHLCV) instead of being recomputed for every agent.
+"""
+
+import hashlib
+import sys
+from typing import Callable
+
+import numpy as np
+
+from app.ml.features import InferenceFeatures
+from app.services.lru_cache import CacheStats, LRUCache
+
+
+def _entry_size(entry: InferenceFeatures) -> int:
+    """Approximate memory held by a cached entry."""
+    return (
+        entry.features.nbytes
+        + sys.getsizeof(entry.values)
+        + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in entry.values.items())
+    )
+
+
+class FeatureCache:
+    """LRU + TTL cache of InferenceFeatures keyed by candle content."""
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        """Initialize the cache.
+
+        Args:
+            max_bytes: Memory bound for cached feature entries
+            ttl_seconds: How long an entry stays valid
+        """
+        self._cache: LRUCache[InferenceFeatures] = LRUCache(
+            ttl_seconds=ttl_seconds, max_bytes=max_bytes, sizeof=_entry_size
+        )
+
+    @staticmethod
+    def key_for(timestamps: np.ndarray, ohlcv: np.ndarray) -> bytes:
+        """
+        Hash a candle series by content.
+
+        Args:
+            timestamps: int64 timestamps, oldest first
+            ohlcv: float64 array of shape (n, 5) with open/high/low/close/volume
+
+        Returns:
+            16-byte digest identifying the series
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.ascontiguousarray(timestamps, dtype=np.int64).data)
+        digest.update(np.ascontiguousarray(ohlcv, dtype=np.float64).data)
+        return digest.digest()
+
+    def get_or_compute(
+        self, key: bytes, compute: Callable[[], InferenceFeatures]
+    ) -> InferenceFeatures:
+        """
+        Return cached features for a key, computing and storing them on a miss.
+
+        Errors raised by `compute` (e.g. not enough data) are not cached.
+        """
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        result = compute()
+        # Entries are shared between requests, so make the array read-only
+        result.features.flags.writeable = False
+        self._cache.set(key, result)
+        return result
+
+    @property
+    def stats(self) -> CacheStats:
+        """Hit/miss/eviction counters."""
+        return self._cache.stats
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        self._cache.clear()
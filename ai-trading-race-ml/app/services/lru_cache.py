@@ -0,0 +1,146 @@
+"""Thread-safe in-process LRU cache with TTL and size bounds."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, NamedTuple, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+class CacheStats(NamedTuple):
+    """Counters for an LRUCache."""
+
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    entries: int
+    size_bytes: int
+
+
+class _Entry(NamedTuple):
+    value: object
+    expires_at: float
+    size: int
+
+
+class LRUCache(Generic[V]):
+    """
+    Least-recently-used cache with per-entry expiry.
+
+    Entries are evicted oldest-first once either bound is exceeded:
+    `max_entries` (entry count) or `max_bytes` (sum of `sizeof(value)`).
+    Expired entries are dropped lazily when read, or when space is needed.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[V], int] = lambda value: 0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize the cache.
+
+        Args:
+            ttl_seconds: Default time-to-live for entries
+            max_entries: Max number of entries (None = unbounded)
+            max_bytes: Max total size as measured by `sizeof` (None = unbounded)
+            sizeof: Estimated size of a value in bytes
+            clock: Monotonic time source (injectable for tests)
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            if entry.expires_at <= self._clock():
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry.value  # type: ignore[return-value]
+
+    def set(self, key: Hashable, value: V, ttl_seconds: Optional[float] = None) -> None:
+        """Store a value, evicting least recently used entries if needed."""
+        size = self._sizeof(value)
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(value, self._clock() + ttl, size)
+            self._size += size
+            self._evict()
+
+    def delete(self, key: Hashable) -> bool:
+        """Remove an entry. Returns True if it was present."""
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            return True
+
+    def clear(self) -> None:
+        """Remove all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        """Snapshot of hit/miss/eviction counters."""
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                expirations=self._expirations,
+                entries=len(self._entries),
+                size_bytes=self._size,
+            )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._size -= entry.size
+
+    def _over_capacity(self) -> bool:
+        return (self.max_entries is not None and len(self._entries) > self.max_entries) or (
+            self.max_bytes is not None and self._size > self.max_bytes
+        )
+
+    def _evict(self) -> None:
+        if not self._over_capacity():
+            return
+
+        # Prefer dropping already-expired entries over live ones
+        now = self._clock()
+        for key in [k for k, e in self._entries.items() if e.expires_at <= now]:
+            self._remove(key)
+            self._expirations += 1
+
+        while self._entries and self._over_capacity():
+            _, entry = self._entries.popitem(last=False)
+            self._size -= entry.size
+            self._evictions += 1
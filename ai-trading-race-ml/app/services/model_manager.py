@@ -0,0 +1,153 @@
+"""Hot model reloading without restarting workers.
+
+`ModelManager` loads a new model file off the event loop, checks that it
+takes the feature vector the service produces, warms it, and only then
+swaps it and its version into the DecisionService with a single attribute
+assignment. Requests already running keep the predictor they started with
+and report its version.
+"""
+
+import asyncio
+import logging
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+from app import metrics
+from app.config import settings
+from app.ml.features import FEATURE_COLUMNS
+from app.ml.predictor import TradingPredictor, model_fingerprint
+from app.services.decision_service import DecisionService, create_predictor
+
+logger = logging.getLogger(__name__)
+
+
+class ModelReloadError(Exception):
+    """Raised when a new model can't be loaded or doesn't fit the service."""
+
+
+class ReloadResult(NamedTuple):
+    """Outcome of a reload attempt."""
+
+    reloaded: bool  # False if the model file hadn't changed
+    model_version: str
+    n_features: Optional[int]  # None if unknown (rule-based fallback serving)
+
+
+class ModelManager:
+    """Loads, validates and atomically swaps the service's predictor."""
+
+    def __init__(
+        self,
+        service: DecisionService,
+        model_version: str,
+        on_swap: Optional[Callable[[], None]] = None,
+    ):
+        """Initialize the manager.
+
+        Args:
+            service: Decision service whose predictor is replaced
+            model_version: Version of the currently loaded model
+            on_swap: Called after each swap (e.g. to recycle process workers)
+        """
+        self.service = service
+        self.model_version = model_version
+        self.on_swap = on_swap
+        self._lock = asyncio.Lock()
+        self._watch_task: Optional[asyncio.Task] = None
+        self._fingerprint = self._current_fingerprint()
+
+    @property
+    def predictor(self) -> TradingPredictor:
+        """The predictor currently serving requests."""
+        return self.service.predictor
+
+    @property
+    def model_path(self) -> Path:
+        return Path(settings.model_path)
+
+    def _current_fingerprint(self) -> Optional[dict]:
+        """Fingerprint of the model file on disk, or None if it's missing."""
+        try:
+            return model_fingerprint(self.model_path)
+        except OSError:
+            return None
+
+    async def reload(
+        self, force: bool = False, model_version: Optional[str] = None
+    ) -> ReloadResult:
+        """
+        Load the model file again and swap it in if it changed.
+
+        Args:
+            force: Reload even if the file looks unchanged
+            model_version: Version to report for the new model (default: keep)
+
+        Returns:
+            ReloadResult describing the serving model
+
+        Raises:
+            ModelReloadError: If the file is missing, can't be loaded or has
+                the wrong number of features (the old model keeps serving)
+        """
+        async with self._lock:
+            fingerprint = self._current_fingerprint()
+            if fingerprint is None:
+                raise ModelReloadError(f"Model file not found: {self.model_path}")
+            if not force and fingerprint == self._fingerprint:
+                return ReloadResult(False, self.model_version, self.predictor.n_features)
+
+            # Load and warm in a thread so requests keep being served meanwhile
+            predictor = await asyncio.to_thread(self._load)
+
+            if model_version:
+                self.model_version = model_version
+            self.service.swap_model(predictor, self.model_version)
+            self._fingerprint = fingerprint
+            metrics.set_model_version(self.model_version)
+            logger.info(f"Swapped in model {self.model_path} (version {self.model_version})")
+
+            if self.on_swap is not None:
+                self.on_swap()
+            return ReloadResult(True, self.model_version, predictor.n_features)
+
+    def _load(self) -> TradingPredictor:
+        """Build, validate and warm a predictor for the current model file."""
+        try:
+            predictor = create_predictor()
+        except Exception as e:
+            raise ModelReloadError(f"Can't load model {self.model_path}: {e}") from e
+
+        if not predictor.is_loaded:
+            raise ModelReloadError(f"Can't load model {self.model_path}")
+        if predictor.n_features != len(FEATURE_COLUMNS):
+            raise ModelReloadError(
+                f"Model expects {predictor.n_features} features, "
+                f"the service produces {len(FEATURE_COLUMNS)}"
+            )
+
+        predictor.warm_up()
+        return predictor
+
+    def start_watching(self, interval_seconds: float) -> None:
+        """Poll the model file and reload it whenever it changes."""
+        if self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch(interval_seconds))
+
+    async def _watch(self, interval_seconds: float) -> None:
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.reload()
+            except ModelReloadError as e:
+                # Keep serving the old model; retried on the next poll
+                logger.error(f"Model reload failed: {e}")
+
+    async def stop(self) -> None:
+        """Stop watching the model file."""
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
@@ -0,0 +1,252 @@
+"""Offline races of many agents over the same market history.
+
+The API scores one agent per request. A race instead runs hundreds of
+agent configurations (model version, sizing, confidence threshold,
+decision interval) over a shared history and ranks them by PnL:
+
+1. The candles are read from a CandleStore, which every worker process
+   memory-maps in its initializer, so all processes share one copy of the
+   market data through the page cache.
+2. Every distinct model predicts every bar once (see
+   backtest.predict_history), in one worker of a process pool, and its
+   predictions are saved as .npy files.
+3. Agents are split into chunks across the pool. A worker memory-maps the
+   predictions of its agents' models and simulates each agent from them,
+   with the order sizing and portfolio accounting of live decisions.
+4. The per-agent results are collected into a leaderboard.
+
+Predictions are the expensive step and don't depend on the agent's
+parameters, so a sweep of many configurations of a few models costs little
+more than predicting each model once, however many workers simulate them.
+Different models are predicted in parallel.
+"""
+
+import json
+import logging
+import math
+import multiprocessing
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.ml.predictor import BACKEND_SKLEARN, TradingPredictor
+from app.services.backtest import BacktestConfig, BarPredictions, predict_history, simulate
+from app.services.candle_series import CandleSeries
+from app.services.candle_store import CandleStore
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_COLUMNS = [
+    "rank", "agent_id", "model", "final_equity", "pnl", "total_return",
+    "max_drawdown", "trades", "rejected_orders",
+]
+
+
+class RaceAgent(NamedTuple):
+    """One simulated agent: a model and its trading parameters."""
+
+    agent_id: str
+    model_path: str
+    config: BacktestConfig = BacktestConfig()
+    backend: str = BACKEND_SKLEARN
+
+
+class RaceResult(NamedTuple):
+    """Ranked agents and throughput of a race."""
+
+    leaderboard: pd.DataFrame  # One row per agent, best PnL first
+    equity: dict[str, np.ndarray]  # Agent id -> equity curve (if kept)
+    stats: dict
+
+
+# BarPredictions fields saved as .npy files (the others go in PREDICTIONS_FILE)
+PREDICTION_ARRAYS = ("timestamps", "close", "action", "confidence")
+PREDICTIONS_FILE = "predictions.json"
+
+# Per-process market data and predictions, shared by every agent a worker runs
+_worker_series: list[CandleSeries] = []
+_worker_predictions: dict[tuple[str, str], BarPredictions] = {}
+# Directory of each model's saved predictions (models without one are predicted here)
+_worker_prediction_dirs: dict[tuple[str, str], str] = {}
+
+
+def _market_series(store_dir: str) -> list[CandleSeries]:
+    """Every symbol of a candle store, memory-mapped."""
+    store = CandleStore(store_dir)
+    return [store.read(symbol) for symbol in store.symbols()]
+
+
+def _init_worker(
+    store_dir: str, prediction_dirs: Optional[dict[tuple[str, str], str]] = None
+) -> None:
+    """Process-pool initializer: map the market data once per worker."""
+    global _worker_series
+    _worker_series = _market_series(store_dir)
+    _worker_predictions.clear()
+    _worker_prediction_dirs.clear()
+    _worker_prediction_dirs.update(prediction_dirs or {})
+
+
+def _predict_model(model_path: str, backend: str) -> BarPredictions:
+    """Predictions of a model over the market data of this process."""
+    predictor = TradingPredictor(Path(model_path), backend=backend)
+    if not predictor.is_loaded:
+        logger.warning(f"No model at {model_path}, racing the rule-based fallback")
+    return predict_history(predictor, _worker_series)
+
+
+def _save_predictions(model_path: str, backend: str, directory: str) -> None:
+    """Predict a model once and save the predictions for every worker to map."""
+    predictions = _predict_model(model_path, backend)
+    path = Path(directory)
+    path.mkdir(parents=True)
+    for name in PREDICTION_ARRAYS:
+        np.save(path / f"{name}.npy", getattr(predictions, name))
+    metadata = {
+        name: getattr(predictions, name)
+        for name in BarPredictions._fields
+        if name not in PREDICTION_ARRAYS
+    }
+    (path / PREDICTIONS_FILE).write_text(json.dumps(metadata))
+
+
+def _load_predictions(directory: str) -> BarPredictions:
+    """Predictions written by `_save_predictions`, memory-mapped read-only."""
+    path = Path(directory)
+    metadata = json.loads((path / PREDICTIONS_FILE).read_text())
+    arrays = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in PREDICTION_ARRAYS}
+    return BarPredictions(**metadata, **arrays)
+
+
+def _predictions_for(model_path: str, backend: str) -> BarPredictions:
+    """Predictions of a model, mapped from its saved files or computed here."""
+    key = (model_path, backend)
+    if key not in _worker_predictions:
+        directory = _worker_prediction_dirs.get(key)
+        _worker_predictions[key] = (
+            _load_predictions(directory)
+            if directory is not None
+            else _predict_model(model_path, backend)
+        )
+    return _worker_predictions[key]
+
+
+def _run_agents(
+    agents: list[RaceAgent], keep_equity: bool
+) -> list[tuple[dict, Optional[np.ndarray]]]:
+    """Simulate a chunk of agents in the current process."""
+    results = []
+    for agent in agents:
+        result = simulate(_predictions_for(agent.model_path, agent.backend), agent.config)
+        starting = float(agent.config.starting_cash)
+        row = {
+            "agent_id": agent.agent_id,
+            "model": agent.model_path,
+            "final_equity": result.stats["final_equity"],
+            "pnl": result.stats["final_equity"] - starting,
+            "total_return": result.stats["total_return"],
+            "max_drawdown": result.stats["max_drawdown"],
+            "trades": result.stats["trades"],
+            "rejected_orders": result.stats["rejected_buys"] + result.stats["rejected_sells"],
+        }
+        results.append((row, result.equity if keep_equity else None))
+    return results
+
+
+def _chunk_agents(agents: list[RaceAgent], workers: int) -> list[list[RaceAgent]]:
+    """
+    Split agents into one work unit per worker.
+
+    Predictions are shared, so any split works; agents of a model are kept
+    next to each other so a worker maps as few models' predictions as
+    possible.
+    """
+    by_model: dict[tuple[str, str], list[RaceAgent]] = {}
+    for agent in agents:
+        by_model.setdefault((agent.model_path, agent.backend), []).append(agent)
+    ordered = [agent for group in by_model.values() for agent in group]
+    if not ordered:
+        return []
+
+    size = math.ceil(len(ordered) / max(1, workers))
+    return [ordered[i:i + size] for i in range(0, len(ordered), size)]
+
+
+def run_race(
+    agents: list[RaceAgent],
+    store_dir: Path,
+    workers: int = 1,
+    keep_equity: bool = False,
+) -> RaceResult:
+    """
+    Run every agent over the market data and rank them by PnL.
+
+    Args:
+        agents: Agents to race (ids must be unique)
+        store_dir: CandleStore directory with the market's symbols
+        workers: Worker processes (1 runs in this process)
+        keep_equity: Return each agent's equity curve
+
+    Returns:
+        RaceResult with the leaderboard and throughput statistics
+
+    Raises:
+        ValueError: If agent ids aren't unique
+    """
+    if len({agent.agent_id for agent in agents}) != len(agents):
+        raise ValueError("Agent ids must be unique")
+
+    start = time.perf_counter()
+    models = list(dict.fromkeys((agent.model_path, agent.backend) for agent in agents))
+    chunks = _chunk_agents(agents, workers)
+    results: list[tuple[dict, Optional[np.ndarray]]] = []
+
+    if workers <= 1:
+        _init_worker(str(store_dir))
+        for chunk in chunks:
+            results.extend(_run_agents(chunk, keep_equity))
+        bars = sum(len(s) for s in _worker_series)
+    else:
+        with tempfile.TemporaryDirectory(prefix="race-predictions-") as scratch:
+            prediction_dirs = {key: str(Path(scratch) / str(i)) for i, key in enumerate(models)}
+            # Spawn (not fork) so workers start clean and map the data themselves
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(str(store_dir), prediction_dirs),
+            ) as pool:
+                # Each model is predicted once; every simulation maps its files
+                saves = [
+                    pool.submit(_save_predictions, *key, prediction_dirs[key]) for key in models
+                ]
+                for save in saves:
+                    save.result()
+                futures = [pool.submit(_run_agents, chunk, keep_equity) for chunk in chunks]
+                for future in futures:
+                    results.extend(future.result())
+        bars = sum(len(s) for s in _market_series(str(store_dir)))
+
+    wall_seconds = time.perf_counter() - start
+    leaderboard = pd.DataFrame([row for row, _ in results], columns=LEADERBOARD_COLUMNS[1:])
+    leaderboard = leaderboard.sort_values(
+        ["pnl", "agent_id"], ascending=[False, True], ignore_index=True
+    )
+    leaderboard.insert(0, "rank", np.arange(1, len(leaderboard) + 1))
+
+    stats = {
+        "agents": len(agents),
+        "models": len(models),
+        "workers": workers,
+        "chunks": len(chunks),
+        "bars": bars,
+        "wall_seconds": round(wall_seconds, 3),
+        "agents_per_second": round(len(agents) / wall_seconds, 2) if wall_seconds else None,
+    }
+    equity = {row["agent_id"]: curve for row, curve in results if curve is not None}
+    return RaceResult(leaderboard, equity, stats)
@@ -0,0 +1,209 @@
+"""Sliding-window rate limiting with in-process or Redis-backed counters.
+
+The in-memory backend keeps counters per worker, so N workers allow N times
+the configured rate. The Redis backend shares one sliding window per key
+across every worker and host: a Lua script trims, counts and records the
+request atomically in a single round trip, using the Redis server clock.
+"""
+
+import logging
+import math
+import re
+import time
+import uuid
+from collections import defaultdict, deque
+from typing import NamedTuple
+
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+KEY_IP = "ip"
+KEY_API_KEY = "api_key"
+KEY_AGENT_ID = "agent_id"
+
+# In-memory backend: sweep idle keys once this many are tracked
+MAX_MEMORY_KEYS = 10_000
+
+_UNIT_SECONDS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_RATE_PATTERN = re.compile(r"^\s*(\d+)\s*/\s*(\d+)?\s*(second|minute|hour|day)s?\s*$")
+
+
+class RateLimit(NamedTuple):
+    """At most `limit` requests per `window_seconds`."""
+
+    limit: int
+    window_seconds: int
+
+    @classmethod
+    def parse(cls, rate: str) -> "RateLimit":
+        """
+        Parse a rate such as "5/minute", "100/hour" or "10/30seconds".
+
+        Raises:
+            ValueError: If the rate can't be parsed
+        """
+        match = _RATE_PATTERN.match(rate)
+        if not match:
+            raise ValueError(f"Invalid rate limit: {rate!r}")
+        count, multiplier, unit = match.groups()
+        return cls(int(count), int(multiplier or 1) * _UNIT_SECONDS[unit])
+
+    def __str__(self) -> str:
+        return f"{self.limit} per {self.window_seconds} second(s)"
+
+
+class RateLimitResult(NamedTuple):
+    """Outcome of a rate-limit check."""
+
+    allowed: bool
+    remaining: int
+    retry_after_seconds: int  # 0 when allowed
+
+
+class MemoryRateLimitBackend:
+    """Sliding-window log per key, local to this process."""
+
+    def __init__(self):
+        self._hits: defaultdict[str, deque[float]] = defaultdict(deque)
+
+    async def hit(self, keys: list[str], rate: RateLimit) -> RateLimitResult:
+        """Record one request against every key if all are under the limit."""
+        # No awaits below, so the check-and-record is atomic on the event loop
+        now = time.monotonic()
+        window_start = now - rate.window_seconds
+        retry_after = 0.0
+        remaining = rate.limit
+        for key in keys:
+            hits = self._hits[key]
+            while hits and hits[0] <= window_start:
+                hits.popleft()
+            if len(hits) >= rate.limit:
+                retry_after = max(retry_after, hits[0] + rate.window_seconds - now)
+            remaining = min(remaining, rate.limit - len(hits))
+
+        if retry_after > 0:
+            return RateLimitResult(False, 0, math.ceil(retry_after))
+        for key in keys:
+            self._hits[key].append(now)
+        if len(self._hits) > MAX_MEMORY_KEYS:
+            self._sweep(window_start)
+        return RateLimitResult(True, remaining - 1, 0)
+
+    def _sweep(self, window_start: float) -> None:
+        """Drop keys with no request inside the current window."""
+        for key in [k for k, hits in self._hits.items() if hits[-1] <= window_start]:
+            del self._hits[key]
+
+    def reset(self) -> None:
+        """Forget all recorded requests."""
+        self._hits.clear()
+
+
+# KEYS: one sorted set per limited key; ARGV: limit, window (ms), unique member.
+# Members are scored by the Redis server time, so worker clocks don't matter.
+_SLIDING_WINDOW_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local retry_after = 0
+local remaining = limit
+for _, key in ipairs(KEYS) do
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    local count = redis.call('ZCARD', key)
+    if count >= limit then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        retry_after = math.max(retry_after, tonumber(oldest[2]) + window - now)
+    end
+    remaining = math.min(remaining, limit - count)
+end
+if retry_after > 0 then
+    return {0, 0, retry_after}
+end
+for _, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[3])
+    redis.call('PEXPIRE', key, window)
+end
+return {1, remaining - 1, 0}
+"""
+
+
+class RedisRateLimitBackend:
+    """Sliding-window log per key in Redis, shared by all workers."""
+
+    def __init__(self, client: aioredis.Redis, prefix: str = "ratelimit:"):
+        """Initialize the backend.
+
+        Args:
+            client: Connected async Redis client (e.g. the idempotency cache's)
+            prefix: Namespace for rate-limit keys
+        """
+        self.prefix = prefix
+        # register_script sends EVALSHA, falling back to EVAL once per node
+        self._script = client.register_script(_SLIDING_WINDOW_SCRIPT)
+
+    async def hit(self, keys: list[str], rate: RateLimit) -> RateLimitResult:
+        """Record one request against every key if all are under the limit."""
+        allowed, remaining, retry_after_ms = await self._script(
+            keys=[f"{self.prefix}{key}" for key in keys],
+            args=[rate.limit, rate.window_seconds * 1000, uuid.uuid4().hex],
+        )
+        return RateLimitResult(
+            bool(allowed), int(remaining), math.ceil(int(retry_after_ms) / 1000)
+        )
+
+    def reset(self) -> None:
+        """Shared counters are left to expire in Redis."""
+
+
+class RateLimiter:
+    """Per-endpoint limits over a pluggable counter backend."""
+
+    def __init__(self, limits: dict[str, str], key_func: str = KEY_IP):
+        """Initialize with the in-memory backend.
+
+        Args:
+            limits: Endpoint name -> rate string, e.g. {"predict": "5/minute"}
+            key_func: What a limit is counted per: "ip", "api_key" or "agent_id"
+        """
+        if key_func not in (KEY_IP, KEY_API_KEY, KEY_AGENT_ID):
+            raise ValueError(f"Unknown rate limit key: {key_func}")
+
+        self.limits = {name: RateLimit.parse(rate) for name, rate in limits.items()}
+        self.key_func = key_func
+        self.backend = MemoryRateLimitBackend()
+
+    def use_backend(self, backend) -> None:
+        """Swap the counter backend (e.g. to Redis once it is connected)."""
+        self.backend = backend
+
+    async def hit(self, endpoint: str, identities: list[str]) -> RateLimitResult:
+        """
+        Count one request to an endpoint against each identity.
+
+        Args:
+            endpoint: Endpoint name from `limits` (unlimited if absent)
+            identities: Values of the key function for this request, e.g. the
+                client IP, or every agent_id in a batch
+
+        Returns:
+            RateLimitResult; Redis errors fail open (request allowed)
+        """
+        rate = self.limits.get(endpoint)
+        if rate is None or not identities:
+            return RateLimitResult(True, -1, 0)
+
+        keys = [
+            f"{endpoint}:{self.key_func}:{identity}" for identity in dict.fromkeys(identities)
+        ]
+        try:
+            return await self.backend.hit(keys, rate)
+        except RedisError as e:
+            logger.error(f"Rate limit check failed, allowing request: {e}")
+            return RateLimitResult(True, -1, 0)
+
+    def reset(self) -> None:
+        """Forget all in-process counters."""
+        self.backend.reset()
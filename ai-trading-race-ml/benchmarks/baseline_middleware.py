@@ -0,0 +1,294 @@
+"""The auth and idempotency middleware as they were before the raw ASGI rewrite.
+
+Verbatim copies of app/services/cache_service.py (CacheService),
+app/middleware/idempotency.py and app/middleware/auth.py from the baseline
+commit (ac9f0ee), kept so benchmarks/bench_middleware.py measures the real
+previous stack. Only the imports are merged at the top of this module.
+"""
+
+import hmac
+import json
+import logging
+import os
+from typing import Callable, Optional
+
+import redis
+from fastapi import HTTPException, Request, Response
+from redis.exceptions import RedisError
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------------
+# app/services/cache_service.py
+# ---------------------------------------------------------------------------
+
+class CacheService:
+    """
+    Redis-based cache service for request idempotency.
+    
+    Caches responses by idempotency key to prevent duplicate processing
+    of the same request within the TTL window (default 1 hour).
+    """
+
+    def __init__(self):
+        """Initialize Redis connection if enabled."""
+        self._redis_client: Optional[redis.Redis] = None
+        
+        if settings.redis_enabled:
+            try:
+                self._redis_client = redis.Redis(
+                    host=settings.redis_host,
+                    port=settings.redis_port,
+                    db=settings.redis_db,
+                    password=settings.redis_password,
+                    decode_responses=True,
+                    socket_connect_timeout=5,
+                    socket_timeout=5,
+                )
+                # Test connection
+                self._redis_client.ping()
+                logger.info(
+                    f"Redis cache connected: {settings.redis_host}:{settings.redis_port}"
+                )
+            except RedisError as e:
+                logger.warning(f"Redis connection failed, cache disabled: {e}")
+                self._redis_client = None
+
+    @property
+    def is_available(self) -> bool:
+        """Check if Redis is available."""
+        return self._redis_client is not None
+
+    def get(self, idempotency_key: str) -> Optional[dict]:
+        """
+        Get cached response by idempotency key.
+        
+        Args:
+            idempotency_key: Unique key for the request
+            
+        Returns:
+            Cached response dict or None if not found/expired
+        """
+        if not self.is_available:
+            return None
+
+        try:
+            cached = self._redis_client.get(f"idempotency:{idempotency_key}")
+            if cached:
+                logger.info(f"Cache HIT for key: {idempotency_key}")
+                return json.loads(cached)
+            logger.debug(f"Cache MISS for key: {idempotency_key}")
+            return None
+        except (RedisError, json.JSONDecodeError) as e:
+            logger.error(f"Error reading from cache: {e}")
+            return None
+
+    def set(self, idempotency_key: str, response: dict) -> bool:
+        """
+        Cache a response with TTL.
+        
+        Args:
+            idempotency_key: Unique key for the request
+            response: Response dict to cache
+            
+        Returns:
+            True if cached successfully, False otherwise
+        """
+        if not self.is_available:
+            return False
+
+        try:
+            serialized = json.dumps(response)
+            self._redis_client.setex(
+                f"idempotency:{idempotency_key}",
+                settings.redis_ttl_seconds,
+                serialized,
+            )
+            logger.info(
+                f"Cached response for key: {idempotency_key} "
+                f"(TTL: {settings.redis_ttl_seconds}s)"
+            )
+            return True
+        except (RedisError, TypeError) as e:
+            logger.error(f"Error writing to cache: {e}")
+            return False
+
+    def delete(self, idempotency_key: str) -> bool:
+        """
+        Delete a cached response.
+        
+        Args:
+            idempotency_key: Key to delete
+            
+        Returns:
+            True if deleted successfully
+        """
+        if not self.is_available:
+            return False
+
+        try:
+            self._redis_client.delete(f"idempotency:{idempotency_key}")
+            logger.debug(f"Deleted cache key: {idempotency_key}")
+            return True
+        except RedisError as e:
+            logger.error(f"Error deleting from cache: {e}")
+            return False
+
+    def close(self):
+        """Close Redis connection."""
+        if self._redis_client:
+            try:
+                self._redis_client.close()
+                logger.info("Redis connection closed")
+            except RedisError as e:
+                logger.error(f"Error closing Redis connection: {e}")
+
+
+# Global cache instance
+cache_service = CacheService()
+
+
+# ---------------------------------------------------------------------------
+# app/middleware/idempotency.py
+# ---------------------------------------------------------------------------
+
+class IdempotencyMiddleware(BaseHTTPMiddleware):
+    """
+    Middleware to handle request idempotency using Redis cache.
+    
+    Clients can send an 'Idempotency-Key' header with a unique identifier.
+    If the same key is seen within the TTL window (1 hour), the cached
+    response is returned without re-processing the request.
+    
+    This prevents duplicate processing of ML predictions which can be expensive.
+    """
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        """
+        Process request with idempotency check.
+        
+        Args:
+            request: FastAPI request
+            call_next: Next middleware/handler
+            
+        Returns:
+            Response (either cached or freshly generated)
+        """
+        # Only apply to POST /predict endpoint
+        if request.method != "POST" or not request.url.path.endswith("/predict"):
+            return await call_next(request)
+
+        # Get idempotency key from header
+        idempotency_key = request.headers.get("Idempotency-Key")
+        
+        if not idempotency_key:
+            # No idempotency key provided, process normally
+            logger.debug("No idempotency key provided, processing request")
+            return await call_next(request)
+
+        # Check cache for existing response
+        if cache_service.is_available:
+            cached_response = cache_service.get(idempotency_key)
+            
+            if cached_response:
+                logger.info(f"Returning cached response for key: {idempotency_key}")
+                return Response(
+                    content=cached_response["body"],
+                    status_code=cached_response["status_code"],
+                    headers=cached_response["headers"],
+                    media_type="application/json",
+                )
+
+        # Process request normally
+        response = await call_next(request)
+
+        # Cache successful responses (2xx status codes)
+        if idempotency_key and cache_service.is_available and 200 <= response.status_code < 300:
+            try:
+                # Read response body
+                body_bytes = b""
+                async for chunk in response.body_iterator:
+                    body_bytes += chunk
+
+                # Cache the response
+                cache_data = {
+                    "body": body_bytes.decode("utf-8"),
+                    "status_code": response.status_code,
+                    "headers": dict(response.headers),
+                }
+                cache_service.set(idempotency_key, cache_data)
+
+                # Create new response with consumed body
+                return Response(
+                    content=body_bytes,
+                    status_code=response.status_code,
+                    headers=dict(response.headers),
+                    media_type=response.media_type,
+                )
+            except Exception as e:
+                logger.error(f"Error caching response: {e}")
+                # Return original response if caching fails
+                return response
+
+        return response
+
+
+# ---------------------------------------------------------------------------
+# app/middleware/auth.py
+# ---------------------------------------------------------------------------
+
+# Public endpoints (no auth required)
+PUBLIC_PATHS = {"/health", "/"}
+
+# Docs endpoints (only accessible in development)
+DOCS_PATHS = {"/docs", "/openapi.json", "/redoc"}
+
+
+async def verify_api_key(request: Request, call_next):
+    """
+    Middleware to verify API key for service-to-service authentication.
+
+    Security fixes:
+    - Fail closed if API key not configured (no bypass)
+    - Timing-safe comparison to prevent timing attacks
+    - Docs only accessible in development
+    """
+    # Allow health check unconditionally
+    if request.url.path in PUBLIC_PATHS:
+        return await call_next(request)
+
+    # Docs only in development
+    if request.url.path in DOCS_PATHS:
+        if os.getenv("ENVIRONMENT", "development") == "development":
+            return await call_next(request)
+        else:
+            raise HTTPException(status_code=404, detail="Not found")
+
+    # SECURITY FIX: Fail closed if API key not configured
+    if not settings.api_key:
+        raise HTTPException(
+            status_code=500,
+            detail="Server misconfiguration: API key not set",
+        )
+
+    # Check API key header
+    api_key = request.headers.get("X-API-Key")
+
+    if not api_key:
+        raise HTTPException(
+            status_code=401,
+            detail="Missing API key",
+        )
+
+    # SECURITY FIX: Timing-safe comparison
+    if not hmac.compare_digest(api_key, settings.api_key):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid API key",
+        )
+
+    return await call_next(request)
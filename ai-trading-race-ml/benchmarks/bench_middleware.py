@@ -0,0 +1,172 @@
+"""Compare middleware overhead: BaseHTTPMiddleware vs raw ASGI.
+
+Drives a minimal app directly through the ASGI interface (no sockets), so
+the numbers isolate what the auth + idempotency middleware stack costs per
+request. The "before" stack is the previous implementation, copied verbatim
+in benchmarks/baseline_middleware.py: a `BaseHTTPMiddleware` idempotency
+layer over the synchronous CacheService and an `app.middleware("http")`
+auth function.
+
+Three paths are timed: requests without an Idempotency-Key, requests with a
+new key (cache miss, response stored) and repeats of one key (cache hit,
+which the current stack serves from its in-process L1). Both caches talk
+to an in-memory Redis stand-in, so the numbers exclude network round trips.
+
+Usage:
+    python benchmarks/bench_middleware.py [n_requests]
+"""
+
+import asyncio
+import itertools
+import sys
+import time
+from typing import Optional
+sys.path.insert(0, '.')
+
+from fastapi import FastAPI
+
+from app.config import settings
+from app.middleware.auth import APIKeyMiddleware
+from app.middleware.idempotency import IdempotencyMiddleware
+from app.services.cache_service import async_cache_service
+from benchmarks import baseline_middleware
+
+API_KEY = "bench-key"
+SCENARIOS = ("no key", "key miss", "key hit")
+
+
+class FakeRedis:
+    """In-memory stand-in for the synchronous client of the previous CacheService."""
+
+    def __init__(self):
+        self.data: dict[str, str] = {}
+
+    def get(self, key: str) -> Optional[str]:
+        return self.data.get(key)
+
+    def setex(self, key: str, ttl: int, value: str) -> None:
+        self.data[key] = value
+
+
+class FakeAsyncRedis:
+    """In-memory stand-in for the redis.asyncio client of AsyncCacheService."""
+
+    def __init__(self):
+        self.data: dict[str, dict] = {}
+
+    async def hgetall(self, key: str) -> dict:
+        return dict(self.data.get(key, {}))
+
+    def pipeline(self, transaction: bool = True) -> "FakePipeline":
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Queued HSET/EXPIRE of FakeAsyncRedis."""
+
+    def __init__(self, client: FakeAsyncRedis):
+        self.client = client
+        self.writes: list[tuple[str, dict]] = []
+
+    def hset(self, key: str, mapping: dict) -> None:
+        self.writes.append((key, mapping))
+
+    def expire(self, key: str, ttl: int) -> None:
+        pass
+
+    async def execute(self) -> None:
+        for key, mapping in self.writes:
+            # Redis returns every field as bytes
+            self.client.data[key] = {
+                k: str(v).encode() if isinstance(v, int) else v for k, v in mapping.items()
+            }
+
+
+def make_app(legacy: bool) -> FastAPI:
+    """Minimal app with a small-payload /predict and one middleware stack."""
+    app = FastAPI()
+
+    @app.post("/predict")
+    async def predict():
+        return {"orders": [], "signals": [], "reasoning": "No trading signals"}
+
+    if legacy:
+        app.add_middleware(baseline_middleware.IdempotencyMiddleware)
+        app.middleware("http")(baseline_middleware.verify_api_key)
+    else:
+        app.add_middleware(IdempotencyMiddleware)
+        app.add_middleware(APIKeyMiddleware)
+    return app
+
+
+async def call(app: FastAPI, idempotency_key: Optional[str] = None) -> int:
+    """Send one POST /predict through the ASGI app, return the status."""
+    headers = [(b"x-api-key", API_KEY.encode()), (b"content-type", b"application/json")]
+    if idempotency_key is not None:
+        headers.append((b"idempotency-key", idempotency_key.encode()))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/predict",
+        "raw_path": b"/predict",
+        "query_string": b"",
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 1234),
+        "server": ("test", 80),
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"{}", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+def keys(scenario: str, prefix: str):
+    """Idempotency keys sent in a scenario (None = no header)."""
+    if scenario == "no key":
+        return itertools.repeat(None)
+    if scenario == "key hit":
+        return itertools.repeat(f"{prefix}-hit")
+    return (f"{prefix}-{i}" for i in itertools.count())
+
+
+async def measure(app: FastAPI, scenario: str, prefix: str, n: int) -> float:
+    """Requests per second over n sequential requests (after warm-up)."""
+    key_iter = keys(scenario, prefix)
+    for _ in range(200):
+        assert await call(app, next(key_iter)) == 200
+    start = time.perf_counter()
+    for _ in range(n):
+        await call(app, next(key_iter))
+    return n / (time.perf_counter() - start)
+
+
+async def main(n: int) -> None:
+    settings.api_key = API_KEY
+    baseline_middleware.cache_service._redis_client = FakeRedis()
+    async_cache_service._redis_client = FakeAsyncRedis()
+    legacy, current = make_app(legacy=True), make_app(legacy=False)
+
+    print(f"{'path':<10} {'BaseHTTPMiddleware':>20} {'raw ASGI':>12}")
+    for scenario in SCENARIOS:
+        before = await measure(legacy, scenario, "before", n)
+        after = await measure(current, scenario, "after", n)
+        print(
+            f"{scenario:<10} {before:>14,.0f} req/s {after:>8,.0f} req/s "
+            f"({after / before:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,330 @@
+"""Benchmark suite for the prediction hot path.
+
+Times each case over many iterations and writes latency percentiles to a
+JSON file, so runs from two commits can be compared:
+
+    python benchmarks/run_benchmarks.py --output before.json
+    git checkout <other commit>
+    python benchmarks/run_benchmarks.py --output after.json --compare before.json
+
+Cases:
+    engineer_features[n]        DataFrame feature engineering on n candles
+    latest_features[n]          Array feature engine (serving path) on n candles
+    predict[model|rules]        TradingPredictor.predict with the model / rule-based
+    generate_decision           DecisionService.generate_decision end to end
+    app_predict[cache=off|on]   POST /predict through the ASGI app; "on" enables the
+                                feature cache and sends a fresh Idempotency-Key
+                                per request (never a replay)
+
+Usage:
+    python benchmarks/run_benchmarks.py [--output FILE] [--compare FILE]
+        [--filter SUBSTRING] [--min-time SECONDS] [--threshold PERCENT]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+sys.path.insert(0, '.')
+
+import numpy as np
+import pandas as pd
+
+API_KEY = "bench-key"
+os.environ.setdefault("ML_SERVICE_API_KEY", API_KEY)
+
+from app.config import settings
+from app.ml.feature_engine import latest_features
+from app.ml.features import engineer_features, get_feature_values, prepare_inference_features
+from app.ml.predictor import TradingPredictor
+from app.models.schemas import AgentContextRequest, CandleData, PortfolioState
+from app.services.decision_service import DecisionService
+from app.services.feature_cache import FeatureCache
+
+MODEL_PATH = Path("models/trading_model.pkl")
+CANDLE_COUNTS = (50, 500, 5_000)
+
+# Iterations always run before timing (imports, caches, JIT-like warm paths)
+WARMUP_ITERATIONS = 20
+MIN_ITERATIONS = 50
+MAX_ITERATIONS = 100_000
+
+
+def make_ohlcv(n: int, seed: int = 42) -> pd.DataFrame:
+    """Random-walk OHLCV candles, one per hour."""
+    rng = np.random.default_rng(seed)
+    close = 42000 * np.cumprod(1 + rng.uniform(-0.02, 0.02, n))
+    open_ = np.concatenate(([42000.0], close[:-1]))
+    return pd.DataFrame(
+        {
+            "timestamp": pd.date_range("2024-01-01", periods=n, freq="h"),
+            "open": open_,
+            "high": np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, n)),
+            "low": np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, n)),
+            "close": close,
+            "volume": rng.uniform(100, 1000, n),
+        }
+    )
+
+
+def make_context_payload(n: int = 100, symbols: tuple[str, ...] = ("BTC", "ETH")) -> dict:
+    """JSON body of a /predict request with n candles per symbol."""
+    base_time = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    candles = []
+    for i, symbol in enumerate(symbols):
+        df = make_ohlcv(n, seed=i)
+        for j, row in enumerate(df.itertuples()):
+            candles.append(
+                {
+                    "symbol": symbol,
+                    "timestamp": (base_time + timedelta(hours=j)).isoformat(),
+                    "open": str(row.open),
+                    "high": str(row.high),
+                    "low": str(row.low),
+                    "close": str(row.close),
+                    "volume": str(row.volume),
+                }
+            )
+    return {
+        "agentId": "bench-agent",
+        "portfolio": {"cash": "10000", "positions": [], "totalValue": "10000"},
+        "candles": candles,
+    }
+
+
+def summarize(samples_ns: list[int]) -> dict:
+    """Latency statistics in microseconds."""
+    samples = np.array(samples_ns, dtype=np.float64) / 1000
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "iterations": len(samples),
+        "mean_us": round(float(samples.mean()), 2),
+        "stdev_us": round(float(samples.std()), 2),
+        "min_us": round(float(samples.min()), 2),
+        "p50_us": round(float(p50), 2),
+        "p95_us": round(float(p95), 2),
+        "p99_us": round(float(p99), 2),
+        "max_us": round(float(samples.max()), 2),
+        "ops_per_sec": round(1e6 / float(samples.mean()), 1),
+    }
+
+
+def time_sync(func: Callable[[], object], min_time: float) -> dict:
+    """Run func repeatedly for at least min_time seconds and summarize."""
+    for _ in range(WARMUP_ITERATIONS):
+        func()
+    samples: list[int] = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < MAX_ITERATIONS and (
+        len(samples) < MIN_ITERATIONS or time.perf_counter() < deadline
+    ):
+        start = time.perf_counter_ns()
+        func()
+        samples.append(time.perf_counter_ns() - start)
+    return summarize(samples)
+
+
+async def time_async(func: Callable[[], Awaitable[object]], min_time: float) -> dict:
+    """Async counterpart of time_sync."""
+    for _ in range(WARMUP_ITERATIONS):
+        await func()
+    samples: list[int] = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < MAX_ITERATIONS and (
+        len(samples) < MIN_ITERATIONS or time.perf_counter() < deadline
+    ):
+        start = time.perf_counter_ns()
+        await func()
+        samples.append(time.perf_counter_ns() - start)
+    return summarize(samples)
+
+
+def bench_features(selected: Callable[[str], bool], min_time: float) -> dict:
+    results = {}
+    for n in CANDLE_COUNTS:
+        df = make_ohlcv(n)
+        close = df["close"].to_numpy()
+        volume = df["volume"].to_numpy()
+        if selected(f"engineer_features[{n}]"):
+            results[f"engineer_features[{n}]"] = time_sync(lambda: engineer_features(df), min_time)
+        if selected(f"latest_features[{n}]"):
+            results[f"latest_features[{n}]"] = time_sync(
+                lambda: latest_features(close, volume), min_time
+            )
+    return results
+
+
+def bench_predictor(selected: Callable[[str], bool], min_time: float) -> dict:
+    results = {}
+    df = make_ohlcv(100)
+    features = prepare_inference_features(df)
+    values = get_feature_values(df)
+    predictors = {
+        "predict[model]": lambda: TradingPredictor(MODEL_PATH, backend=settings.predictor_backend),
+        "predict[rules]": lambda: TradingPredictor(Path("/nonexistent/model.pkl")),
+    }
+    for name, build in predictors.items():
+        if selected(name):
+            predictor = build()
+            results[name] = time_sync(lambda: predictor.predict(features, values), min_time)
+    return results
+
+
+def bench_decision_service(selected: Callable[[str], bool], min_time: float) -> dict:
+    if not selected("generate_decision"):
+        return {}
+    payload = make_context_payload()
+    context = AgentContextRequest(
+        agent_id=payload["agentId"],
+        portfolio=PortfolioState(
+            cash=Decimal("10000"), positions=[], total_value=Decimal("10000")
+        ),
+        candles=[CandleData.model_validate(c) for c in payload["candles"]],
+    )
+    service = DecisionService(TradingPredictor(MODEL_PATH, backend=settings.predictor_backend))
+    return {"generate_decision": time_sync(lambda: service.generate_decision(context), min_time)}
+
+
+async def bench_app(selected: Callable[[str], bool], min_time: float) -> dict:
+    names = [name for name in ("app_predict[cache=off]", "app_predict[cache=on]") if selected(name)]
+    if not names:
+        return {}
+
+    import httpx
+
+    from app import main
+
+    settings.api_key = API_KEY
+    main.limiter.limits.clear()
+    payload = make_context_payload()
+    results = {}
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name in names:
+                cache_on = name.endswith("[cache=on]")
+                main.decision_service.feature_cache = (
+                    FeatureCache(
+                        max_bytes=settings.feature_cache_max_bytes,
+                        ttl_seconds=settings.feature_cache_ttl_seconds,
+                    )
+                    if cache_on
+                    else None
+                )
+                keys = itertools.count()
+
+                async def request() -> None:
+                    headers = {"X-API-Key": API_KEY}
+                    if cache_on:
+                        # A reused key would time the idempotency replay, not /predict
+                        headers["Idempotency-Key"] = f"bench-{next(keys)}"
+                    response = await client.post("/predict", json=payload, headers=headers)
+                    assert response.status_code == 200, response.text
+
+                results[name] = await time_async(request, min_time)
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> dict:
+    import sklearn
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "predictor_backend": settings.predictor_backend,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Print p50/p99 changes against a baseline run.
+
+    Returns:
+        Names of cases whose p99 got worse by more than `threshold` percent
+    """
+    regressions = []
+    columns = ("p50 base", "p50 new", "p99 base", "p99 new")
+    print(f"\n{'case':<28} " + " ".join(f"{c:>10}" for c in columns) + "  change")
+    for name, stats in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        change = (stats["p99_us"] / base["p99_us"] - 1) * 100
+        flag = "  REGRESSION" if change > threshold else ""
+        print(
+            f"{name:<28} {base['p50_us']:>10.1f} {stats['p50_us']:>10.1f} "
+            f"{base['p99_us']:>10.1f} {stats['p99_us']:>10.1f}  {change:+6.1f}%{flag}"
+        )
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the prediction hot path")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("--compare", help="Baseline JSON results to compare against")
+    parser.add_argument("--filter", default="", help="Only run cases containing this string")
+    parser.add_argument(
+        "--min-time", type=float, default=1.0, help="Seconds to spend timing each case"
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=10.0, help="p99 slowdown (%%) flagged as regression"
+    )
+    args = parser.parse_args()
+
+    def selected(name: str) -> bool:
+        return args.filter in name
+
+    results: dict[str, dict] = {}
+    results.update(bench_features(selected, args.min_time))
+    results.update(bench_predictor(selected, args.min_time))
+    results.update(bench_decision_service(selected, args.min_time))
+    results.update(asyncio.run(bench_app(selected, args.min_time)))
+
+    for name, stats in results.items():
+        print(
+            f"{name:<28} p50 {stats['p50_us']:>10.1f}us  p99 {stats['p99_us']:>10.1f}us  "
+            f"{stats['ops_per_sec']:>10,.0f} ops/s"
+        )
+
+    Path(args.output).write_text(
+        json.dumps({"environment": environment(), "results": results}, indent=2) + "\n"
+    )
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""Export the trained model as memory-mappable arrays.
+
+Run after training (or as a deploy step) so that serving with
+ML_SERVICE_PREDICTOR_BACKEND=mmap maps the arrays directly instead of
+unpickling the forest in every worker process.
+
+Usage:
+    python scripts/export_model_arrays.py [model_path] [arrays_dir]
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+from pathlib import Path
+
+import joblib
+
+from app.ml.compiled_forest import CompiledForest
+from app.ml.predictor import default_arrays_path, model_fingerprint
+
+
+def export_model_arrays(model_path: str = "models/trading_model.pkl", arrays_dir: str = "") -> Path:
+    """
+    Compile a saved forest and write its arrays next to it.
+
+    Args:
+        model_path: Path to the pickled model
+        arrays_dir: Output directory (default: <model stem>_arrays)
+
+    Returns:
+        Directory the arrays were written to
+    """
+    path = Path(model_path)
+    target = Path(arrays_dir) if arrays_dir else default_arrays_path(path)
+
+    forest = CompiledForest.from_sklearn(joblib.load(path))
+    forest.save(target, source=model_fingerprint(path))
+
+    size = sum(f.stat().st_size for f in target.iterdir())
+    print(f"Exported {forest.n_trees} trees ({size / 1024:.0f} KiB) to: {target}")
+    return target
+
+
+if __name__ == "__main__":
+    export_model_arrays(*sys.argv[1:3])
@@ -4,10 +4,29 @@ Since we don't have real historical data yet, this script generates
 realistic OHLCV data with known patterns for training.
 """
 
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Iterator, Optional
+
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
+# Vectorized generator: trend regimes and the mean-reversion band
+TREND_SWITCH_PROBABILITY = 0.05
+MAX_TREND = 0.001
+BAND_LOW = 0.5  # Prices are reflected into [0.5, 1.5] x base price
+BAND_HIGH = 1.5
+
+# Candles generated (and written as one Parquet row group) at a time
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+# One independent random stream per generated quantity
+_STREAMS = ("switch", "trend", "change", "open", "high", "low", "volume")
+
 
 def generate_ohlcv_data(
     n_samples: int = 5000,
@@ -77,6 +96,203 @@ def generate_ohlcv_data(
     return pd.DataFrame(data)
 
 
+def _random_streams(seed: int, shard: int) -> dict[str, np.random.Generator]:
+    """Independent Generator per quantity, distinct for every (seed, shard)."""
+    children = np.random.SeedSequence(seed, spawn_key=(shard,)).spawn(len(_STREAMS))
+    return {name: np.random.default_rng(child) for name, child in zip(_STREAMS, children)}
+
+
+def _reflect(values: np.ndarray, low: float, high: float) -> np.ndarray:
+    """Fold an unbounded path into [low, high], bouncing off both edges."""
+    width = high - low
+    folded = np.mod(values - low, 2 * width)
+    return low + np.where(folded > width, 2 * width - folded, folded)
+
+
+def iter_ohlcv_chunks(
+    n_samples: int,
+    base_price: float = 42000,
+    volatility: float = 0.02,
+    seed: int = 42,
+    shard: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    start_time: datetime = datetime(2024, 1, 1),
+    interval: timedelta = timedelta(hours=1),
+) -> Iterator[pd.DataFrame]:
+    """
+    Generate OHLCV candles in chunks, without per-candle Python loops.
+
+    Same model as generate_ohlcv_data (random walk with occasional trend
+    changes and mean reversion), computed with array operations: trend
+    regimes are forward-filled, prices are a cumulative product of returns
+    (a cumulative sum in log space), and mean reversion reflects the path
+    into [0.5, 1.5] x base_price instead of nudging it candle by candle.
+
+    Every quantity has its own random stream, so the output doesn't depend
+    on chunk_size (beyond float rounding of the running sum), and each
+    shard of a seed is an independent series.
+
+    Args:
+        n_samples: Number of candles to generate
+        base_price: Starting price
+        volatility: Price volatility (0.02 = 2%)
+        seed: Random seed for reproducibility
+        shard: Index of an independent series for the same seed
+        chunk_size: Candles per yielded DataFrame (bounds memory)
+        start_time: Timestamp of the first candle
+        interval: Time between candles
+
+    Yields:
+        DataFrames with timestamp/open/high/low/close/volume columns
+    """
+    streams = _random_streams(seed, shard)
+    log_low = np.log(base_price * BAND_LOW)
+    log_high = np.log(base_price * BAND_HIGH)
+    # Millisecond timestamps: nanoseconds overflow after ~2M hourly candles
+    start = np.datetime64(start_time, "ms")
+    step = np.timedelta64(interval // timedelta(milliseconds=1), "ms")
+
+    # Carried between chunks: unreflected log price and the current trend
+    log_price = np.log(base_price)
+    trend = 0.0
+
+    for offset in range(0, n_samples, chunk_size):
+        n = min(chunk_size, n_samples - offset)
+
+        # Trend in force at each candle: the last switch so far, else the carry
+        switches = streams["switch"].random(n) < TREND_SWITCH_PROBABILITY
+        new_trends = streams["trend"].uniform(-MAX_TREND, MAX_TREND, n)
+        last_switch = np.maximum.accumulate(np.where(switches, np.arange(n), -1))
+        trends = np.where(last_switch >= 0, new_trends[np.maximum(last_switch, 0)], trend)
+        trend = float(trends[-1])
+
+        # Random walk with trend; the first candle is the base price
+        changes = streams["change"].normal(trends, volatility)
+        if offset == 0:
+            changes[0] = 0.0
+        path = log_price + np.cumsum(np.log1p(np.maximum(changes, -0.99)))
+        log_price = float(path[-1])
+        close = np.exp(_reflect(path, log_low, log_high))
+        if offset == 0:
+            close[0] = base_price  # Exact despite the log round trip
+
+        # High/low/open relative to close
+        open_price = close * (1 + streams["open"].normal(0, volatility * 0.3, n))
+        high_offset = np.abs(streams["high"].normal(0, volatility * 0.5, n))
+        low_offset = np.abs(streams["low"].normal(0, volatility * 0.5, n))
+
+        yield pd.DataFrame({
+            'timestamp': start + (offset + np.arange(n)) * step,
+            'open': open_price,
+            'high': np.maximum(close, open_price) * (1 + high_offset),
+            'low': np.minimum(close, open_price) * (1 - low_offset),
+            'close': close,
+            'volume': streams["volume"].lognormal(10, 0.5, n),
+        })
+
+
+def generate_ohlcv_vectorized(
+    n_samples: int = 5000,
+    base_price: float = 42000,
+    volatility: float = 0.02,
+    seed: int = 42,
+    shard: int = 0,
+) -> pd.DataFrame:
+    """
+    Vectorized counterpart of generate_ohlcv_data (see iter_ohlcv_chunks).
+
+    Returns:
+        DataFrame with OHLCV data
+    """
+    chunks = list(iter_ohlcv_chunks(n_samples, base_price, volatility, seed, shard))
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks, ignore_index=True)
+
+
+def write_ohlcv_parquet(
+    path: Path,
+    n_samples: int,
+    seed: int = 42,
+    shard: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    **kwargs,
+) -> Path:
+    """
+    Stream generated candles to a Parquet file, one row group per chunk.
+
+    Only one chunk is in memory at a time. Extra keyword arguments are
+    passed to iter_ohlcv_chunks.
+
+    Returns:
+        Path of the written file
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+
+    writer: Optional[pq.ParquetWriter] = None
+    try:
+        for chunk in iter_ohlcv_chunks(
+            n_samples, seed=seed, shard=shard, chunk_size=chunk_size, **kwargs
+        ):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    # Readers never see a half-written shard
+    os.replace(tmp_path, path)
+    return path
+
+
+def generate_shards(
+    output_dir: Path,
+    n_shards: int,
+    candles_per_shard: int,
+    seed: int = 42,
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> list[Path]:
+    """
+    Write independent seeded series as Parquet shards, in parallel.
+
+    Shard i is written to `shard-<i>.parquet` and depends only on (seed, i),
+    so shards can also be generated by separate jobs and combined.
+
+    Args:
+        output_dir: Directory for the shard files
+        n_shards: Number of independent series
+        candles_per_shard: Candles in each series
+        seed: Random seed shared by all shards
+        workers: Processes generating shards concurrently
+        chunk_size: Candles per Parquet row group
+
+    Returns:
+        Paths of the shard files, in shard order
+    """
+    output_dir = Path(output_dir)
+    paths = [output_dir / f"shard-{i:05d}.parquet" for i in range(n_shards)]
+    write = partial(
+        _write_shard, n_samples=candles_per_shard, seed=seed, chunk_size=chunk_size
+    )
+
+    if workers <= 1:
+        return [write(path, shard) for shard, path in enumerate(paths)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(write, paths, range(n_shards)))
+
+
+def _write_shard(path: Path, shard: int, **kwargs) -> Path:
+    return write_ohlcv_parquet(path, shard=shard, **kwargs)
+
+
 def create_labels(df: pd.DataFrame, threshold: float = 0.01) -> pd.Series:
     """
     Create labels based on future price movement.
@@ -105,17 +321,51 @@ def create_labels(df: pd.DataFrame, threshold: float = 0.01) -> pd.Series:
 
 def generate_training_dataset(
     n_samples: int = 5000,
-    seed: int = 42
+    seed: int = 42,
+    store_dir: Optional[Path] = None,
+    symbols: Optional[list[str]] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
 ) -> tuple[pd.DataFrame, pd.Series]:
     """
     Generate complete training dataset with features and labels.
-    
+
+    Args:
+        n_samples: Number of synthetic candles (ignored with a store)
+        seed: Random seed for the synthetic candles
+        store_dir: Read candles from this candle store instead
+        symbols: Store symbols to use (default: all)
+        start: First store timestamp included (default: the first)
+        end: First store timestamp excluded (default: after the last)
+
     Returns:
         Tuple of (features DataFrame, labels Series)
     """
-    # Generate OHLCV data
-    df = generate_ohlcv_data(n_samples=n_samples, seed=seed)
-    
+    if store_dir is None:
+        return _features_and_labels(generate_ohlcv_data(n_samples=n_samples, seed=seed))
+
+    import sys
+    sys.path.insert(0, '.')
+    from app.services.candle_store import OHLCV_COLUMNS, CandleStore
+
+    store = CandleStore(store_dir)
+    datasets = []
+    for symbol in symbols or store.symbols():
+        # Columns come straight from the mapped store, no per-candle parsing
+        series = store.read(symbol, start, end)
+        df = pd.DataFrame(np.asarray(series.ohlcv), columns=list(OHLCV_COLUMNS))
+        df.insert(0, 'timestamp', pd.to_datetime(np.asarray(series.timestamps), unit='ns'))
+        datasets.append(_features_and_labels(df))
+    if not datasets:
+        raise ValueError(f"No candles in the store at {store_dir}")
+    return (
+        pd.concat([X for X, _ in datasets], ignore_index=True),
+        pd.concat([y for _, y in datasets], ignore_index=True),
+    )
+
+
+def _features_and_labels(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.Series]:
+    """Feature rows and labels of one candle series."""
     # Import feature engineering
     import sys
     sys.path.insert(0, '.')
@@ -144,11 +394,31 @@ def generate_training_dataset(
 
 
 if __name__ == "__main__":
-    print("Generating training data...")
-    X, y = generate_training_dataset(n_samples=5000)
-    
-    print(f"Features shape: {X.shape}")
-    print(f"Labels distribution:")
-    print(y.value_counts().sort_index())
-    print("\nSample features:")
-    print(X.head())
+    parser = argparse.ArgumentParser(description="Generate synthetic OHLCV data")
+    parser.add_argument("--output-dir", help="Write Parquet shards here instead of a preview")
+    parser.add_argument("--shards", type=int, default=1, help="Independent series to write")
+    parser.add_argument("--candles", type=int, default=5000, help="Candles per shard")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    if args.output_dir:
+        paths = generate_shards(
+            Path(args.output_dir),
+            n_shards=args.shards,
+            candles_per_shard=args.candles,
+            seed=args.seed,
+            workers=min(args.workers, args.shards),
+            chunk_size=args.chunk_size,
+        )
+        print(f"Wrote {len(paths)} shard(s) of {args.candles:,} candles to {args.output_dir}")
+    else:
+        print("Generating training data...")
+        X, y = generate_training_dataset(n_samples=5000)
+    
+        print(f"Features shape: {X.shape}")
+        print(f"Labels distribution:")
+        print(y.value_counts().sort_index())
+        print("\nSample features:")
+        print(X.head())
@@ -0,0 +1,35 @@
+"""Import Parquet candles into a candle store.
+
+Each file holds one symbol, named after the file unless --symbol is given.
+Candles already in the store (at or before its latest timestamp for the
+symbol) are skipped, so files with newer candles can be imported as they
+arrive.
+
+Usage:
+    python scripts/import_candles.py --store data/candles data/BTC.parquet data/ETH.parquet
+    python scripts/import_candles.py --store data/candles --symbol BTC data/btc-2024-07.parquet
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, '.')
+
+from app.services.candle_store import CandleStore
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import Parquet candles into a candle store")
+    parser.add_argument("files", nargs="+", type=Path, help="Parquet files, one per symbol")
+    parser.add_argument("--store", type=Path, default=Path("data/candles"))
+    parser.add_argument("--symbol", help="Symbol of a single file (default: file name)")
+    args = parser.parse_args()
+
+    if args.symbol and len(args.files) > 1:
+        parser.error("--symbol can only be used with a single file")
+
+    store = CandleStore(args.store)
+    for path in args.files:
+        symbol = args.symbol or path.stem
+        appended = store.import_parquet(symbol, path)
+        print(f"{symbol}: {appended:,} candles appended ({store.rows(symbol):,} stored)")
@@ -0,0 +1,141 @@
+"""Race many agent configurations over the same history in parallel.
+
+Agents come from a JSON file or from a parameter sweep, and race over
+Parquet candles (one file per symbol) or synthetic minute bars. The
+leaderboard is printed and written as CSV (see app/services/race.py).
+
+Usage:
+    # Every combination of two models, three thresholds and two sizings
+    python scripts/run_race.py --synthetic BTC ETH SOL --candles 525600 \\
+        --models models/v1.pkl models/v2.pkl --min-confidence 0 0.5 0.6 \\
+        --position-fraction 0.05 0.1 --workers 8
+
+    # Agents from a file: [{"agentId": "a", "model": "models/v1.pkl",
+    #                       "minConfidence": 0.5, "decisionEvery": 60}, ...]
+    python scripts/run_race.py --data data/BTC.parquet --agents agents.json
+
+    # Every symbol of a candle store (see scripts/import_candles.py)
+    python scripts/run_race.py --store data/candles --agents agents.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import shutil
+import sys
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, '.')
+
+from app.ml.predictor import BACKEND_SKLEARN, BACKENDS
+from app.services.backtest import BacktestConfig
+from app.services.candle_store import CandleStore
+from app.services.race import RaceAgent, run_race
+from scripts.run_backtest import load_parquet_series, synthetic_series
+
+
+def load_agents(path: Path) -> list[RaceAgent]:
+    """Agents from a JSON list of objects with camelCase keys."""
+    defaults = BacktestConfig()
+    agents = []
+    for entry in json.loads(path.read_text()):
+        config = BacktestConfig(
+            starting_cash=Decimal(str(entry.get("startingCash", defaults.starting_cash))),
+            position_fraction=Decimal(
+                str(entry.get("positionFraction", defaults.position_fraction))
+            ),
+            max_confidence=entry.get("maxConfidence", defaults.max_confidence),
+            min_confidence=entry.get("minConfidence", defaults.min_confidence),
+            decision_every=entry.get("decisionEvery", defaults.decision_every),
+        )
+        agents.append(
+            RaceAgent(
+                entry["agentId"],
+                entry.get("model", "models/trading_model.pkl"),
+                config,
+                entry.get("backend", BACKEND_SKLEARN),
+            )
+        )
+    return agents
+
+
+def sweep_agents(
+    models: list[str],
+    min_confidences: list[float],
+    position_fractions: list[Decimal],
+    decision_every: list[int],
+    backend: str = BACKEND_SKLEARN,
+) -> list[RaceAgent]:
+    """One agent per combination of the swept parameters."""
+    agents = []
+    for model, confidence, fraction, every in itertools.product(
+        models, min_confidences, position_fractions, decision_every
+    ):
+        config = BacktestConfig(
+            position_fraction=fraction, min_confidence=confidence, decision_every=every
+        )
+        agent_id = f"{Path(model).stem}-c{confidence}-f{fraction}-e{every}"
+        agents.append(RaceAgent(agent_id, model, config, backend))
+    return agents
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Race agent configurations over history")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--data", nargs="+", type=Path, help="Parquet files, one per symbol")
+    source.add_argument("--synthetic", nargs="+", metavar="SYMBOL", help="Synthetic symbols")
+    source.add_argument("--store", type=Path, help="Race over every symbol of a candle store")
+    parser.add_argument("--candles", type=int, default=525_600, help="Synthetic bars per symbol")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--agents", type=Path, help="JSON file of agents (instead of a sweep)")
+    parser.add_argument("--models", nargs="+", default=["models/trading_model.pkl"])
+    parser.add_argument("--backend", choices=BACKENDS, default=BACKEND_SKLEARN)
+    parser.add_argument("--min-confidence", nargs="+", type=float, default=[0.0])
+    parser.add_argument("--position-fraction", nargs="+", type=Decimal, default=[Decimal("0.1")])
+    parser.add_argument("--decision-every", nargs="+", type=int, default=[1])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", type=Path, default=Path("race_leaderboard.csv"))
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Trading Agent Race")
+    print("=" * 60)
+
+    if args.agents:
+        agents = load_agents(args.agents)
+    else:
+        agents = sweep_agents(
+            args.models, args.min_confidence, args.position_fraction, args.decision_every,
+            args.backend,
+        )
+
+    store_dir = args.store
+    scratch_dir = None
+    if store_dir is None:
+        if args.data:
+            series = [load_parquet_series(path) for path in args.data]
+        else:
+            series = synthetic_series(args.synthetic, args.candles, args.seed)
+        # A fresh store the workers can map, removed after the race
+        scratch_dir = Path(tempfile.mkdtemp(prefix="race-market-"))
+        store_dir = scratch_dir
+        store = CandleStore(store_dir)
+        for s in series:
+            store.append_series(s)
+    print(f"Racing {len(agents)} agents with {args.workers} workers")
+
+    try:
+        result = run_race(agents, store_dir, workers=args.workers)
+    finally:
+        if scratch_dir is not None:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+    result.leaderboard.to_csv(args.output, index=False)
+
+    print("\n" + result.leaderboard.head(20).to_string(index=False))
+    print("\n" + "=" * 60)
+    for name, value in result.stats.items():
+        print(f"{name:<20} {value}")
+    print(f"\nLeaderboard written to {args.output}")
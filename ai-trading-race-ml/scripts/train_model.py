@@ -7,23 +7,35 @@ This script:
 4. Saves the model to models/trading_model.pkl
 """
 
+import argparse
 import sys
 sys.path.insert(0, '.')
 
 import joblib
 import numpy as np
 from pathlib import Path
+from typing import Optional
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.metrics import classification_report, confusion_matrix
 
 from scripts.generate_training_data import generate_training_dataset
 
+# RandomForest hyperparameters (shared with scripts/train_pipeline.py)
+MODEL_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 10,
+    'min_samples_split': 10,
+    'min_samples_leaf': 5,
+    'class_weight': 'balanced',  # Handle class imbalance
+}
+
 
 def train_model(
     n_samples: int = 5000,
     test_size: float = 0.2,
-    random_state: int = 42
+    random_state: int = 42,
+    store_dir: Optional[Path] = None,
 ) -> tuple[RandomForestClassifier, dict]:
     """
     Train a RandomForest classifier for trading decisions.
@@ -32,6 +44,7 @@ def train_model(
         n_samples: Number of training samples to generate
         test_size: Fraction for test set
         random_state: Random seed
+        store_dir: Train on the candles of this candle store instead
     
     Returns:
         Tuple of (trained model, metrics dict)
@@ -42,7 +55,9 @@ def train_model(
     
     # Generate data
     print("\n1. Generating training data...")
-    X, y = generate_training_dataset(n_samples=n_samples, seed=random_state)
+    X, y = generate_training_dataset(
+        n_samples=n_samples, seed=random_state, store_dir=store_dir
+    )
     print(f"   Features: {X.shape[0]} samples, {X.shape[1]} features")
     print(f"   Label distribution: SELL={sum(y==0)}, HOLD={sum(y==1)}, BUY={sum(y==2)}")
     
@@ -55,15 +70,7 @@ def train_model(
     
     # Train model
     print("\n3. Training RandomForest classifier...")
-    model = RandomForestClassifier(
-        n_estimators=100,
-        max_depth=10,
-        min_samples_split=10,
-        min_samples_leaf=5,
-        class_weight='balanced',  # Handle class imbalance
-        random_state=random_state,
-        n_jobs=-1
-    )
+    model = RandomForestClassifier(**MODEL_PARAMS, random_state=random_state, n_jobs=-1)
     model.fit(X_train, y_train)
     print("   Training complete!")
     
@@ -108,8 +115,12 @@ def save_model(model: RandomForestClassifier, path: str = "models/trading_model.
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the trading model")
+    parser.add_argument("--store", type=Path, help="Candle store to train on (default: synthetic)")
+    args = parser.parse_args()
+
     # Train model
-    model, metrics = train_model(n_samples=5000)
+    model, metrics = train_model(n_samples=5000, store_dir=args.store)
     
     # Save model
     save_model(model)
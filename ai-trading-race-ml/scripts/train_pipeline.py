@@ -0,0 +1,456 @@
+"""Parallel, memory-bounded training pipeline over Parquet shards.
+
+Unlike train_model.py, which builds the whole dataset in memory and refits
+the forest five more times for cross-validation, this pipeline:
+
+1. Featurizes each shard (one candle series per file, see
+   generate_training_data.py, or one symbol of a candle store) in a loky
+   worker, reading only the close and volume columns and computing
+   features in fixed-size blocks. Features
+   and labels are cached on disk as float32/int8 files keyed by the shard's
+   size and mtime, so reruns and every CV fold reuse them.
+2. Assembles the cached rows (optionally a random subset) into a single
+   memory-mapped float32 matrix, which workers read without copying. The
+   matrix is written to a temporary directory of the run and deleted once
+   the model is fitted.
+3. Fits the CV folds and the final model concurrently under a CPU budget
+   (`n_jobs`), running no more folds at once than the memory budget allows.
+
+Wall time and peak memory are reported for each stage.
+
+Usage:
+    python scripts/generate_training_data.py --output-dir data/shards --shards 8 --candles 1000000
+    python scripts/train_pipeline.py --data-dir data/shards --n-jobs 8 --max-memory-gb 8
+    python scripts/train_pipeline.py --data-dir data/candles --n-jobs 8
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+sys.path.insert(0, '.')
+
+import joblib
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import GroupKFold, KFold
+
+from app.ml.feature_engine import FEATURE_COLUMNS, N_FEATURES
+from app.services.candle_store import TIMESTAMP_FILE, CandleStore
+from scripts.train_model import MODEL_PARAMS
+
+# Bump when feature or label computation changes, to invalidate cached shards
+FEATURE_CACHE_VERSION = 1
+
+# Candles featurized at a time, and the history prepended to each block so
+# recursive indicators (RSI, MACD) match a full-series computation
+FEATURE_BLOCK_ROWS = 250_000
+FEATURE_BLOCK_OVERLAP = 1_000
+
+# Labels: return over the next LABEL_HORIZON candles vs. a threshold
+LABEL_HORIZON = 5
+LABEL_THRESHOLD = 0.01
+
+# Estimated peak memory of one fold fit, as a multiple of its training rows
+FOLD_MEMORY_FACTOR = 2.0
+
+
+def _peak_rss_mb() -> float:
+    """High-water resident memory of this process (ru_maxrss is KB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _current_rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return None
+
+
+class StageReport:
+    """Wall time and peak memory of the pipeline stages."""
+
+    def __init__(self):
+        self.stages: list[dict] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[dict]:
+        """
+        Time a stage and sample this process's memory while it runs.
+
+        Yields a dict; set "worker_peak_rss_mb" in it to record workers' memory.
+        """
+        info: dict = {"stage": name}
+        peak = _current_rss_mb() or 0.0
+        done = threading.Event()
+
+        def sample() -> None:
+            nonlocal peak
+            while not done.wait(0.01):
+                peak = max(peak, _current_rss_mb() or 0.0)
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            done.set()
+            sampler.join()
+            info["wall_seconds"] = round(time.perf_counter() - start, 3)
+            # Without /proc, fall back to the process-wide high-water mark
+            info["peak_rss_mb"] = round(peak or _peak_rss_mb(), 1)
+            self.stages.append(info)
+            workers = info.get("worker_peak_rss_mb")
+            print(
+                f"   [{name}] {info['wall_seconds']:.2f}s, peak RSS {info['peak_rss_mb']:.0f} MB"
+                + (f" (workers {workers:.0f} MB)" if workers else "")
+            )
+
+
+def _shard_cache_key(shard: Path) -> str:
+    # A candle store symbol grows by appends to its timestamp column
+    stat = (shard / TIMESTAMP_FILE if shard.is_dir() else shard).stat()
+    key = json.dumps(
+        [
+            shard.name,
+            stat.st_size,
+            stat.st_mtime_ns,
+            FEATURE_COLUMNS,
+            LABEL_HORIZON,
+            LABEL_THRESHOLD,
+            FEATURE_CACHE_VERSION,
+        ]
+    )
+    return f"{shard.stem}-{hashlib.sha256(key.encode()).hexdigest()[:16]}"
+
+
+def _label(close: np.ndarray) -> np.ndarray:
+    """SELL(0)/HOLD(1)/BUY(2) from the return LABEL_HORIZON candles ahead."""
+    future_return = close[LABEL_HORIZON:] / close[:-LABEL_HORIZON] - 1
+    labels = np.ones(len(future_return), dtype=np.int8)
+    labels[future_return > LABEL_THRESHOLD] = 2
+    labels[future_return < -LABEL_THRESHOLD] = 0
+    return labels
+
+
+def _read_close_volume(shard: Path) -> tuple[np.ndarray, np.ndarray]:
+    """Close and volume of a Parquet shard, or mapped from a candle store symbol."""
+    if shard.is_dir():
+        series = CandleStore(shard.parent).read(shard.name)
+        return series.close, series.volume
+
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(shard, columns=["close", "volume"])
+    return table.column("close").to_numpy(), table.column("volume").to_numpy()
+
+
+def featurize_shard(shard: Path, cache_dir: Path) -> dict:
+    """
+    Compute (or reuse) the feature rows and labels of one shard.
+
+    Rows are appended block by block to raw float32/int8 files, so memory
+    stays bounded by the shard's close/volume columns plus one block.
+
+    Returns:
+        {"key", "rows", "cached", "peak_rss_mb"}
+    """
+    from app.ml.feature_engine import compute_features
+
+    key = _shard_cache_key(shard)
+    meta_path = cache_dir / f"{key}.json"
+    if meta_path.exists():
+        meta = json.loads(meta_path.read_text())
+        return {**meta, "cached": True, "peak_rss_mb": _peak_rss_mb()}
+
+    close, volume = _read_close_volume(shard)
+    labels = _label(close)
+    n = len(labels)  # The last LABEL_HORIZON candles have no label
+
+    rows = 0
+    x_tmp, y_tmp = cache_dir / f"{key}.X.tmp", cache_dir / f"{key}.y.tmp"
+    with open(x_tmp, "wb") as x_file, open(y_tmp, "wb") as y_file:
+        for start in range(0, n, FEATURE_BLOCK_ROWS):
+            end = min(start + FEATURE_BLOCK_ROWS, n)
+            history = max(0, start - FEATURE_BLOCK_OVERLAP)
+            block = compute_features(close[history:end], volume[history:end], start - history)
+            valid = ~np.isnan(block).any(axis=1)
+            x_file.write(block[valid].astype(np.float32).tobytes())
+            y_file.write(labels[start:end][valid].tobytes())
+            rows += int(valid.sum())
+
+    os.replace(x_tmp, cache_dir / f"{key}.X.f32")
+    os.replace(y_tmp, cache_dir / f"{key}.y.i8")
+    # Written last: its presence marks a complete cache entry
+    meta = {"key": key, "rows": rows}
+    meta_path.write_text(json.dumps(meta))
+    return {**meta, "cached": False, "peak_rss_mb": _peak_rss_mb()}
+
+
+def _open_shard(cache_dir: Path, key: str, rows: int) -> tuple[np.ndarray, np.ndarray]:
+    X = np.memmap(cache_dir / f"{key}.X.f32", dtype=np.float32, mode="r", shape=(rows, N_FEATURES))
+    y = np.memmap(cache_dir / f"{key}.y.i8", dtype=np.int8, mode="r", shape=(rows,))
+    return X, y
+
+
+def assemble(
+    shards: list[dict],
+    cache_dir: Path,
+    run_dir: Path,
+    max_rows: Optional[int] = None,
+    seed: int = 42,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Concatenate cached shard rows into one memory-mapped training matrix.
+
+    Args:
+        shards: featurize_shard results, in shard order
+        cache_dir: Feature cache directory
+        run_dir: Directory of this run the matrix file is written to (the
+            caller deletes it once the model is fitted)
+        max_rows: Keep a uniform random subset of at most this many rows
+        seed: Seed for the subset
+
+    Returns:
+        (X float32 memmap, y int8, shard index per row)
+
+    Raises:
+        ValueError: If the shards have no feature rows (e.g. every series
+            is shorter than the indicator warm-up)
+    """
+    total = sum(s["rows"] for s in shards)
+    if total == 0:
+        raise ValueError("No training rows: every shard is shorter than the feature warm-up")
+    rng = np.random.default_rng(seed)
+    keep_fraction = min(1.0, max_rows / total) if max_rows else 1.0
+
+    # Rows to keep per shard, sorted so they stay in time order
+    selections = []
+    for s in shards:
+        if keep_fraction < 1.0:
+            count = int(round(s["rows"] * keep_fraction))
+            selections.append(np.sort(rng.choice(s["rows"], size=count, replace=False)))
+        else:
+            selections.append(None)
+    n_rows = sum(s["rows"] if sel is None else len(sel) for s, sel in zip(shards, selections))
+
+    matrix_path = Path(run_dir) / "train.X.npy"
+    X = np.lib.format.open_memmap(
+        matrix_path, mode="w+", dtype=np.float32, shape=(n_rows, N_FEATURES)
+    )
+    y = np.empty(n_rows, dtype=np.int8)
+    groups = np.empty(n_rows, dtype=np.int32)
+
+    offset = 0
+    for index, (s, selection) in enumerate(zip(shards, selections)):
+        shard_X, shard_y = _open_shard(cache_dir, s["key"], s["rows"])
+        count = s["rows"] if selection is None else len(selection)
+        for start in range(0, count, FEATURE_BLOCK_ROWS):
+            end = min(start + FEATURE_BLOCK_ROWS, count)
+            rows = slice(start, end) if selection is None else selection[start:end]
+            X[offset + start:offset + end] = shard_X[rows]
+            y[offset + start:offset + end] = shard_y[rows]
+        groups[offset:offset + count] = index
+        offset += count
+
+    X.flush()
+    del X
+    # Reopen read-only: loky passes memmaps to workers by filename, not by copy
+    return np.load(matrix_path, mmap_mode="r"), y, groups
+
+
+def _fit(
+    X: np.ndarray,
+    y: np.ndarray,
+    train_index: Optional[np.ndarray],
+    test_index: Optional[np.ndarray],
+    params: dict,
+    n_jobs: int,
+) -> tuple[Optional[RandomForestClassifier], Optional[float], float, float]:
+    """
+    Fit a forest on the training rows (all rows if train_index is None).
+
+    Returns:
+        (model if final fit else None, test accuracy or None, seconds, worker peak RSS MB)
+    """
+    start = time.perf_counter()
+    model = RandomForestClassifier(**params, n_jobs=n_jobs)
+    if train_index is None:
+        model.fit(X, y)
+        return model, None, time.perf_counter() - start, _peak_rss_mb()
+
+    model.fit(X[train_index], y[train_index])
+    accuracy = float(model.score(X[test_index], y[test_index]))
+    return None, accuracy, time.perf_counter() - start, _peak_rss_mb()
+
+
+def plan_parallelism(
+    n_jobs: int, n_fits: int, fold_bytes: int, max_memory_bytes: Optional[int]
+) -> tuple[int, int]:
+    """
+    Split a CPU budget between concurrent fits and threads per forest.
+
+    Returns:
+        (fits run at once, threads per fit)
+    """
+    concurrent = max(1, min(n_jobs, n_fits))
+    if max_memory_bytes:
+        concurrent = max(1, min(concurrent, max_memory_bytes // max(fold_bytes, 1)))
+    return concurrent, max(1, n_jobs // concurrent)
+
+
+def run_pipeline(
+    data_dir: Path,
+    cache_dir: Path,
+    output_path: Path,
+    cv: int = 5,
+    n_jobs: int = 1,
+    max_memory_gb: Optional[float] = None,
+    max_rows: Optional[int] = None,
+    random_state: int = 42,
+    model_params: Optional[dict] = None,
+) -> dict:
+    """
+    Featurize shards, cross-validate, fit and save the model.
+
+    Args:
+        data_dir: Directory of Parquet shards (timestamp/open/high/low/close/volume),
+            or a candle store whose symbols are used as shards
+        cache_dir: Where featurized shards are kept, and the run's training
+            matrix until the model is fitted
+        output_path: Where the fitted model is saved
+        cv: Number of CV folds (by shard when there are at least `cv` shards)
+        n_jobs: CPU budget shared by featurization and fits
+        max_memory_gb: Memory budget limiting how many folds fit at once
+        max_rows: Train on a random subset of at most this many rows
+        random_state: Seed for the forest and the row subset
+        model_params: RandomForest parameters (default: train_model.MODEL_PARAMS)
+
+    Returns:
+        Report with metrics and per-stage wall time / peak memory
+    """
+    shard_paths = sorted(Path(data_dir).glob("*.parquet"))
+    if not shard_paths:
+        # A candle store: each symbol is a shard
+        shard_paths = [Path(data_dir) / symbol for symbol in CandleStore(data_dir).symbols()]
+    if not shard_paths:
+        raise ValueError(f"No Parquet shards or candle store symbols in {data_dir}")
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    params = {**(model_params or MODEL_PARAMS), "random_state": random_state}
+    report = StageReport()
+
+    print("\n1. Featurizing shards...")
+    with report.stage("features") as info:
+        shards = Parallel(n_jobs=min(n_jobs, len(shard_paths)), backend="loky")(
+            delayed(featurize_shard)(path, cache_dir) for path in shard_paths
+        )
+        info["shards"] = len(shards)
+        info["cached_shards"] = sum(s["cached"] for s in shards)
+        info["worker_peak_rss_mb"] = max(s["peak_rss_mb"] for s in shards)
+    print(f"   {len(shards)} shards ({info['cached_shards']} from cache)")
+
+    # The training matrix is as large as the data: keep it only for this run
+    with tempfile.TemporaryDirectory(prefix="train-", dir=cache_dir) as run_dir:
+        print("\n2. Assembling training matrix...")
+        with report.stage("assemble") as info:
+            X, y, groups = assemble(
+                shards, cache_dir, Path(run_dir), max_rows=max_rows, seed=random_state
+            )
+            info["rows"] = len(y)
+        print(f"   {X.shape[0]:,} samples, {X.shape[1]} features")
+        sell, hold, buy = np.bincount(y, minlength=3)
+        print(f"   Label distribution: SELL={sell}, HOLD={hold}, BUY={buy}")
+
+        print("\n3. Cross-validating and fitting...")
+        with report.stage("train") as info:
+            splitter = GroupKFold(n_splits=cv) if len(shards) >= cv else KFold(n_splits=cv)
+            folds = list(splitter.split(X, y, groups))
+            fold_bytes = int(X.nbytes * (cv - 1) / cv * FOLD_MEMORY_FACTOR)
+            max_memory = int(max_memory_gb * 2**30) if max_memory_gb else None
+            concurrent, threads = plan_parallelism(
+                n_jobs, len(folds) + 1, fold_bytes, max_memory
+            )
+            print(f"   {concurrent} fit(s) at once, {threads} thread(s) each")
+
+            # The final fit on all rows runs alongside the folds
+            jobs = [(None, None)] + folds
+            results = Parallel(n_jobs=concurrent, backend="loky")(
+                delayed(_fit)(X, y, train, test, params, threads) for train, test in jobs
+            )
+            model = results[0][0]
+            cv_scores = np.array([accuracy for _, accuracy, _, _ in results[1:]])
+            info["fit_seconds"] = [round(seconds, 3) for _, _, seconds, _ in results]
+            info["worker_peak_rss_mb"] = max(peak for _, _, _, peak in results)
+        del X
+
+    print(f"   CV Accuracy: {cv_scores.mean():.3f} (+/- {cv_scores.std():.3f})")
+
+    with report.stage("save"):
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(model, output_path)
+    print(f"\n4. Model saved to: {output_path}")
+
+    return {
+        "samples": int(len(y)),
+        "shards": len(shards),
+        "cv_scores": cv_scores.round(4).tolist(),
+        "cv_mean": float(cv_scores.mean()),
+        "cv_std": float(cv_scores.std()),
+        "stages": report.stages,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the model from Parquet shards")
+    parser.add_argument("--data-dir", default="data/shards", help="Parquet shards or candle store")
+    parser.add_argument("--cache-dir", default="data/feature_cache")
+    parser.add_argument("--output", default="models/trading_model.pkl")
+    parser.add_argument("--report", help="Also write the report as JSON here")
+    parser.add_argument("--cv", type=int, default=5)
+    parser.add_argument("--n-jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-memory-gb", type=float, help="Memory budget for fold fits")
+    parser.add_argument("--max-rows", type=int, help="Train on a random subset of rows")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Trading ML Model Training Pipeline")
+    print("=" * 60)
+
+    result = run_pipeline(
+        Path(args.data_dir),
+        Path(args.cache_dir),
+        Path(args.output),
+        cv=args.cv,
+        n_jobs=args.n_jobs,
+        max_memory_gb=args.max_memory_gb,
+        max_rows=args.max_rows,
+        random_state=args.seed,
+    )
+
+    print("\n" + "=" * 60)
+    print(f"{'Stage':<12} {'Wall (s)':>10} {'Peak RSS (MB)':>15} {'Workers (MB)':>14}")
+    for stage in result["stages"]:
+        workers = stage.get("worker_peak_rss_mb")
+        print(
+            f"{stage['stage']:<12} {stage['wall_seconds']:>10.2f} {stage['peak_rss_mb']:>15.0f} "
+            f"{(f'{workers:.0f}' if workers else '-'):>14}"
+        )
+
+    if args.report:
+        Path(args.report).write_text(json.dumps(result, indent=2) + "\n")
+        print(f"\nReport written to {args.report}")
@@ -0,0 +1,6 @@
+"""Shared test setup."""
+
+import os
+
+# Set the test API key before any test imports the app (settings reads env at import time)
+os.environ.setdefault("ML_SERVICE_API_KEY", "test-secret-key")
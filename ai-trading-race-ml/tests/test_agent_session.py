@@ -0,0 +1,98 @@
+"""Tests for streaming agent sessions."""
+
+import numpy as np
+import pytest
+
+from app.models.schemas import AgentSessionUpdate
+from app.services.agent_session import AgentSession
+from app.services.candle_buffer import CandleBuffer
+from tests.test_candle_buffer import candle_rows, make_context
+
+
+class TestAgentSession:
+    """Tests for AgentSession."""
+
+    def test_window_slides_with_new_candles(self):
+        """Test each symbol keeps the length it subscribed with."""
+        session = AgentSession(make_context(candle_rows("BTC", 20), []))
+
+        [first] = session.tick().resolved_series()
+        update = AgentSessionUpdate.model_validate({"candles": candle_rows("BTC", 3, start=20)})
+        [series] = session.tick(update).resolved_series()
+
+        assert len(first) == len(series) == 20
+        assert series.ohlcv[0, 3] == 103
+        assert series.ohlcv[-1, 3] == 122
+        assert session.ticks == 2
+
+    def test_update_keeps_unchanged_fields(self):
+        """Test fields missing from an update keep their previous values."""
+        context = make_context(candle_rows("BTC", 5), [])
+        session = AgentSession(context.model_copy(update={"instructions": "be careful"}))
+        session.tick()
+
+        portfolio = {"cash": "5", "positions": [], "totalValue": "5"}
+        context = session.tick(
+            AgentSessionUpdate.model_validate({"requestId": "r2", "portfolio": portfolio})
+        )
+
+        assert context.request_id == "r2"
+        assert context.portfolio.cash == 5
+        assert context.instructions == "be careful"
+        assert context.candles == []
+        assert len(context.resolved_series()[0]) == 5
+
+    def test_new_symbol_in_update(self):
+        """Test a symbol first sent in an update gets its own window."""
+        session = AgentSession(make_context(candle_rows("BTC", 5), []))
+        session.tick()
+
+        update = AgentSessionUpdate.model_validate({"candles": candle_rows("ETH", 8)})
+        resolved = session.tick(update).resolved_series()
+
+        assert [(s.symbol, len(s)) for s in resolved] == [("BTC", 5), ("ETH", 8)]
+
+    def test_windows_from_shared_buffer(self):
+        """Test a subscription can name windows of candles pushed by others."""
+        buffer = CandleBuffer()
+        AgentSession(make_context(candle_rows("BTC", 50), []), buffer, ingest=True).tick()
+
+        session = AgentSession(make_context([], [{"symbol": "BTC", "length": 10}]), buffer)
+        [series] = session.tick().resolved_series()
+
+        np.testing.assert_array_equal(series.close, np.arange(140, 150))
+
+    def test_session_candles_stay_private(self):
+        """Test a stream client can't change what others' candle windows read."""
+        buffer = CandleBuffer()
+        buffer.resolve(make_context(candle_rows("BTC", 50), []), ingest=True)
+        window = make_context([], [{"symbol": "BTC", "length": 10}])
+        [before] = buffer.resolve(window)
+
+        stale = [{**row, "close": "1"} for row in candle_rows("BTC", 60)]
+        session = AgentSession(make_context(stale + candle_rows("ETH", 5), []), buffer)
+        session.tick()
+        session.tick(AgentSessionUpdate.model_validate({"candles": candle_rows("BTC", 1, 60)}))
+
+        [after] = buffer.resolve(window)
+        np.testing.assert_array_equal(after.ohlcv, before.ohlcv)
+        assert "ETH" not in buffer
+        assert session.context.resolved_series()[0].close[-1] == 160
+
+    def test_evicted_symbol(self):
+        """Test a window whose candles were evicted is reported, not dropped."""
+        buffer = CandleBuffer(max_symbols=1)
+        buffer.resolve(make_context(candle_rows("BTC", 5), []), ingest=True)
+        session = AgentSession(make_context([], [{"symbol": "BTC"}]), buffer)
+        session.tick()
+        buffer.resolve(make_context(candle_rows("ETH", 5), []), ingest=True)
+
+        with pytest.raises(ValueError, match="No candles retained for BTC"):
+            session.tick(AgentSessionUpdate())
+
+    def test_window_end_rejected(self):
+        """Test subscription windows can't end before the latest candle."""
+        context = make_context([], [{"symbol": "BTC", "end": "2024-01-01T00:00:00Z"}])
+
+        with pytest.raises(ValueError):
+            AgentSession(context)
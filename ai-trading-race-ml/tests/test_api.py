@@ -1,23 +1,24 @@
 """Tests for FastAPI endpoints."""
 
+import base64
 import os
 from datetime import datetime, timezone, timedelta
 from decimal import Decimal
 
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
 
-# Set test API key before importing app (settings reads env at import time)
-os.environ.setdefault("ML_SERVICE_API_KEY", "test-secret-key")
-
-from app.main import app
+from app.main import app, limiter
 
+# Set in conftest.py
 TEST_API_KEY = os.environ["ML_SERVICE_API_KEY"]
 
 
 @pytest.fixture
 def client():
     """Create a test client with proper lifespan initialization."""
+    limiter.reset()
     with TestClient(app) as c:
         yield c
 
@@ -46,6 +47,39 @@ class TestHealthEndpoint:
         assert response.status_code == 200
 
 
+class TestAuthentication:
+    """Tests for API key authentication."""
+
+    def test_missing_api_key(self, client):
+        """Test protected endpoints reject requests without a key."""
+        response = client.post("/predict", json={})
+
+        assert response.status_code == 401
+        assert response.json() == {"detail": "Missing API key"}
+
+    def test_invalid_api_key(self, client):
+        """Test protected endpoints reject a wrong key."""
+        response = client.post("/predict", json={}, headers={"X-API-Key": "wrong"})
+
+        assert response.status_code == 401
+        assert response.json() == {"detail": "Invalid API key"}
+
+    def test_unconfigured_api_key_fails_closed(self, client, monkeypatch):
+        """Test requests are refused when no API key is configured."""
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "api_key", "")
+        response = client.post("/predict", json={}, headers={"X-API-Key": "anything"})
+
+        assert response.status_code == 500
+
+    def test_docs_hidden_outside_development(self, client, monkeypatch):
+        """Test docs paths return 404 outside development."""
+        monkeypatch.setenv("ENVIRONMENT", "production")
+
+        assert client.get("/openapi.json").status_code == 404
+
+
 class TestPredictEndpoint:
     """Tests for /predict endpoint."""
 
@@ -126,3 +160,382 @@ class TestPredictEndpoint:
         assert response.status_code == 200
         data = response.json()
         assert data["orders"] == []  # No trades with no data
+
+    def test_predict_packed_candle_columns(self, client):
+        """Test packed float64 columns give the same decision as candle objects."""
+        context = self.get_valid_context()
+        candles = context["candles"]
+        columns = np.array(
+            [
+                [datetime.fromisoformat(c["timestamp"]).timestamp() * 1000 for c in candles],
+                *[[float(c[k]) for c in candles] for k in ("open", "high", "low", "close")],
+                [float(c["volume"]) for c in candles],
+            ],
+            dtype="<f8",
+        )
+        columnar = {
+            **context,
+            "candles": [],
+            "candleColumns": [
+                {"symbol": "BTC", "packed": base64.b64encode(columns.tobytes()).decode()}
+            ],
+        }
+        headers = {"X-API-Key": TEST_API_KEY}
+
+        expected = client.post("/predict", json=context, headers=headers).json()
+        response = client.post("/predict", json=columnar, headers=headers)
+
+        assert response.status_code == 200
+        assert response.json()["orders"] == expected["orders"]
+        assert response.json()["signals"] == expected["signals"]
+
+
+class TestPredictBatchEndpoint:
+    """Tests for /predict/batch endpoint."""
+
+    def get_contexts(self, n: int) -> list[dict]:
+        """Create n agent contexts sharing the same candle history."""
+        base = TestPredictEndpoint().get_valid_context()
+        return [{**base, "agentId": f"agent-{i}"} for i in range(n)]
+
+    def test_predict_batch_returns_one_decision_per_context(self, client):
+        """Test batch endpoint returns decisions in request order."""
+        contexts = self.get_contexts(3)
+        response = client.post(
+            "/predict/batch", json=contexts, headers={"X-API-Key": TEST_API_KEY}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [d["agentId"] for d in data] == ["agent-0", "agent-1", "agent-2"]
+        assert all("orders" in d and "signals" in d for d in data)
+
+    def test_predict_batch_matches_single_predict(self, client):
+        """Test batch decisions match the single-agent endpoint."""
+        context = TestPredictEndpoint().get_valid_context()
+        headers = {"X-API-Key": TEST_API_KEY}
+
+        single = client.post("/predict", json=context, headers=headers).json()
+        batch = client.post("/predict/batch", json=[context], headers=headers).json()
+
+        assert batch[0]["orders"] == single["orders"]
+        assert batch[0]["signals"] == single["signals"]
+        assert batch[0]["reasoning"] == single["reasoning"]
+
+    def test_predict_batch_empty(self, client):
+        """Test batch endpoint accepts an empty list."""
+        response = client.post("/predict/batch", json=[], headers={"X-API-Key": TEST_API_KEY})
+
+        assert response.status_code == 200
+        assert response.json() == []
+
+    def test_predict_batch_too_large(self, client, monkeypatch):
+        """Test batch endpoint rejects batches above the configured size."""
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "max_batch_size", 2)
+        response = client.post(
+            "/predict/batch", json=self.get_contexts(3), headers={"X-API-Key": TEST_API_KEY}
+        )
+
+        assert response.status_code == 400
+
+
+class TestCandleBuffer:
+    """Tests for /candles and candleWindows."""
+
+    @pytest.fixture
+    def buffered_client(self, monkeypatch):
+        """Test client with the candle buffer enabled."""
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "candle_buffer_enabled", True)
+        limiter.reset()
+        with TestClient(app) as c:
+            yield c
+
+    def test_push_candles(self, buffered_client):
+        """Test pushed candles are counted per symbol."""
+        candles = TestPredictEndpoint().get_valid_context()["candles"]
+        response = buffered_client.post(
+            "/candles", json={"candles": candles}, headers={"X-API-Key": TEST_API_KEY}
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {"appended": {"BTC": 30}, "retained": {"BTC": 30}}
+
+    def test_window_with_delta_matches_full_request(self, buffered_client):
+        """Test a window plus the newest candle decides like the full history."""
+        context = TestPredictEndpoint().get_valid_context()
+        candles = context["candles"]
+        headers = {"X-API-Key": TEST_API_KEY}
+        buffered_client.post("/candles", json={"candles": candles[:-1]}, headers=headers)
+
+        windowed = {
+            **context,
+            "candles": candles[-1:],
+            "candleWindows": [{"symbol": "BTC", "length": len(candles)}],
+        }
+        response = buffered_client.post("/predict", json=windowed, headers=headers)
+        expected = buffered_client.post("/predict", json=context, headers=headers).json()
+
+        assert response.status_code == 200
+        assert response.json()["orders"] == expected["orders"]
+        assert response.json()["signals"] == expected["signals"]
+
+    def test_window_of_unknown_symbol(self, buffered_client):
+        """Test a window of a symbol without retained candles returns 400."""
+        context = {
+            **TestPredictEndpoint().get_valid_context(),
+            "candles": [],
+            "candleWindows": [{"symbol": "ETH"}],
+        }
+        response = buffered_client.post(
+            "/predict", json=context, headers={"X-API-Key": TEST_API_KEY}
+        )
+
+        assert response.status_code == 400
+
+    def test_stream_candles_stay_private(self, buffered_client):
+        """Test candles sent in a stream don't change the shared buffer."""
+        import app.main as main
+
+        candles = TestPredictEndpoint().get_valid_context()["candles"]
+        headers = {"X-API-Key": TEST_API_KEY}
+        buffered_client.post("/candles", json={"candles": candles[:-1]}, headers=headers)
+        before = main.candle_buffer.window("BTC")
+
+        stale = [{**candle, "close": "1"} for candle in candles]
+        with buffered_client.websocket_connect("/predict/stream", headers=headers) as ws:
+            ws.send_json({**TestPredictEndpoint().get_valid_context(), "candles": stale})
+            assert "orders" in ws.receive_json()
+
+        after = main.candle_buffer.window("BTC")
+        np.testing.assert_array_equal(after.timestamps, before.timestamps)
+        np.testing.assert_array_equal(after.ohlcv, before.ohlcv)
+
+    def test_buffer_disabled(self, client):
+        """Test /candles and candleWindows are rejected while the buffer is off."""
+        headers = {"X-API-Key": TEST_API_KEY}
+        context = {
+            **TestPredictEndpoint().get_valid_context(),
+            "candleWindows": [{"symbol": "BTC"}],
+        }
+
+        assert client.post("/candles", json={"candles": []}, headers=headers).status_code == 400
+        assert client.post("/predict", json=context, headers=headers).status_code == 400
+
+
+class TestPredictStream:
+    """Tests for the /predict/stream WebSocket."""
+
+    def test_requires_api_key(self, client):
+        """Test the handshake is refused without a valid key."""
+        from starlette.websockets import WebSocketDisconnect
+
+        with pytest.raises(WebSocketDisconnect) as e:
+            with client.websocket_connect("/predict/stream", headers={"X-API-Key": "wrong"}):
+                pass
+        assert e.value.code == 1008
+
+    def test_updates_match_polling(self, client, monkeypatch):
+        """Test streamed decisions match /predict called with the same windows."""
+        from app.services.rate_limiter import RateLimit
+
+        monkeypatch.setitem(limiter.limits, "predict", RateLimit(100, 60))
+        context = TestPredictEndpoint().get_valid_context()
+        candles = context["candles"]
+        headers = {"X-API-Key": TEST_API_KEY}
+        subscription = {**context, "candles": candles[:20]}
+        portfolio = {"cash": "5000", "positions": [], "totalValue": "5000"}
+
+        with client.websocket_connect("/predict/stream", headers=headers) as ws:
+            ws.send_json(subscription)
+            streamed = [ws.receive_json()]
+            for i in range(20, 30):
+                ws.send_json({"candles": [candles[i]], "portfolio": portfolio})
+                streamed.append(ws.receive_json())
+
+        polled = [client.post("/predict", json=subscription, headers=headers).json()]
+        for i in range(20, 30):
+            window = {**context, "candles": candles[i - 19:i + 1], "portfolio": portfolio}
+            polled.append(client.post("/predict", json=window, headers=headers).json())
+
+        for got, expected in zip(streamed, polled):
+            assert got["agentId"] == "test-agent"
+            assert got["orders"] == expected["orders"]
+            assert got["signals"] == expected["signals"]
+
+    def test_invalid_message_keeps_session_open(self, client):
+        """Test a bad update gets an error message and the session goes on."""
+        headers = {"X-API-Key": TEST_API_KEY}
+        context = TestPredictEndpoint().get_valid_context()
+
+        with client.websocket_connect("/predict/stream", headers=headers) as ws:
+            ws.send_json({"agentId": "test-agent"})
+            assert ws.receive_json()["error"]["status"] == 422
+
+            ws.send_json(context)
+            assert "orders" in ws.receive_json()
+
+            ws.send_json({"portfolio": {"cash": "oops"}})
+            assert ws.receive_json()["error"]["status"] == 422
+
+            ws.send_json({"requestId": "tick-2"})
+            assert ws.receive_json()["requestId"] == "tick-2"
+
+    def test_max_sessions(self, client, monkeypatch):
+        """Test connections beyond the session limit are closed with 1013."""
+        from starlette.websockets import WebSocketDisconnect
+
+        import app.main as main
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "stream_max_sessions", 1)
+        headers = {"X-API-Key": TEST_API_KEY}
+        with client.websocket_connect("/predict/stream", headers=headers):
+            with pytest.raises(WebSocketDisconnect) as e:
+                with client.websocket_connect("/predict/stream", headers=headers) as ws:
+                    ws.receive_json()
+            assert main.stream_sessions == 1
+
+        assert e.value.code == 1013
+        with client.websocket_connect("/predict/stream", headers=headers) as ws:
+            ws.send_json(TestPredictEndpoint().get_valid_context())
+            assert "orders" in ws.receive_json()
+
+    def test_binary_frame(self, client):
+        """Test a binary frame gets an error message and the session goes on."""
+        with client.websocket_connect(
+            "/predict/stream", headers={"X-API-Key": TEST_API_KEY}
+        ) as ws:
+            ws.send_bytes(b"{}")
+            assert ws.receive_json()["error"]["status"] == 400
+
+            ws.send_json(TestPredictEndpoint().get_valid_context())
+            assert "orders" in ws.receive_json()
+
+
+class TestRateLimit:
+    """Tests for /predict rate limiting."""
+
+    def test_limit_returns_429_with_retry_after(self, client, monkeypatch):
+        """Test requests over the limit get 429 and a Retry-After header."""
+        from app.main import limiter
+        from app.services.rate_limiter import RateLimit
+
+        monkeypatch.setitem(limiter.limits, "predict", RateLimit(1, 60))
+        context = TestPredictEndpoint().get_valid_context()
+        headers = {"X-API-Key": TEST_API_KEY}
+
+        assert client.post("/predict", json=context, headers=headers).status_code == 200
+        response = client.post("/predict", json=context, headers=headers)
+
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) > 0
+
+    def test_limit_per_agent_id(self, client, monkeypatch):
+        """Test agent_id keying gives each agent its own budget."""
+        from app.main import limiter
+        from app.services.rate_limiter import RateLimit
+
+        monkeypatch.setitem(limiter.limits, "predict", RateLimit(1, 60))
+        monkeypatch.setattr(limiter, "key_func", "agent_id")
+        context = TestPredictEndpoint().get_valid_context()
+        headers = {"X-API-Key": TEST_API_KEY}
+
+        first = client.post("/predict", json=context, headers=headers)
+        other = client.post("/predict", json={**context, "agentId": "other"}, headers=headers)
+        repeat = client.post("/predict", json=context, headers=headers)
+
+        assert (first.status_code, other.status_code, repeat.status_code) == (200, 200, 429)
+
+
+class TestExecutorBackpressure:
+    """Tests for load shedding when the decision pool is full."""
+
+    def test_saturated_pool_returns_503_with_retry_after(self, client, monkeypatch):
+        """Test a full decision pool sheds load with 503 + Retry-After."""
+        import app.main as main
+
+        executor = main.decision_executor
+        monkeypatch.setattr(executor, "max_queue", -executor.max_workers)
+        context = TestPredictEndpoint().get_valid_context()
+        response = client.post("/predict", json=context, headers={"X-API-Key": TEST_API_KEY})
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(main.settings.executor_retry_after_seconds)
+
+
+class TestModelReloadEndpoint:
+    """Tests for /admin/model/reload."""
+
+    def test_reload_requires_api_key(self, client):
+        """Test the admin endpoint is protected."""
+        response = client.post("/admin/model/reload")
+
+        assert response.status_code == 401
+
+    def test_reload_unchanged_model(self, client):
+        """Test reloading an unchanged model file reports it as unchanged."""
+        response = client.post("/admin/model/reload", headers={"X-API-Key": TEST_API_KEY})
+        data = response.json()
+
+        assert response.status_code == 200
+        assert data["status"] == "unchanged"
+        assert data["nFeatures"] > 0
+
+    def test_forced_reload_updates_health_version(self, client):
+        """Test a forced reload swaps the model and reports the new version."""
+        response = client.post(
+            "/admin/model/reload?force=true&modelVersion=2.0.0",
+            headers={"X-API-Key": TEST_API_KEY},
+        )
+
+        assert response.json()["status"] == "reloaded"
+        assert client.get("/health").json()["modelVersion"] == "2.0.0"
+
+    def test_forced_reload_updates_decision_version(self, client):
+        """Test decisions made after a reload report the new model version."""
+        headers = {"X-API-Key": TEST_API_KEY}
+        context = TestPredictEndpoint().get_valid_context()
+        before = client.post("/predict", json=context, headers=headers).json()
+
+        client.post("/admin/model/reload?force=true&modelVersion=2.0.0", headers=headers)
+        after = client.post("/predict", json=context, headers=headers).json()
+        [batch] = client.post("/predict/batch", json=[context], headers=headers).json()
+
+        assert before["modelVersion"] == "1.0.0"
+        assert after["modelVersion"] == batch["modelVersion"] == "2.0.0"
+
+
+class TestMetricsEndpoint:
+    """Tests for /metrics."""
+
+    def test_metrics_requires_api_key(self, client):
+        """Test metrics are protected unless configured as public."""
+        response = client.get("/metrics")
+
+        assert response.status_code == 401
+
+    def test_metrics_public(self, client, monkeypatch):
+        """Test metrics can be scraped without a key when public."""
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "metrics_public", True)
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+
+    def test_predict_records_stages(self, client):
+        """Test a prediction records every stage of the pipeline."""
+        context = TestPredictEndpoint().get_valid_context()
+        client.post("/predict", json=context, headers={"X-API-Key": TEST_API_KEY})
+
+        body = client.get("/metrics", headers={"X-API-Key": TEST_API_KEY}).text
+
+        for stage in ("parse", "candles", "features", "predict", "signals", "serialize"):
+            assert f'stage="{stage}"' in body
+        assert 'ml_symbol_feature_duration_seconds_count{symbol="BTC"}' in body
+        assert 'ml_decisions_total{action=' in body
+        assert 'ml_request_duration_seconds_count{path="/predict",status="200"}' in body
@@ -0,0 +1,177 @@
+"""Tests for the walk-forward backtest engine."""
+
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+
+from app.ml.feature_engine import latest_features
+from app.ml.predictor import PredictedAction, TradingPredictor
+from app.models.enums import TradeSide
+from app.services.backtest import (
+    NO_ACTION,
+    BacktestConfig,
+    BarPredictions,
+    predict_history,
+    run_backtest,
+    simulate,
+)
+from app.services.candle_series import CandleSeries
+from app.services.decision_service import order_quantity
+
+BUY, SELL, HOLD = PredictedAction.BUY, PredictedAction.SELL, PredictedAction.HOLD
+HOUR_NS = 3_600 * 10**9
+
+
+def make_series(symbol: str, n: int = 200, seed: int = 0, offset: int = 0) -> CandleSeries:
+    """Random-walk hourly candles starting `offset` hours into 2024."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.cumprod(1 + rng.uniform(-0.02, 0.02, n))
+    ohlcv = np.column_stack([close, close * 1.01, close * 0.99, close, rng.uniform(100, 1000, n)])
+    timestamps = 1_704_067_200 * 10**9 + (offset + np.arange(n, dtype=np.int64)) * HOUR_NS
+    return CandleSeries(symbol, timestamps, ohlcv, Decimal(repr(float(close[-1]))))
+
+
+def make_predictions(close, action, confidence=None, symbols=None) -> BarPredictions:
+    """BarPredictions from (n_times, n_symbols) lists."""
+    close = np.array(close, dtype=np.float64)
+    n_times, n_symbols = close.shape
+    return BarPredictions(
+        symbols=symbols or [f"S{i}" for i in range(n_symbols)],
+        timestamps=np.arange(n_times, dtype=np.int64) * HOUR_NS,
+        close=close,
+        action=np.array(action, dtype=np.int8),
+        confidence=np.full(close.shape, 0.8) if confidence is None else np.array(confidence),
+        bars=close.size,
+        feature_seconds=0.0,
+        predict_seconds=0.0,
+    )
+
+
+class TestSimulate:
+    """Tests for the portfolio simulation."""
+
+    def test_sizes_orders_like_live_decisions(self):
+        """Test that each fill has the quantity the live decision would order."""
+        predictions = make_predictions([[100.0], [110.0]], [[BUY], [BUY]])
+
+        result = simulate(predictions, BacktestConfig(starting_cash=Decimal("10000")))
+
+        first = order_quantity(0.8, Decimal("10000"), Decimal("100.0"))
+        assert result.trades[0].quantity == first
+        value = Decimal("10000") - first * Decimal("100.0") + first * Decimal("110.0")
+        assert result.trades[1].quantity == order_quantity(0.8, value, Decimal("110.0"))
+
+    def test_equity_is_cash_plus_holdings(self):
+        """Test that the equity curve marks holdings to each bar's close."""
+        predictions = make_predictions(
+            [[100.0], [120.0], [110.0], [95.0]], [[BUY], [HOLD], [SELL], [HOLD]]
+        )
+
+        result = simulate(predictions, BacktestConfig(starting_cash=Decimal("10000")))
+
+        held = float(result.trades[0].quantity - result.trades[1].quantity)
+        assert result.cash[0] == 10000 - float(result.trades[0].quantity) * 100
+        assert np.isclose(result.equity[3], result.cash[3] + held * 95.0)
+        assert np.isclose(result.equity[1], result.cash[1] + float(result.trades[0].quantity) * 120)
+        assert result.stats["final_equity"] == result.equity[-1]
+
+    def test_trades_frame(self):
+        """Test the trade log frame holds plain side strings and UTC timestamps."""
+        predictions = make_predictions([[100.0], [120.0]], [[BUY], [SELL]])
+
+        frame = simulate(predictions, BacktestConfig()).trades_frame()
+
+        assert frame["side"].tolist() == ["BUY", "SELL"]
+        assert str(frame["timestamp"].dt.tz) == "UTC"
+
+    def test_rejects_sells_without_holdings(self):
+        """Test that sells beyond the holdings are rejected, not shorted."""
+        predictions = make_predictions([[100.0], [100.0]], [[SELL], [SELL]])
+
+        result = simulate(predictions)
+
+        assert result.trades == []
+        assert result.stats["rejected_sells"] == 2
+        assert (result.equity == 100000).all()
+
+    def test_rejects_buys_beyond_cash(self):
+        """Test that buys stop once the cash runs out."""
+        predictions = make_predictions([[100.0]] * 40, [[BUY]] * 40)
+
+        result = simulate(predictions, BacktestConfig(position_fraction=Decimal("0.5")))
+
+        assert result.stats["rejected_buys"] > 0
+        assert (result.cash >= 0).all()
+        assert result.stats["buys"] + result.stats["rejected_buys"] == 40
+
+    def test_orders_share_a_portfolio_snapshot(self):
+        """Test that orders of one bar are sized from the same portfolio value."""
+        predictions = make_predictions([[100.0, 50.0]], [[BUY, BUY]])
+
+        result = simulate(predictions, BacktestConfig(starting_cash=Decimal("10000")))
+
+        assert [t.symbol for t in result.trades] == ["S0", "S1"]
+        assert result.trades[1].quantity == order_quantity(0.8, Decimal("10000"), Decimal("50.0"))
+
+    def test_min_confidence_and_decision_every(self):
+        """Test that unconfident predictions and off-schedule bars are skipped."""
+        predictions = make_predictions(
+            [[100.0]] * 6, [[BUY]] * 6, confidence=[[0.8], [0.8], [0.8], [0.4], [0.8], [0.8]]
+        )
+
+        confident = simulate(predictions, BacktestConfig(min_confidence=0.5))
+        every_third = simulate(predictions, BacktestConfig(decision_every=3))
+
+        assert len(confident.trades) == 5
+        assert [t.timestamp // HOUR_NS for t in every_third.trades] == [0, 3]
+
+    def test_no_action_bars_are_skipped(self):
+        """Test that bars without a prediction never trade."""
+        predictions = make_predictions([[np.nan], [100.0]], [[NO_ACTION], [BUY]])
+
+        result = simulate(predictions)
+
+        assert len(result.trades) == 1
+        assert result.equity[0] == 100000
+
+
+class TestPredictHistory:
+    """Tests for predicting every bar of a history."""
+
+    def test_last_bar_matches_live_prediction(self):
+        """Test that the last bar's prediction equals one on the full series."""
+        predictor = TradingPredictor(Path("models/trading_model.pkl"))
+        series = make_series("BTC")
+
+        predictions = predict_history(predictor, [series])
+
+        live = predictor.predict_proba(latest_features(series.close, series.volume))[0]
+        assert predictions.action[-1, 0] == np.argmax(live)
+        assert np.isclose(predictions.confidence[-1, 0], np.max(live))
+
+    def test_aligns_symbols_on_common_timeline(self):
+        """Test that symbols with different ranges share one forward-filled timeline."""
+        predictor = TradingPredictor(Path("models/trading_model.pkl"))
+        btc, eth = make_series("BTC"), make_series("ETH", n=100, seed=1, offset=150)
+
+        predictions = predict_history(predictor, [btc, eth], chunk_rows=37)
+
+        assert len(predictions.timestamps) == 250
+        assert predictions.bars == 300
+        assert np.isnan(predictions.close[:150, 1]).all()
+        assert (predictions.action[:150, 1] == NO_ACTION).all()
+        assert predictions.close[-1, 0] == btc.close[-1]  # Forward-filled
+        assert predictions.close[-1, 1] == eth.close[-1]
+        assert (predictions.action[:10] == NO_ACTION).all()  # Warm-up
+
+    def test_rule_based_fallback(self):
+        """Test that a missing model replays the rule-based predictions."""
+        predictor = TradingPredictor(Path("/nonexistent/model.pkl"))
+
+        result = run_backtest(predictor, [make_series("BTC")])
+
+        actions = result.stats["buys"] + result.stats["sells"]
+        assert actions == len(result.trades)
+        assert all(t.side in (TradeSide.BUY, TradeSide.SELL) for t in result.trades)
+        assert result.stats["bars"] == 200
@@ -1,160 +1,250 @@
 """Tests for Redis cache service."""
 
-import json
-from unittest.mock import Mock, patch
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
+from redis.exceptions import RedisError
 
-from app.services.cache_service import CacheService
+from app.services.cache_service import AsyncCacheService, CachedResponse
 
 
-class TestCacheService:
-    """Test suite for CacheService."""
+def enable_redis(mock_settings):
+    """Configure mocked settings for an enabled Redis."""
+    mock_settings.redis_enabled = True
+    mock_settings.redis_host = "localhost"
+    mock_settings.redis_port = 6379
+    mock_settings.redis_db = 0
+    mock_settings.redis_password = None
+    mock_settings.redis_ttl_seconds = 3600
+    mock_settings.redis_max_connections = 10
+    mock_settings.redis_socket_timeout_seconds = 5.0
+    mock_settings.idempotency_l1_max_entries = 100
+    mock_settings.idempotency_l1_max_bytes = 1024 * 1024
+    mock_settings.idempotency_l1_ttl_seconds = 60.0
+    mock_settings.idempotency_l1_negative_ttl_seconds = 60.0
 
-    @patch("app.services.cache_service.redis.Redis")
-    @patch("app.services.cache_service.settings")
-    def test_init_redis_enabled(self, mock_settings, mock_redis):
-        """Test cache service initialization when Redis is enabled."""
-        mock_settings.redis_enabled = True
-        mock_settings.redis_host = "localhost"
-        mock_settings.redis_port = 6379
-        mock_settings.redis_db = 0
-        mock_settings.redis_password = None
 
-        mock_redis_instance = Mock()
-        mock_redis.return_value = mock_redis_instance
+class TestAsyncCacheService:
+    """Test suite for AsyncCacheService."""
+
+    @pytest.mark.asyncio
+    @patch("app.services.cache_service.aioredis")
+    @patch("app.services.cache_service.settings")
+    async def test_connect_uses_shared_pool(self, mock_settings, mock_aioredis):
+        """Test connect() builds one bounded pool and pings it."""
+        enable_redis(mock_settings)
+        client = AsyncMock()
+        mock_aioredis.Redis.return_value = client
 
-        cache = CacheService()
+        cache = AsyncCacheService()
+        await cache.connect()
 
         assert cache.is_available
-        mock_redis_instance.ping.assert_called_once()
+        assert mock_aioredis.ConnectionPool.call_args.kwargs["max_connections"] == 10
+        client.ping.assert_awaited_once()
 
+    @pytest.mark.asyncio
+    @patch("app.services.cache_service.aioredis")
     @patch("app.services.cache_service.settings")
-    def test_init_redis_disabled(self, mock_settings):
-        """Test cache service initialization when Redis is disabled."""
-        mock_settings.redis_enabled = False
+    async def test_connect_failure_disables_cache(self, mock_settings, mock_aioredis):
+        """Test a failed ping leaves the cache disabled."""
+        enable_redis(mock_settings)
+        client = AsyncMock()
+        client.ping.side_effect = RedisError("down")
+        mock_aioredis.Redis.return_value = client
 
-        cache = CacheService()
+        cache = AsyncCacheService()
+        await cache.connect()
 
         assert not cache.is_available
+        assert await cache.get("test-key") is None
+        client.aclose.assert_awaited_once()
 
-    @patch("app.services.cache_service.redis.Redis")
+    @pytest.mark.asyncio
+    @patch("app.services.cache_service.aioredis")
     @patch("app.services.cache_service.settings")
-    def test_get_cache_hit(self, mock_settings, mock_redis):
-        """Test get() returns cached data on hit."""
-        mock_settings.redis_enabled = True
-        mock_settings.redis_host = "localhost"
-        mock_settings.redis_port = 6379
-        mock_settings.redis_db = 0
-        mock_settings.redis_password = None
-
-        mock_redis_instance = Mock()
-        mock_redis.return_value = mock_redis_instance
-
-        cached_data = {"key": "value", "number": 42}
-        mock_redis_instance.get.return_value = json.dumps(cached_data)
+    async def test_connect_redis_disabled(self, mock_settings, mock_aioredis):
+        """Test connect() doesn't open a pool when Redis is disabled."""
+        enable_redis(mock_settings)
+        mock_settings.redis_enabled = False
 
-        cache = CacheService()
-        result = cache.get("test-key")
+        cache = AsyncCacheService()
+        await cache.connect()
 
-        assert result == cached_data
-        mock_redis_instance.get.assert_called_once_with("idempotency:test-key")
+        assert not cache.is_available
+        assert cache.client is None
+        mock_aioredis.ConnectionPool.assert_not_called()
 
-    @patch("app.services.cache_service.redis.Redis")
+    @pytest.mark.asyncio
     @patch("app.services.cache_service.settings")
-    def test_get_cache_miss(self, mock_settings, mock_redis):
-        """Test get() returns None on cache miss."""
-        mock_settings.redis_enabled = True
-        mock_settings.redis_host = "localhost"
-        mock_settings.redis_port = 6379
-        mock_settings.redis_db = 0
-        mock_settings.redis_password = None
-
-        mock_redis_instance = Mock()
-        mock_redis.return_value = mock_redis_instance
-        mock_redis_instance.get.return_value = None
+    async def test_get_and_set_when_disabled(self, mock_settings):
+        """Test get() misses and set() reports False with no Redis and no L1."""
+        enable_redis(mock_settings)
+        mock_settings.redis_enabled = False
+        mock_settings.idempotency_l1_max_entries = 0
 
-        cache = CacheService()
-        result = cache.get("missing-key")
+        cache = AsyncCacheService()
+        await cache.connect()
 
-        assert result is None
+        assert await cache.set("test-key", CachedResponse(body=b"{}", status_code=200)) is False
+        assert await cache.get("test-key") is None
 
-    @patch("app.services.cache_service.redis.Redis")
+    @pytest.mark.asyncio
+    @patch("app.services.cache_service.aioredis")
     @patch("app.services.cache_service.settings")
-    def test_set_cache_success(self, mock_settings, mock_redis):
-        """Test set() stores data successfully."""
-        mock_settings.redis_enabled = True
-        mock_settings.redis_host = "localhost"
-        mock_settings.redis_port = 6379
-        mock_settings.redis_db = 0
-        mock_settings.redis_password = None
-        mock_settings.redis_ttl_seconds = 3600
-
-        mock_redis_instance = Mock()
-        mock_redis.return_value = mock_redis_instance
-
-        cache = CacheService()
-        data = {"key": "value"}
-        result = cache.set("test-key", data)
-
-        assert result is True
-        mock_redis_instance.setex.assert_called_once_with(
-            "idempotency:test-key", 3600, json.dumps(data)
+    async def test_set_and_get(self, mock_settings, mock_aioredis):
+        """Test set() writes a hash of raw bytes and get() reads it back."""
+        enable_redis(mock_settings)
+        mock_settings.idempotency_l1_max_entries = 0  # Always go to Redis
+        client = AsyncMock()
+        pipe = Mock()
+        pipe.execute = AsyncMock()
+        client.pipeline = Mock(return_value=pipe)
+        mock_aioredis.Redis.return_value = client
+        client.hgetall.return_value = {
+            b"body": b'{"a":1}',
+            b"status": b"200",
+            b"content_type": b"application/json",
+        }
+
+        cache = AsyncCacheService()
+        await cache.connect()
+        response = CachedResponse(body=b'{"a":1}', status_code=200)
+
+        assert await cache.set("test-key", response) is True
+        pipe.hset.assert_called_once_with(
+            "idempotency:v2:test-key",
+            mapping={b"body": b'{"a":1}', b"status": 200, b"content_type": b"application/json"},
         )
+        pipe.expire.assert_called_once_with("idempotency:v2:test-key", 3600)
+        assert await cache.get("test-key") == response
 
+    @pytest.mark.asyncio
+    @patch("app.services.cache_service.aioredis")
     @patch("app.services.cache_service.settings")
-    def test_get_when_disabled(self, mock_settings):
-        """Test get() returns None when Redis is disabled."""
+    async def test_l1_hit_skips_redis(self, mock_settings, mock_aioredis):
+        """Test a key read from Redis once is then served from L1."""
+        enable_redis(mock_settings)
+        client = AsyncMock()
+        mock_aioredis.Redis.return_value = client
+        client.hgetall.return_value = {
+            b"body": b"{}",
+            b"status": b"200",
+            b"content_type": b"application/json",
+        }
+
+        cache = AsyncCacheService()
+        await cache.connect()
+
+        assert (await cache.get("test-key")).body == b"{}"
+        assert (await cache.get("test-key")).body == b"{}"
+        client.hgetall.assert_awaited_once()
+        assert cache.stats.l2_hits == 1
+        assert cache.stats.l1.hits == 1
+
+    @pytest.mark.asyncio
+    @patch("app.services.cache_service.aioredis")
+    @patch("app.services.cache_service.settings")
+    async def test_negative_caching(self, mock_settings, mock_aioredis):
+        """Test Redis misses are remembered until the key is set."""
+        enable_redis(mock_settings)
+        client = AsyncMock()
+        client.pipeline = Mock(return_value=Mock(execute=AsyncMock()))
+        mock_aioredis.Redis.return_value = client
+        client.hgetall.return_value = {}
+
+        cache = AsyncCacheService()
+        await cache.connect()
+
+        assert await cache.get("test-key") is None
+        assert await cache.get("test-key") is None
+        client.hgetall.assert_awaited_once()
+        assert cache.stats.l1_negative_hits == 1
+
+        response = CachedResponse(body=b"{}", status_code=200)
+        await cache.set("test-key", response)
+        assert await cache.get("test-key") == response
+        assert cache.stats.l2_writes == 1
+
+    @pytest.mark.asyncio
+    @patch("app.services.cache_service.settings")
+    async def test_no_l1_without_redis(self, mock_settings):
+        """Test nothing is replayed from L1 when Redis is disabled."""
+        enable_redis(mock_settings)
         mock_settings.redis_enabled = False
+        response = CachedResponse(body=b"{}", status_code=200)
 
-        cache = CacheService()
-        result = cache.get("test-key")
+        cache = AsyncCacheService()
+        await cache.connect()
 
-        assert result is None
+        assert await cache.set("test-key", response) is False
+        assert await cache.get("test-key") is None
+        assert cache.stats.l1.entries == 0
 
-    @patch("app.services.cache_service.settings")
-    def test_set_when_disabled(self, mock_settings):
-        """Test set() returns False when Redis is disabled."""
-        mock_settings.redis_enabled = False
+    @pytest.mark.asyncio
+    async def test_in_flight_coalescing(self):
+        """Test later callers for a key wait on the first one's result."""
+        cache = AsyncCacheService()
 
-        cache = CacheService()
-        result = cache.set("test-key", {"data": "value"})
+        assert cache.join_in_flight("k") is None
+        waiter = cache.join_in_flight("k")
+        assert waiter is not None
 
-        assert result is False
+        response = CachedResponse(body=b"{}", status_code=200)
+        cache.finish_in_flight("k", response)
 
-    @patch("app.services.cache_service.redis.Redis")
-    @patch("app.services.cache_service.settings")
-    def test_delete_cache_key(self, mock_settings, mock_redis):
-        """Test delete() removes cached data."""
-        mock_settings.redis_enabled = True
-        mock_settings.redis_host = "localhost"
-        mock_settings.redis_port = 6379
-        mock_settings.redis_db = 0
-        mock_settings.redis_password = None
+        assert await asyncio.wait_for(waiter, 1) == response
+        assert cache.join_in_flight("k") is None  # Released after finishing
 
-        mock_redis_instance = Mock()
-        mock_redis.return_value = mock_redis_instance
+    @pytest.mark.asyncio
+    @patch("app.services.cache_service.aioredis")
+    @patch("app.services.cache_service.settings")
+    async def test_get_error_is_a_miss(self, mock_settings, mock_aioredis):
+        """Test a Redis error on read is counted and treated as a miss."""
+        enable_redis(mock_settings)
+        client = AsyncMock()
+        client.hgetall.side_effect = RedisError("timeout")
+        mock_aioredis.Redis.return_value = client
 
-        cache = CacheService()
-        result = cache.delete("test-key")
+        cache = AsyncCacheService()
+        await cache.connect()
 
-        assert result is True
-        mock_redis_instance.delete.assert_called_once_with("idempotency:test-key")
+        assert await cache.get("test-key") is None
+        assert cache.stats.l2_errors == 1
 
-    @patch("app.services.cache_service.redis.Redis")
+    @pytest.mark.asyncio
+    @patch("app.services.cache_service.aioredis")
     @patch("app.services.cache_service.settings")
-    def test_close_connection(self, mock_settings, mock_redis):
-        """Test close() closes Redis connection."""
-        mock_settings.redis_enabled = True
-        mock_settings.redis_host = "localhost"
-        mock_settings.redis_port = 6379
-        mock_settings.redis_db = 0
-        mock_settings.redis_password = None
-
-        mock_redis_instance = Mock()
-        mock_redis.return_value = mock_redis_instance
+    async def test_delete_cache_key(self, mock_settings, mock_aioredis):
+        """Test delete() removes the key from Redis and from L1."""
+        enable_redis(mock_settings)
+        client = AsyncMock()
+        client.pipeline = Mock(return_value=Mock(execute=AsyncMock()))
+        client.hgetall.return_value = {}
+        mock_aioredis.Redis.return_value = client
+
+        cache = AsyncCacheService()
+        await cache.connect()
+        await cache.set("test-key", CachedResponse(body=b"{}", status_code=200))
+
+        assert await cache.delete("test-key") is True
+        client.delete.assert_awaited_once_with("idempotency:v2:test-key")
+        assert await cache.get("test-key") is None
+        client.hgetall.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    @patch("app.services.cache_service.aioredis")
+    @patch("app.services.cache_service.settings")
+    async def test_close_connection(self, mock_settings, mock_aioredis):
+        """Test close() closes the pool and disables the cache."""
+        enable_redis(mock_settings)
+        client = AsyncMock()
+        mock_aioredis.Redis.return_value = client
 
-        cache = CacheService()
-        cache.close()
+        cache = AsyncCacheService()
+        await cache.connect()
+        await cache.close()
 
-        mock_redis_instance.close.assert_called_once()
+        client.aclose.assert_awaited_once_with(close_connection_pool=True)
+        assert not cache.is_available
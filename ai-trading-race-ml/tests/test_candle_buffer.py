@@ -0,0 +1,186 @@
+"""Tests for the in-memory candle buffer."""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from app.models.schemas import AgentContextRequest
+from app.services.candle_buffer import CandleBuffer
+from app.services.candle_series import context_series
+from tests.test_candle_store import MINUTE_NS, START_NS, make_candles
+
+
+def candle_rows(symbol: str, n: int, start: int = 0) -> list[dict]:
+    """The same candles as make_candles, as request candle objects."""
+    timestamps, ohlcv = make_candles(n, start)
+    return [
+        {
+            "symbol": symbol,
+            "timestamp": datetime.fromtimestamp(ts / 1e9, tz=timezone.utc).isoformat(),
+            "open": str(row[0]),
+            "high": str(row[1]),
+            "low": str(row[2]),
+            "close": str(row[3]),
+            "volume": str(row[4]),
+        }
+        for ts, row in zip(timestamps, ohlcv)
+    ]
+
+
+def make_context(candles: list[dict], windows: list[dict]) -> AgentContextRequest:
+    """Agent request with the given candles and candle windows."""
+    return AgentContextRequest.model_validate(
+        {
+            "agentId": "agent",
+            "portfolio": {"cash": "10000", "positions": [], "totalValue": "10000"},
+            "candles": candles,
+            "candleWindows": windows,
+        }
+    )
+
+
+class TestCandleBuffer:
+    """Tests for CandleBuffer."""
+
+    def test_append_and_window(self):
+        """Test appended candles are returned by window."""
+        buffer = CandleBuffer(capacity=100)
+        timestamps, ohlcv = make_candles(50)
+
+        assert buffer.append("BTC", timestamps, ohlcv) == 50
+
+        series = buffer.window("BTC")
+        np.testing.assert_array_equal(series.timestamps, timestamps)
+        np.testing.assert_array_equal(series.ohlcv, ohlcv)
+        assert series.latest_close == Decimal("149.0")
+        np.testing.assert_array_equal(
+            buffer.window("BTC", timestamps[29], 10).timestamps, timestamps[20:30]
+        )
+
+    def test_capacity_keeps_latest_candles(self):
+        """Test only the latest `capacity` candles are kept across many appends."""
+        buffer = CandleBuffer(capacity=10)
+        for start in range(0, 95, 5):
+            buffer.append("BTC", *make_candles(5, start))
+
+        timestamps, ohlcv = make_candles(10, start=85)
+        series = buffer.window("BTC")
+        assert buffer.rows("BTC") == 10
+        np.testing.assert_array_equal(series.timestamps, timestamps)
+        np.testing.assert_array_equal(series.ohlcv, ohlcv)
+
+        buffer.append("BTC", *make_candles(25, start=95))
+        np.testing.assert_array_equal(
+            buffer.window("BTC").timestamps, make_candles(10, start=110)[0]
+        )
+
+    def test_window_is_a_copy(self):
+        """Test windows stay unchanged when the buffer moves on."""
+        buffer = CandleBuffer(capacity=4)
+        buffer.append("BTC", *make_candles(4))
+        series = buffer.window("BTC")
+
+        buffer.append("BTC", *make_candles(8, start=4))
+
+        np.testing.assert_array_equal(series.timestamps, make_candles(4)[0])
+
+    def test_latest_candle_is_updated(self):
+        """Test a candle with the latest timestamp replaces it; older ones are ignored."""
+        buffer = CandleBuffer()
+        buffer.append("BTC", *make_candles(10))
+        timestamps, ohlcv = make_candles(1, start=9)
+
+        assert buffer.append("BTC", timestamps, ohlcv * 2) == 1
+        assert buffer.append("BTC", *make_candles(3)) == 0
+
+        assert buffer.rows("BTC") == 10
+        assert buffer.window("BTC").ohlcv[-1, 3] == 2 * ohlcv[0, 3]
+
+    def test_duplicate_timestamps_in_batch(self):
+        """Test the last of repeated timestamps in one batch is kept."""
+        buffer = CandleBuffer()
+        timestamps, ohlcv = make_candles(3)
+        timestamps = np.append(timestamps, timestamps[-1])
+        ohlcv = np.vstack([ohlcv, ohlcv[-1] + 1])
+
+        buffer.append("BTC", timestamps, ohlcv)
+
+        assert buffer.rows("BTC") == 3
+        assert buffer.window("BTC").ohlcv[-1, 0] == ohlcv[-1, 0]
+
+    def test_least_recently_used_symbol_is_evicted(self):
+        """Test symbols beyond max_symbols evict the least recently used one."""
+        buffer = CandleBuffer(max_symbols=2)
+        buffer.append("BTC", *make_candles(5))
+        buffer.append("ETH", *make_candles(5))
+        buffer.window("BTC")
+
+        buffer.append("SOL", *make_candles(5))
+
+        assert "BTC" in buffer and "SOL" in buffer
+        assert "ETH" not in buffer
+        with pytest.raises(KeyError):
+            buffer.window("ETH")
+
+
+class TestResolve:
+    """Tests for resolving candle windows of requests."""
+
+    def test_delta_and_window_match_full_history(self):
+        """Test a retained window plus new candles equals sending all candles."""
+        buffer = CandleBuffer()
+        buffer.resolve(make_context(candle_rows("BTC", 60), []), ingest=True)
+
+        delta = make_context(candle_rows("BTC", 1, start=60), [{"symbol": "BTC", "length": 50}])
+        [series] = buffer.resolve(delta)
+
+        [expected] = context_series(make_context(candle_rows("BTC", 61)[-50:], []))
+        np.testing.assert_array_equal(series.timestamps, expected.timestamps)
+        np.testing.assert_array_equal(series.ohlcv, expected.ohlcv)
+        assert series.latest_close == expected.latest_close
+        assert context_series(delta) is delta.resolved_series()
+
+    def test_window_end(self):
+        """Test a window can end before the newest retained candle."""
+        buffer = CandleBuffer()
+        buffer.append("BTC", *make_candles(60))
+        end = datetime.fromtimestamp(START_NS / 1e9 + 29 * 60, tz=timezone.utc)
+
+        [series] = buffer.resolve(
+            make_context([], [{"symbol": "BTC", "end": end.isoformat(), "length": 10}])
+        )
+
+        assert series.timestamps[-1] == START_NS + 29 * MINUTE_NS
+        assert len(series) == 10
+
+    def test_only_deltas_are_kept_by_default(self):
+        """Test without ingest only candles of symbols with a window are kept."""
+        buffer = CandleBuffer()
+        buffer.append("BTC", *make_candles(10))
+        context = make_context(
+            candle_rows("BTC", 1, start=10) + candle_rows("ETH", 5),
+            [{"symbol": "BTC"}],
+        )
+
+        resolved = buffer.resolve(context)
+
+        assert [s.symbol for s in resolved] == ["BTC", "ETH"]
+        assert buffer.rows("BTC") == 11
+        assert "ETH" not in buffer
+
+    def test_unknown_symbol(self):
+        """Test a window of a symbol with no retained candles is rejected."""
+        with pytest.raises(ValueError, match="No candles retained for BTC"):
+            CandleBuffer().resolve(make_context([], [{"symbol": "BTC"}]))
+
+    def test_unresolved_windows(self):
+        """Test windows without a candle buffer are an error, not an empty series."""
+        with pytest.raises(ValueError, match="candle buffer"):
+            context_series(make_context([], [{"symbol": "BTC"}]))
+
+    def test_duplicate_window_symbols(self):
+        """Test a request can't name the same symbol in two windows."""
+        with pytest.raises(ValueError):
+            make_context([], [{"symbol": "BTC"}, {"symbol": "BTC", "length": 5}])
@@ -0,0 +1,158 @@
+"""Tests for the columnar candle store."""
+
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from app.services.candle_store import OHLCV_FILE, TIMESTAMP_FILE, CandleStore
+from scripts.generate_training_data import generate_shards, generate_training_dataset
+
+MINUTE_NS = 60 * 10**9
+START_NS = 1_704_067_200 * 10**9  # 2024-01-01 UTC
+
+
+def make_candles(n: int, start: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """n minute candles starting `start` minutes into 2024."""
+    timestamps = START_NS + (start + np.arange(n, dtype=np.int64)) * MINUTE_NS
+    close = 100 + np.arange(start, start + n, dtype=np.float64)
+    ohlcv = np.column_stack([close, close + 1, close - 1, close, np.full(n, 10.0)])
+    return timestamps, ohlcv
+
+
+class TestCandleStore:
+    """Tests for CandleStore."""
+
+    def test_append_and_read(self, tmp_path):
+        """Test appended candles read back unchanged."""
+        store = CandleStore(tmp_path)
+        timestamps, ohlcv = make_candles(100)
+
+        assert store.append("BTC", timestamps, ohlcv) == 100
+
+        series = store.read("BTC")
+        np.testing.assert_array_equal(series.timestamps, timestamps)
+        np.testing.assert_array_equal(series.ohlcv, ohlcv)
+        assert series.latest_close == ohlcv[-1, 3]
+        assert store.symbols() == ["BTC"]
+
+    def test_range_read_is_a_view_of_the_map(self, tmp_path):
+        """Test [start, end) range reads slice the mapped columns without copying."""
+        store = CandleStore(tmp_path)
+        timestamps, ohlcv = make_candles(100)
+        store.append("BTC", timestamps, ohlcv)
+
+        series = store.read("BTC", timestamps[10], timestamps[20])
+
+        np.testing.assert_array_equal(series.timestamps, timestamps[10:20])
+        assert isinstance(series.ohlcv, np.memmap)
+        assert not series.ohlcv.flags.owndata
+        assert not series.ohlcv.flags.writeable
+
+    def test_range_accepts_datetimes(self, tmp_path):
+        """Test ranges can be given as datetimes and datetime64 values."""
+        store = CandleStore(tmp_path)
+        store.append("BTC", *make_candles(120))
+
+        start = datetime(2024, 1, 1, 1, 0, tzinfo=timezone.utc)
+        series = store.read("BTC", start, np.datetime64("2024-01-01T01:30"))
+
+        assert len(series) == 30
+        assert series.timestamps[0] == START_NS + 60 * MINUTE_NS
+
+    def test_window(self, tmp_path):
+        """Test window returns the last candles at or before a timestamp."""
+        store = CandleStore(tmp_path)
+        timestamps, ohlcv = make_candles(100)
+        store.append("BTC", timestamps, ohlcv)
+
+        np.testing.assert_array_equal(
+            store.window("BTC", timestamps[49], 10).timestamps, timestamps[40:50]
+        )
+        assert len(store.window("BTC", timestamps[3], 10)) == 4
+        assert store.window("BTC", None, 5).timestamps[-1] == timestamps[-1]
+
+    def test_overlapping_appends_are_deduplicated(self, tmp_path):
+        """Test candles at or before the stored ones are skipped."""
+        store = CandleStore(tmp_path)
+        store.append("BTC", *make_candles(50))
+
+        appended = store.append("BTC", *make_candles(50, start=30))
+
+        assert appended == 30
+        assert store.rows("BTC") == 80
+        assert (np.diff(store.read("BTC").timestamps) > 0).all()
+
+    def test_unsorted_batch(self, tmp_path):
+        """Test a batch is sorted before it's appended."""
+        store = CandleStore(tmp_path)
+        timestamps, ohlcv = make_candles(10)
+        order = np.random.default_rng(0).permutation(10)
+
+        store.append("BTC", timestamps[order], ohlcv[order])
+
+        np.testing.assert_array_equal(store.read("BTC").ohlcv, ohlcv)
+
+    def test_reads_see_later_appends(self, tmp_path):
+        """Test a store instance remaps a symbol that has grown."""
+        store = CandleStore(tmp_path)
+        store.append("BTC", *make_candles(10))
+        assert len(store.read("BTC")) == 10
+
+        CandleStore(tmp_path).append("BTC", *make_candles(5, start=10))
+
+        assert len(store.read("BTC")) == 15
+
+    def test_partial_append_is_invisible(self, tmp_path):
+        """Test OHLCV rows without a timestamp are neither read nor kept."""
+        store = CandleStore(tmp_path)
+        store.append("BTC", *make_candles(10))
+        # An append interrupted after the OHLCV rows were written
+        with open(tmp_path / "BTC" / OHLCV_FILE, "ab") as f:
+            f.write(np.ones((3, 5)).tobytes() + b"\0\0")
+
+        assert store.rows("BTC") == 10
+        store.append("BTC", *make_candles(2, start=10))
+
+        assert store.rows("BTC") == 12
+        assert (tmp_path / "BTC" / OHLCV_FILE).stat().st_size == 12 * 40
+        assert (tmp_path / "BTC" / TIMESTAMP_FILE).stat().st_size == 12 * 8
+        assert store.read("BTC").ohlcv[10, 0] == 110
+
+    def test_import_parquet(self, tmp_path):
+        """Test Parquet shards import row group by row group."""
+        [shard] = generate_shards(
+            tmp_path / "shards", n_shards=1, candles_per_shard=2500, chunk_size=1000
+        )
+        store = CandleStore(tmp_path / "store")
+
+        assert store.import_parquet("BTC", shard) == 2500
+
+        import pandas as pd
+
+        df = pd.read_parquet(shard)
+        np.testing.assert_array_equal(store.read("BTC").close, df["close"].to_numpy())
+
+    def test_invalid_symbol(self, tmp_path):
+        """Test symbols that aren't safe directory names are rejected."""
+        with pytest.raises(ValueError):
+            CandleStore(tmp_path).append("../BTC", *make_candles(1))
+
+    def test_missing_symbol(self, tmp_path):
+        """Test reading an unknown symbol raises KeyError."""
+        with pytest.raises(KeyError):
+            CandleStore(tmp_path).read("BTC")
+
+    def test_training_dataset_from_store(self, tmp_path):
+        """Test the training dataset can be built from store windows."""
+        store = CandleStore(tmp_path)
+        for i, symbol in enumerate(["BTC", "ETH"]):
+            timestamps, ohlcv = make_candles(300)
+            ohlcv = ohlcv * (1 + 0.01 * np.sin(np.arange(300) / (3 + i)))[:, None]
+            store.append(symbol, timestamps, ohlcv)
+
+        X, y = generate_training_dataset(store_dir=tmp_path)
+        X_btc, _ = generate_training_dataset(store_dir=tmp_path, symbols=["BTC"])
+
+        assert len(X) == len(y) == 2 * len(X_btc)
+        assert not X.isna().any().any()
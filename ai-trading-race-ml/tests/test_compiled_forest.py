@@ -0,0 +1,174 @@
+"""Tests for the compiled random-forest engine."""
+
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from app.ml.compiled_forest import CompiledForest
+from app.ml.predictor import TradingPredictor
+
+
+def make_dataset(n: int = 400, n_features: int = 11, seed: int = 0):
+    """Create a small 3-class classification problem."""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, n_features))
+    y = np.digitize(X[:, 0] + 0.5 * X[:, 1] + rng.normal(0, 0.3, n), [-0.5, 0.5])
+    return X, y
+
+
+class TestCompiledForest:
+    """Tests for CompiledForest."""
+
+    def test_matches_predict_proba(self):
+        """Test probabilities match sklearn for batches and single rows."""
+        X, y = make_dataset()
+        model = RandomForestClassifier(n_estimators=25, max_depth=8, random_state=0).fit(X, y)
+        compiled = CompiledForest.from_sklearn(model)
+
+        np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X), atol=1e-12)
+        np.testing.assert_allclose(
+            compiled.predict_proba(X[3]), model.predict_proba(X[3:4]), atol=1e-12
+        )
+
+    def test_matches_shipped_model(self):
+        """Test the bundled trading model compiles to the same probabilities."""
+        predictor = TradingPredictor(Path("models/trading_model.pkl"))
+        compiled = CompiledForest.from_sklearn(predictor.model)
+        X, _ = make_dataset(n=200, seed=1)
+
+        np.testing.assert_allclose(
+            compiled.predict_proba(X), predictor.model.predict_proba(X), atol=1e-12
+        )
+
+    def test_missing_values_follow_sklearn(self):
+        """Test NaN inputs are routed like sklearn's missing-value support."""
+        X, y = make_dataset()
+        X[::7, 2] = np.nan
+        model = DecisionTreeClassifier(max_depth=6, random_state=0).fit(X, y)
+        compiled = CompiledForest.from_sklearn(model)
+
+        np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X), atol=1e-12)
+
+    def test_rejects_wrong_feature_count(self):
+        """Test inputs with the wrong number of features are rejected."""
+        X, y = make_dataset(n_features=4)
+        compiled = CompiledForest.from_sklearn(DecisionTreeClassifier().fit(X, y))
+
+        with pytest.raises(ValueError):
+            compiled.predict_proba(np.zeros((1, 5)))
+
+    def test_rejects_non_tree_models(self):
+        """Test models without trees can't be compiled."""
+        with pytest.raises(TypeError):
+            CompiledForest.from_sklearn(object())
+
+    def test_rejects_boosted_trees(self):
+        """Test a forest whose estimators_ is an ndarray is rejected, not misread."""
+        X, y = make_dataset(n_features=4)
+        model = GradientBoostingClassifier(n_estimators=3).fit(X, y)
+
+        with pytest.raises(TypeError):
+            CompiledForest.from_sklearn(model)
+
+    def test_save_and_mmap_load(self, tmp_path):
+        """Test saved arrays load memory-mapped and predict identically."""
+        X, y = make_dataset()
+        model = RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0).fit(X, y)
+        compiled = CompiledForest.from_sklearn(model)
+        compiled.save(tmp_path / "arrays", source={"id": 1})
+
+        loaded = CompiledForest.load(tmp_path / "arrays", mmap=True)
+
+        assert isinstance(loaded.threshold.base, np.memmap)
+        assert not loaded.threshold.flags.writeable
+        assert CompiledForest.read_metadata(tmp_path / "arrays")["source"] == {"id": 1}
+        np.testing.assert_allclose(loaded.predict_proba(X), model.predict_proba(X), atol=1e-12)
+
+    def test_save_replaces_existing(self, tmp_path):
+        """Test saving over an existing directory leaves only the new model."""
+        X, y = make_dataset()
+        first = CompiledForest.from_sklearn(DecisionTreeClassifier(max_depth=2).fit(X, y))
+        second = CompiledForest.from_sklearn(DecisionTreeClassifier(max_depth=5).fit(X, y))
+        first.save(tmp_path / "arrays")
+        second.save(tmp_path / "arrays")
+
+        assert CompiledForest.load(tmp_path / "arrays").max_depth == second.max_depth
+        assert [p.name for p in tmp_path.iterdir()] == ["arrays"]
+
+    def test_load_missing_directory(self, tmp_path):
+        """Test loading a directory without a saved model fails clearly."""
+        with pytest.raises(ValueError):
+            CompiledForest.load(tmp_path / "missing")
+
+
+class TestCompiledBackend:
+    """Tests for the predictor's compiled backend."""
+
+    def test_compiled_backend_matches_sklearn(self):
+        """Test both backends give the same predictions."""
+        sklearn_predictor = TradingPredictor(Path("models/trading_model.pkl"))
+        compiled_predictor = TradingPredictor(Path("models/trading_model.pkl"), backend="compiled")
+        X, _ = make_dataset(n=50, seed=2)
+        values = [{} for _ in range(len(X))]
+
+        expected = sklearn_predictor.predict_batch(X, values)
+        actual = compiled_predictor.predict_batch(X, values)
+
+        assert compiled_predictor.is_compiled
+        assert [r.action for r in actual] == [r.action for r in expected]
+        np.testing.assert_allclose(
+            [r.confidence for r in actual], [r.confidence for r in expected], atol=1e-12
+        )
+
+    def test_unknown_backend(self):
+        """Test unknown backends are rejected."""
+        with pytest.raises(ValueError):
+            TradingPredictor(Path("/nonexistent/model.pkl"), backend="gpu")
+
+
+class TestMmapBackend:
+    """Tests for the predictor's memory-mapped backend."""
+
+    @pytest.fixture
+    def model_path(self, tmp_path):
+        """Copy of the bundled model in a scratch directory."""
+        path = tmp_path / "trading_model.pkl"
+        shutil.copy("models/trading_model.pkl", path)
+        return path
+
+    def test_exports_then_maps_arrays(self, model_path):
+        """Test the first load exports arrays and later loads map them."""
+        first = TradingPredictor(model_path, backend="mmap")
+        second = TradingPredictor(model_path, backend="mmap")
+        reference = TradingPredictor(model_path)
+        X, _ = make_dataset(n=50, seed=3)
+
+        assert (model_path.parent / "trading_model_arrays" / "meta.json").exists()
+        assert first.model is None and second.model is None
+        assert second.is_loaded and second.is_compiled
+        np.testing.assert_allclose(
+            second.predict_proba(X), reference.model.predict_proba(X), atol=1e-12
+        )
+
+    def test_reexports_when_model_changes(self, model_path, tmp_path):
+        """Test arrays from an older model file are not served."""
+        arrays = tmp_path / "custom_arrays"
+        TradingPredictor(model_path, backend="mmap", arrays_path=arrays)
+        stale = CompiledForest.from_sklearn(
+            DecisionTreeClassifier(max_depth=1).fit(*make_dataset())
+        )
+        stale.save(arrays, source={"model_file": "old.pkl"})
+
+        predictor = TradingPredictor(model_path, backend="mmap", arrays_path=arrays)
+
+        assert predictor.is_compiled
+        assert predictor._compiled.n_trees == 100
+
+    def test_warm_up(self, model_path):
+        """Test warming up works for mapped and rule-based predictors."""
+        TradingPredictor(model_path, backend="mmap").warm_up()
+        TradingPredictor(Path("/nonexistent/model.pkl"), backend="mmap").warm_up()
@@ -0,0 +1,108 @@
+"""Tests for the bounded decision executor."""
+
+import asyncio
+import threading
+from pathlib import Path
+
+import pytest
+
+from app.ml.predictor import TradingPredictor
+from app.services.decision_executor import (
+    DecisionExecutor,
+    DecisionTimeoutError,
+    ExecutorSaturatedError,
+)
+from app.services.decision_service import DecisionService
+
+
+class BlockingService:
+    """Fake decision service whose calls wait until released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def generate_decision(self, value):
+        self.release.wait(timeout=5)
+        return value * 2
+
+
+class TestDecisionExecutor:
+    """Test suite for DecisionExecutor."""
+
+    @pytest.mark.asyncio
+    async def test_inline_mode_runs_on_caller(self):
+        """Test inline mode calls the service directly."""
+        service = BlockingService()
+        service.release.set()
+        executor = DecisionExecutor(service, mode="inline")
+
+        assert await executor.run("generate_decision", 21) == 42
+
+    @pytest.mark.asyncio
+    async def test_thread_mode_returns_result(self):
+        """Test thread mode runs the call in the pool."""
+        service = BlockingService()
+        service.release.set()
+        executor = DecisionExecutor(service, mode="thread", max_workers=2)
+
+        try:
+            assert await executor.run("generate_decision", 21) == 42
+            assert executor.in_flight == 0
+        finally:
+            executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_saturated_pool_rejects(self):
+        """Test calls beyond workers + queue are rejected."""
+        service = BlockingService()
+        executor = DecisionExecutor(service, mode="thread", max_workers=1, max_queue=1)
+
+        try:
+            running = [
+                asyncio.create_task(executor.run("generate_decision", i)) for i in range(2)
+            ]
+            await asyncio.sleep(0)
+
+            with pytest.raises(ExecutorSaturatedError):
+                await executor.run("generate_decision", 3)
+
+            service.release.set()
+            assert await asyncio.gather(*running) == [0, 2]
+        finally:
+            executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_timeout_keeps_slot_until_finished(self):
+        """Test a timed-out call raises and frees its slot only when done."""
+        service = BlockingService()
+        executor = DecisionExecutor(service, mode="thread", max_workers=1, timeout_seconds=0.05)
+
+        try:
+            with pytest.raises(DecisionTimeoutError):
+                await executor.run("generate_decision", 1)
+            assert executor.in_flight == 1
+
+            service.release.set()
+            for _ in range(100):
+                if executor.in_flight == 0:
+                    break
+                await asyncio.sleep(0.01)
+            assert executor.in_flight == 0
+        finally:
+            executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_process_mode_uses_worker_service(self):
+        """Test process mode runs decisions in spawned workers."""
+        service = DecisionService(TradingPredictor(Path("/nonexistent/model.pkl")))
+        executor = DecisionExecutor(service, mode="process", max_workers=1, timeout_seconds=60)
+
+        try:
+            assert await executor.run("generate_decisions", []) == []
+        finally:
+            executor.shutdown()
+
+    def test_unknown_mode(self):
+        """Test unknown execution modes are rejected."""
+        with pytest.raises(ValueError):
+            DecisionExecutor(BlockingService(), mode="gpu")
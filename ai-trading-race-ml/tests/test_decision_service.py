@@ -0,0 +1,176 @@
+"""Tests for the decision service."""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+from unittest.mock import patch
+
+from app.ml.predictor import TradingPredictor
+from app.ml.streaming_features import StreamingFeatureStore
+from app.models.schemas import AgentContextRequest, CandleData, PortfolioState
+from app.services.candle_series import group_candles
+from app.services.decision_service import DecisionService
+from app.services.feature_cache import FeatureCache
+
+
+def make_candles(symbol: str, n: int = 30, base_price: float = 42000) -> list[CandleData]:
+    """Create n oscillating candles for a symbol."""
+    base_time = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    candles = []
+    for i in range(n):
+        price = base_price * (1 + 0.01 * ((i % 5) - 2))
+        candles.append(
+            CandleData(
+                symbol=symbol,
+                timestamp=base_time + timedelta(hours=i),
+                open=Decimal(str(price)),
+                high=Decimal(str(price * 1.01)),
+                low=Decimal(str(price * 0.99)),
+                close=Decimal(str(price * (1 + 0.005 * ((i % 3) - 1)))),
+                volume=Decimal(str(1000 + i * 10)),
+            )
+        )
+    return candles
+
+
+def make_context(agent_id: str, candles: list[CandleData]) -> AgentContextRequest:
+    """Create an agent context with a 10k portfolio."""
+    return AgentContextRequest(
+        agent_id=agent_id,
+        portfolio=PortfolioState(
+            cash=Decimal("10000"), positions=[], total_value=Decimal("10000")
+        ),
+        candles=candles,
+    )
+
+
+class TestDecisionService:
+    """Tests for DecisionService."""
+
+    def setup_method(self):
+        self.service = DecisionService(TradingPredictor(Path("models/trading_model.pkl")))
+
+    def test_generate_decisions_preserves_order(self):
+        """Test that batch decisions are returned in input order."""
+        candles = make_candles("BTC") + make_candles("ETH", base_price=2500)
+        contexts = [make_context(f"agent-{i}", candles) for i in range(4)]
+
+        decisions = self.service.generate_decisions(contexts)
+
+        assert [d.agent_id for d in decisions] == ["agent-0", "agent-1", "agent-2", "agent-3"]
+
+    def test_generate_decisions_deduplicates_series(self):
+        """Test that shared candle series are featurized and predicted once."""
+        candles = make_candles("BTC") + make_candles("ETH", base_price=2500)
+        contexts = [make_context(f"agent-{i}", candles) for i in range(5)]
+
+        with patch.object(
+            self.service.predictor, "predict_batch", wraps=self.service.predictor.predict_batch
+        ) as predict_batch, patch.object(
+            self.service, "_featurize", wraps=self.service._featurize
+        ) as featurize:
+            self.service.generate_decisions(contexts)
+
+        predict_batch.assert_called_once()
+        features = predict_batch.call_args.args[0]
+        assert features.shape[0] == 2  # One row per unique (symbol, series)
+        assert featurize.call_count == 2
+
+    def test_generate_decisions_matches_single(self):
+        """Test that batch decisions match single-agent decisions."""
+        contexts = [
+            make_context("a", make_candles("BTC")),
+            make_context("b", make_candles("BTC", base_price=40000)),
+        ]
+
+        batch = self.service.generate_decisions(contexts)
+        singles = [self.service.generate_decision(c) for c in contexts]
+
+        for b, s in zip(batch, singles):
+            assert b.orders == s.orders
+            assert b.signals == s.signals
+            assert b.reasoning == s.reasoning
+
+    def test_generate_decisions_empty(self):
+        """Test that an empty batch returns no decisions."""
+        assert self.service.generate_decisions([]) == []
+
+    def test_feature_store_matches_stateless_on_first_window(self):
+        """Test a freshly seeded feature store gives the stateless decision."""
+        candles = make_candles("BTC") + make_candles("ETH", base_price=2500)
+        context = make_context("agent", candles)
+        streaming = DecisionService(self.service.predictor, feature_store=StreamingFeatureStore())
+
+        expected = self.service.generate_decision(context)
+        actual = streaming.generate_decision(context)
+
+        assert actual.orders == expected.orders
+        assert actual.signals == expected.signals
+        assert len(streaming.feature_store) == 2
+
+    def test_feature_cache_shared_across_requests(self):
+        """Test identical candle series hit the feature cache across calls."""
+        candles = make_candles("BTC") + make_candles("ETH", base_price=2500)
+        cached = DecisionService(
+            self.service.predictor,
+            feature_cache=FeatureCache(max_bytes=1024 * 1024, ttl_seconds=60),
+        )
+
+        first = cached.generate_decision(make_context("a", candles))
+        second = cached.generate_decision(make_context("b", candles))
+
+        assert first.signals == second.signals
+        assert cached.feature_cache.stats.misses == 2
+        assert cached.feature_cache.stats.hits == 2
+
+    def test_any_number_of_symbols(self):
+        """Test every symbol in the request gets a decision, not just BTC/ETH."""
+        symbols = [f"SYM{i:02d}" for i in range(20)]
+        candles = [c for i, s in enumerate(symbols) for c in make_candles(s, base_price=100 + i)]
+
+        decision = self.service.generate_decision(make_context("agent", candles))
+
+        assert len(decision.signals) == 20 * len(
+            self.service.generate_decision(make_context("one", make_candles("SYM00"))).signals
+        )
+
+    def test_concurrent_features_match_serial(self):
+        """Test featurizing symbols on a thread pool gives the same decisions."""
+        candles = [c for i in range(8) for c in make_candles(f"S{i}", base_price=50 + i)]
+        context = make_context("agent", candles)
+        concurrent = DecisionService(self.service.predictor, feature_workers=4)
+
+        try:
+            expected = self.service.generate_decision(context)
+            actual = concurrent.generate_decision(context)
+        finally:
+            concurrent.close()
+
+        assert actual.orders == expected.orders
+        assert actual.signals == expected.signals
+
+
+class TestGroupCandles:
+    """Tests for grouping request candles into per-symbol series."""
+
+    def test_groups_and_sorts(self):
+        """Test candles are split by symbol and sorted by time."""
+        btc = make_candles("BTC", n=10)
+        eth = make_candles("ETH", n=8, base_price=2500)
+        mixed = [c for pair in zip(reversed(btc), eth) for c in pair] + btc[:2]
+
+        series = group_candles(mixed)
+
+        assert [s.symbol for s in series] == ["BTC", "ETH"]
+        assert len(series[0]) == 10 and len(series[1]) == 8
+        assert (series[0].timestamps[1:] >= series[0].timestamps[:-1]).all()
+        assert series[1].close.tolist() == [float(c.close) for c in eth]
+
+    def test_latest_close_is_last_sent(self):
+        """Test order sizing uses the last candle as sent, like before."""
+        btc = make_candles("BTC", n=10)
+
+        series = group_candles(list(reversed(btc)))[0]
+
+        assert series.latest_close == btc[0].close
+        assert series.close[-1] == float(btc[-1].close)
@@ -0,0 +1,78 @@
+"""Tests for the content-addressed feature cache."""
+
+import numpy as np
+import pytest
+
+from app.ml.features import InferenceFeatures
+from app.services.feature_cache import FeatureCache
+
+
+def make_candles(n: int = 50, seed: int = 1) -> tuple[np.ndarray, np.ndarray]:
+    """Create timestamps and an (n, 5) OHLCV array."""
+    rng = np.random.default_rng(seed)
+    timestamps = np.arange(n, dtype=np.int64) * 3600
+    ohlcv = rng.uniform(100, 200, size=(n, 5))
+    return timestamps, ohlcv
+
+
+def make_features() -> InferenceFeatures:
+    """Create a dummy feature entry."""
+    return InferenceFeatures(features=np.zeros((1, 3)), values={"a": 0.0, "b": 0.0, "c": 0.0})
+
+
+class TestFeatureCache:
+    """Test suite for FeatureCache."""
+
+    def test_key_is_content_addressed(self):
+        """Test equal arrays hash equal and any change alters the key."""
+        timestamps, ohlcv = make_candles()
+        changed = ohlcv.copy()
+        changed[-1, 3] += 0.01
+
+        assert FeatureCache.key_for(timestamps, ohlcv) == FeatureCache.key_for(
+            timestamps.copy(), ohlcv.copy()
+        )
+        assert FeatureCache.key_for(timestamps, ohlcv) != FeatureCache.key_for(timestamps, changed)
+        assert FeatureCache.key_for(timestamps, ohlcv) != FeatureCache.key_for(
+            timestamps + 1, ohlcv
+        )
+
+    def test_get_or_compute_computes_once(self):
+        """Test the compute function only runs on a miss."""
+        cache = FeatureCache(max_bytes=1024 * 1024, ttl_seconds=60)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return make_features()
+
+        first = cache.get_or_compute(b"key", compute)
+        second = cache.get_or_compute(b"key", compute)
+
+        assert first is second
+        assert len(calls) == 1
+        assert cache.stats.hits == 1
+        assert cache.stats.misses == 1
+        assert not first.features.flags.writeable
+
+    def test_errors_are_not_cached(self):
+        """Test failed computations are retried on the next call."""
+        cache = FeatureCache(max_bytes=1024 * 1024, ttl_seconds=60)
+
+        def fail():
+            raise ValueError("Not enough data")
+
+        with pytest.raises(ValueError):
+            cache.get_or_compute(b"key", fail)
+
+        assert cache.get_or_compute(b"key", make_features) is not None
+
+    def test_memory_bound_evicts(self):
+        """Test entries are evicted once the memory bound is reached."""
+        cache = FeatureCache(max_bytes=1, ttl_seconds=60)
+
+        cache.get_or_compute(b"a", make_features)
+        cache.get_or_compute(b"b", make_features)
+
+        assert cache.stats.evictions == 2
+        assert cache.stats.entries == 0
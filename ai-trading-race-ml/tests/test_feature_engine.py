@@ -0,0 +1,65 @@
+"""Tests for the NumPy feature engine."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ml.feature_engine import compute_features, latest_features
+from app.ml.features import FEATURE_COLUMNS, engineer_features
+
+# Max allowed deviation from the pandas/ta reference implementation
+RTOL = 1e-9
+ATOL = 1e-9
+
+
+def make_series(n: int, seed: int = 7) -> tuple[np.ndarray, np.ndarray]:
+    """Create a random-walk close series and matching volumes."""
+    rng = np.random.default_rng(seed)
+    close = 42000 * np.cumprod(1 + rng.normal(0, 0.02, n))
+    volume = rng.uniform(100, 1000, n)
+    return close, volume
+
+
+def reference_features(close: np.ndarray, volume: np.ndarray) -> pd.DataFrame:
+    """Run engineer_features on the same data."""
+    df = pd.DataFrame(
+        {"open": close, "high": close, "low": close, "close": close, "volume": volume}
+    )
+    return engineer_features(df)[FEATURE_COLUMNS]
+
+
+class TestFeatureEngine:
+    """Tests for compute_features / latest_features."""
+
+    @pytest.mark.parametrize("n", [20, 21, 26, 30, 34, 50, 500, 5000])
+    def test_matches_engineer_features(self, n):
+        """Test all kept rows match the reference implementation."""
+        close, volume = make_series(n)
+        expected = reference_features(close, volume)
+
+        features = compute_features(close, volume)
+        kept = ~np.isnan(features).any(axis=1)
+
+        assert list(np.flatnonzero(kept)) == list(expected.index)
+        np.testing.assert_allclose(features[kept], expected.values, rtol=RTOL, atol=ATOL)
+
+    @pytest.mark.parametrize("rows", [1, 5, 40])
+    def test_latest_features_matches_tail(self, rows):
+        """Test the trailing rows match the reference implementation."""
+        close, volume = make_series(300)
+        expected = reference_features(close, volume).values[-rows:]
+
+        np.testing.assert_allclose(
+            latest_features(close, volume, rows=rows), expected, rtol=RTOL, atol=ATOL
+        )
+
+    def test_not_enough_data(self):
+        """Test short series produce no feature rows."""
+        close, volume = make_series(19)
+
+        assert latest_features(close, volume).shape == (0, len(FEATURE_COLUMNS))
+
+    def test_length_mismatch(self):
+        """Test close and volume must be aligned."""
+        with pytest.raises(ValueError):
+            compute_features(np.ones(30), np.ones(29))
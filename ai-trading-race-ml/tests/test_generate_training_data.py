@@ -0,0 +1,59 @@
+"""Tests for synthetic training data generation."""
+
+import numpy as np
+import pandas as pd
+
+from scripts.generate_training_data import (
+    BAND_HIGH,
+    BAND_LOW,
+    generate_ohlcv_vectorized,
+    generate_shards,
+    iter_ohlcv_chunks,
+)
+
+
+class TestVectorizedGenerator:
+    """Tests for the vectorized OHLCV generator."""
+
+    def test_same_seed_same_data(self):
+        """Test generation is reproducible for a seed."""
+        first = generate_ohlcv_vectorized(1000, seed=7)
+        second = generate_ohlcv_vectorized(1000, seed=7)
+
+        pd.testing.assert_frame_equal(first, second)
+
+    def test_chunking_does_not_change_output(self):
+        """Test chunked output matches a single pass."""
+        whole = generate_ohlcv_vectorized(5000)
+        chunked = pd.concat(iter_ohlcv_chunks(5000, chunk_size=333), ignore_index=True)
+
+        pd.testing.assert_series_equal(whole["timestamp"], chunked["timestamp"])
+        np.testing.assert_allclose(chunked["close"], whole["close"], rtol=1e-9)
+        np.testing.assert_array_equal(chunked["volume"], whole["volume"])
+
+    def test_candles_are_consistent(self):
+        """Test prices stay in the band and high/low bracket open/close."""
+        df = generate_ohlcv_vectorized(20_000, base_price=100)
+
+        assert df["close"].iloc[0] == 100
+        assert df["close"].between(100 * BAND_LOW, 100 * BAND_HIGH).all()
+        assert (df["high"] >= df[["open", "close"]].max(axis=1)).all()
+        assert (df["low"] <= df[["open", "close"]].min(axis=1)).all()
+        assert (df["timestamp"].diff().dropna() == pd.Timedelta(hours=1)).all()
+
+    def test_shards_are_independent(self):
+        """Test shards of one seed produce different series."""
+        first = generate_ohlcv_vectorized(100, shard=0)
+        second = generate_ohlcv_vectorized(100, shard=1)
+
+        assert not np.allclose(first["close"], second["close"])
+
+    def test_parquet_shards(self, tmp_path):
+        """Test shards written to Parquet match in-memory generation."""
+        paths = generate_shards(tmp_path, n_shards=2, candles_per_shard=1000, chunk_size=300)
+
+        assert [p.name for p in paths] == ["shard-00000.parquet", "shard-00001.parquet"]
+        shard = pd.read_parquet(paths[1])
+        np.testing.assert_allclose(
+            shard["close"], generate_ohlcv_vectorized(1000, shard=1)["close"], rtol=1e-9
+        )
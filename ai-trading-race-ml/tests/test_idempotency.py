@@ -0,0 +1,141 @@
+"""Tests for the idempotency middleware."""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.middleware.idempotency import IdempotencyMiddleware
+from app.services.cache_service import async_cache_service
+
+
+def make_app() -> tuple[FastAPI, list[int]]:
+    """Create an app with a slow /predict handler that counts its calls."""
+    app = FastAPI()
+    app.add_middleware(IdempotencyMiddleware)
+    calls: list[int] = []
+
+    @app.post("/predict")
+    async def predict():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"call": len(calls)}
+
+    return app, calls
+
+
+class FakeRedis:
+    """In-memory stand-in for the redis.asyncio hash commands the cache uses."""
+
+    def __init__(self):
+        self.data: dict[str, dict] = {}
+        self.writes: list[tuple[str, dict]] = []
+
+    async def hgetall(self, key: str) -> dict:
+        return dict(self.data.get(key, {}))
+
+    def pipeline(self, transaction: bool = True) -> "FakeRedis":
+        return self
+
+    def hset(self, key: str, mapping: dict) -> None:
+        self.writes.append((key, mapping))
+
+    def expire(self, key: str, ttl: int) -> None:
+        pass
+
+    async def execute(self) -> None:
+        for key, mapping in self.writes:
+            # Redis returns every field as bytes
+            self.data[key] = {
+                k: str(v).encode() if isinstance(v, int) else v for k, v in mapping.items()
+            }
+        self.writes.clear()
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    """Connect the global cache to an in-memory Redis."""
+    monkeypatch.setattr(async_cache_service, "_redis_client", FakeRedis())
+
+
+class TestIdempotencyMiddleware:
+    """Tests for IdempotencyMiddleware."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_duplicates_run_once(self):
+        """Test concurrent requests with one key share a single handler call."""
+        app, calls = make_app()
+        transport = httpx.ASGITransport(app=app)
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(
+                *[client.post("/predict", headers={"Idempotency-Key": "same"}) for _ in range(5)]
+            )
+
+        assert len(calls) == 1
+        assert all(r.status_code == 200 for r in responses)
+        assert {r.text for r in responses} == {responses[0].text}
+
+    @pytest.mark.asyncio
+    async def test_different_keys_are_not_coalesced(self):
+        """Test requests with different keys each run the handler."""
+        app, calls = make_app()
+        transport = httpx.ASGITransport(app=app)
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await asyncio.gather(
+                *[client.post("/predict", headers={"Idempotency-Key": f"k{i}"}) for i in range(3)]
+            )
+
+        assert len(calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_replay_returns_stored_bytes(self, redis):
+        """Test a repeated key replays the first response's exact bytes."""
+        app, calls = make_app()
+        transport = httpx.ASGITransport(app=app)
+        headers = {"Idempotency-Key": "replay"}
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await client.post("/predict", headers=headers)
+            second = await client.post("/predict", headers=headers)
+
+        assert len(calls) == 1
+        assert second.status_code == first.status_code
+        assert second.content == first.content
+        assert second.headers["content-type"] == first.headers["content-type"]
+
+    @pytest.mark.asyncio
+    async def test_no_replay_without_redis(self):
+        """Test a repeated key runs the handler again when Redis is off."""
+        app, calls = make_app()
+        transport = httpx.ASGITransport(app=app)
+        headers = {"Idempotency-Key": "no-redis"}
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.post("/predict", headers=headers)
+            await client.post("/predict", headers=headers)
+
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_cache_outcomes_are_counted(self, redis):
+        """Test misses and hits are counted and lookups are timed."""
+        from prometheus_client import REGISTRY
+
+        def count(name: str, labels: dict) -> float:
+            return REGISTRY.get_sample_value(name, labels) or 0.0
+
+        misses = count("ml_idempotency_requests_total", {"result": "miss"})
+        hits = count("ml_idempotency_requests_total", {"result": "hit"})
+        app, _ = make_app()
+        transport = httpx.ASGITransport(app=app)
+        headers = {"Idempotency-Key": "counted"}
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.post("/predict", headers=headers)
+            await client.post("/predict", headers=headers)
+
+        assert count("ml_idempotency_requests_total", {"result": "miss"}) == misses + 1
+        assert count("ml_idempotency_requests_total", {"result": "hit"}) == hits + 1
@@ -0,0 +1,76 @@
+"""Tests for the in-process LRU cache."""
+
+from app.services.lru_cache import LRUCache
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestLRUCache:
+    """Test suite for LRUCache."""
+
+    def test_get_hit_and_miss(self):
+        """Test get() counts hits and misses."""
+        cache = LRUCache(ttl_seconds=60)
+        cache.set("a", 1)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.stats.hits == 1
+        assert cache.stats.misses == 1
+
+    def test_entries_expire(self):
+        """Test entries are dropped after their TTL."""
+        clock = FakeClock()
+        cache = LRUCache(ttl_seconds=10, clock=clock)
+        cache.set("a", 1)
+        cache.set("b", 2, ttl_seconds=30)
+
+        clock.now = 15
+
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+        assert cache.stats.expirations == 1
+
+    def test_evicts_least_recently_used_entry(self):
+        """Test the entry bound evicts the least recently used key."""
+        cache = LRUCache(ttl_seconds=60, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats.evictions == 1
+
+    def test_byte_bound(self):
+        """Test the size bound evicts until the cache fits."""
+        cache = LRUCache(ttl_seconds=60, max_bytes=10, sizeof=len)
+        cache.set("a", b"12345")
+        cache.set("b", b"12345")
+        cache.set("c", b"123")
+
+        assert cache.get("a") is None
+        assert cache.stats.size_bytes == 8
+        assert len(cache) == 2
+
+    def test_overwrite_and_delete(self):
+        """Test set() replaces values and delete() removes them."""
+        cache = LRUCache(ttl_seconds=60, max_bytes=100, sizeof=len)
+        cache.set("a", b"123")
+        cache.set("a", b"12")
+
+        assert cache.get("a") == b"12"
+        assert cache.stats.size_bytes == 2
+        assert cache.delete("a") is True
+        assert cache.delete("a") is False
+        assert cache.stats.size_bytes == 0
@@ -0,0 +1,70 @@
+"""Tests for Prometheus metrics helpers."""
+
+from prometheus_client import REGISTRY
+
+from app import metrics
+from app.config import settings
+
+
+def stage_count(stage: str) -> float:
+    """Number of observations recorded for a stage and the current version."""
+    value = REGISTRY.get_sample_value(
+        "ml_stage_duration_seconds_count",
+        {"stage": stage, "model_version": metrics.current_model_version()},
+    )
+    return value or 0.0
+
+
+class TestMetrics:
+    """Tests for the metrics module."""
+
+    def test_stage_timer_records_observation(self):
+        """Test that a timed block adds one observation to its stage."""
+        before = stage_count("test_stage")
+
+        with metrics.stage_timer("test_stage"):
+            pass
+
+        assert stage_count("test_stage") == before + 1
+
+    def test_stage_timer_records_on_error(self):
+        """Test that a failing block is still timed."""
+        before = stage_count("test_failing_stage")
+
+        try:
+            with metrics.stage_timer("test_failing_stage"):
+                raise ValueError("boom")
+        except ValueError:
+            pass
+
+        assert stage_count("test_failing_stage") == before + 1
+
+    def test_model_version_label(self, monkeypatch):
+        """Test that samples are labelled with the version set last."""
+        monkeypatch.setattr(metrics, "_model_version", metrics.current_model_version())
+        metrics.set_model_version("test-version")
+        metrics.observe_stage("predict", 0.001)
+
+        value = REGISTRY.get_sample_value(
+            "ml_stage_duration_seconds_count",
+            {"stage": "predict", "model_version": "test-version"},
+        )
+        assert value == 1
+
+    def test_symbol_labels_are_bounded(self, monkeypatch):
+        """Test that symbols beyond the limit share the "other" label."""
+        monkeypatch.setattr(metrics, "_symbols", set())
+        monkeypatch.setattr(settings, "metrics_max_symbols", 2)
+
+        labels = [metrics.symbol_label(s) for s in ("BTC", "ETH", "SOL", "BTC")]
+
+        assert labels == ["BTC", "ETH", metrics.OTHER_SYMBOL, "BTC"]
+
+    def test_render_text_format(self):
+        """Test that rendered metrics are in the Prometheus text format."""
+        metrics.observe_stage("parse", 0.001)
+
+        body, content_type = metrics.render()
+
+        assert content_type.startswith("text/plain")
+        assert b"ml_stage_duration_seconds_bucket" in body
@@ -0,0 +1,131 @@
+"""Tests for hot model reloading."""
+
+import os
+import shutil
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+from app.config import settings
+from app.ml.features import FEATURE_COLUMNS
+from app.ml.predictor import TradingPredictor
+from app.services.decision_service import DecisionService
+from app.services.model_manager import ModelManager, ModelReloadError
+
+MODEL_PATH = Path("models/trading_model.pkl")
+
+
+@pytest.fixture
+def model_file(tmp_path, monkeypatch):
+    """A copy of the trained model that settings.model_path points to."""
+    path = tmp_path / "trading_model.pkl"
+    shutil.copy(MODEL_PATH, path)
+    monkeypatch.setattr(settings, "model_path", str(path))
+    monkeypatch.setattr(settings, "predictor_backend", "sklearn")
+    return path
+
+
+def make_manager(model_file: Path, **kwargs) -> ModelManager:
+    service = DecisionService(TradingPredictor(model_file))
+    return ModelManager(service, "1.0.0", **kwargs)
+
+
+def touch_later(path: Path) -> None:
+    """Bump the file's mtime so it looks changed."""
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def write_model_with_features(path: Path, n_features: int) -> None:
+    rng = np.random.default_rng(0)
+    model = DecisionTreeClassifier(max_depth=2).fit(
+        rng.normal(size=(30, n_features)), rng.integers(0, 3, size=30)
+    )
+    joblib.dump(model, path)
+
+
+class TestModelManager:
+    """Tests for ModelManager."""
+
+    @pytest.mark.asyncio
+    async def test_unchanged_file_is_not_reloaded(self, model_file):
+        """Test that reload is a no-op when the model file hasn't changed."""
+        manager = make_manager(model_file)
+        before = manager.predictor
+
+        result = await manager.reload()
+
+        assert not result.reloaded
+        assert manager.predictor is before
+        assert result.n_features == len(FEATURE_COLUMNS)
+
+    @pytest.mark.asyncio
+    async def test_changed_file_is_swapped_in(self, model_file):
+        """Test that a changed model file replaces the serving predictor."""
+        swaps = []
+        manager = make_manager(model_file, on_swap=lambda: swaps.append(True))
+        before = manager.predictor
+        touch_later(model_file)
+
+        result = await manager.reload(model_version="2.0.0")
+
+        assert result.reloaded
+        assert manager.predictor is not before
+        assert manager.predictor.is_loaded
+        assert manager.model_version == "2.0.0"
+        assert manager.service.model_version == "2.0.0"
+        assert swaps == [True]
+
+    @pytest.mark.asyncio
+    async def test_force_reloads_unchanged_file(self, model_file):
+        """Test that force reloads even if the file looks unchanged."""
+        manager = make_manager(model_file)
+        before = manager.predictor
+
+        result = await manager.reload(force=True)
+
+        assert result.reloaded
+        assert manager.predictor is not before
+
+    @pytest.mark.asyncio
+    async def test_wrong_feature_count_keeps_old_model(self, model_file):
+        """Test that a model expecting other features is rejected."""
+        manager = make_manager(model_file)
+        before = manager.predictor
+        write_model_with_features(model_file, 4)
+
+        with pytest.raises(ModelReloadError, match="4 features"):
+            await manager.reload()
+
+        assert manager.predictor is before
+        assert manager.model_version == "1.0.0"
+
+    @pytest.mark.asyncio
+    async def test_missing_file_keeps_old_model(self, model_file):
+        """Test that a deleted model file is reported and the old model kept."""
+        manager = make_manager(model_file)
+        before = manager.predictor
+        model_file.unlink()
+
+        with pytest.raises(ModelReloadError, match="not found"):
+            await manager.reload()
+
+        assert manager.predictor is before
+
+    @pytest.mark.asyncio
+    async def test_failed_reload_is_retried_after_fix(self, model_file):
+        """Test that a rejected file doesn't block reloading a good one."""
+        manager = make_manager(model_file)
+        write_model_with_features(model_file, 4)
+        with pytest.raises(ModelReloadError):
+            await manager.reload()
+
+        shutil.copy(MODEL_PATH, model_file)
+        touch_later(model_file)
+        result = await manager.reload()
+
+        assert result.reloaded
+        assert result.n_features == len(FEATURE_COLUMNS)
@@ -4,7 +4,12 @@ import numpy as np
 import pandas as pd
 import pytest
 
-from app.ml.features import FEATURE_COLUMNS, engineer_features, get_feature_values
+from app.ml.features import (
+    FEATURE_COLUMNS,
+    engineer_features,
+    extract_inference_features,
+    get_feature_values,
+)
 from app.ml.predictor import PredictedAction, TradingPredictor
 from pathlib import Path
 
@@ -83,6 +88,20 @@ class TestFeatureEngineering:
         assert "rsi_14" in values
         assert "macd" in values
 
+    def test_extract_inference_features(self):
+        """Test that one extraction yields both the model input and the dict."""
+        df = create_sample_candles()
+        extracted = extract_inference_features(df)
+
+        assert extracted.features.shape == (1, len(FEATURE_COLUMNS))
+        assert list(extracted.values) == FEATURE_COLUMNS
+        assert extracted.values["rsi_14"] == extracted.features[0][FEATURE_COLUMNS.index("rsi_14")]
+
+    def test_extract_inference_features_not_enough_data(self):
+        """Test that extraction raises on too few candles."""
+        with pytest.raises(ValueError):
+            extract_inference_features(create_sample_candles(10))
+
 
 class TestPredictor:
     """Tests for the TradingPredictor."""
@@ -127,3 +146,28 @@ class TestPredictor:
         assert "rule" in signal
         assert "fired" in signal
         assert "contribution" in signal
+
+    def test_predict_batch_matches_predict(self):
+        """Test that batched predictions match one-at-a-time predictions."""
+        from app.ml.features import prepare_inference_features
+
+        predictor = TradingPredictor(Path("models/trading_model.pkl"))
+        frames = [create_sample_candles(n) for n in (30, 40, 50)]
+        features = np.vstack([prepare_inference_features(df) for df in frames])
+        values = [get_feature_values(df) for df in frames]
+
+        batch = predictor.predict_batch(features, values)
+
+        assert len(batch) == 3
+        for row, result in enumerate(batch):
+            single = predictor.predict(features[row:row + 1], values[row])
+            assert result.action == single.action
+            assert result.confidence == pytest.approx(single.confidence)
+            assert result.signals == single.signals
+
+    def test_predict_batch_length_mismatch(self):
+        """Test that predict_batch rejects mismatched inputs."""
+        predictor = TradingPredictor(Path("/nonexistent/model.pkl"))
+
+        with pytest.raises(ValueError):
+            predictor.predict_batch(np.zeros((2, len(FEATURE_COLUMNS))), [{}])
@@ -0,0 +1,121 @@
+"""Tests for the multi-agent race simulator."""
+
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.ml.predictor import TradingPredictor
+from app.services.backtest import BacktestConfig, run_backtest
+from app.services.candle_store import CandleStore
+from app.services import race
+from app.services.race import RaceAgent, _chunk_agents, _market_series, run_race
+from tests.test_backtest import make_series
+
+MODEL = "models/trading_model.pkl"
+
+
+def make_agents() -> list[RaceAgent]:
+    """Agents of the model and of the rule-based fallback."""
+    return [
+        RaceAgent("model-all", MODEL),
+        RaceAgent("model-confident", MODEL, BacktestConfig(min_confidence=0.5)),
+        RaceAgent("model-small", MODEL, BacktestConfig(position_fraction=Decimal("0.02"))),
+        RaceAgent("rules", "/nonexistent/model.pkl", BacktestConfig(decision_every=3)),
+    ]
+
+
+@pytest.fixture
+def market_dir(tmp_path: Path) -> Path:
+    store = CandleStore(tmp_path)
+    store.append_series(make_series("BTC"))
+    store.append_series(make_series("ETH", seed=1, offset=50))
+    return tmp_path
+
+
+class TestRunRace:
+    """Tests for run_race."""
+
+    def test_leaderboard_matches_backtests(self, market_dir):
+        """Test that each agent scores what its own backtest gives."""
+        series = _market_series(str(market_dir))
+
+        result = run_race(make_agents(), market_dir)
+
+        board = result.leaderboard.set_index("agent_id")
+        for agent in make_agents():
+            backtest = run_backtest(TradingPredictor(Path(agent.model_path)), series, agent.config)
+            assert board.loc[agent.agent_id, "final_equity"] == backtest.stats["final_equity"]
+            assert board.loc[agent.agent_id, "trades"] == backtest.stats["trades"]
+
+    def test_leaderboard_is_ranked_by_pnl(self, market_dir):
+        """Test that the leaderboard is sorted by PnL with ranks from 1."""
+        result = run_race(make_agents(), market_dir)
+
+        board = result.leaderboard
+        assert list(board["rank"]) == [1, 2, 3, 4]
+        assert board["pnl"].is_monotonic_decreasing
+        assert result.stats["agents"] == 4
+        assert result.stats["models"] == 2
+        assert result.stats["bars"] == 400
+
+    def test_keep_equity(self, market_dir):
+        """Test that equity curves are returned on request."""
+        result = run_race(make_agents(), market_dir, keep_equity=True)
+
+        assert set(result.equity) == {agent.agent_id for agent in make_agents()}
+        assert len(result.equity["rules"]) == 250
+
+    def test_process_pool_matches_inline(self, market_dir):
+        """Test that agents sharded across processes score the same."""
+        inline = run_race(make_agents(), market_dir)
+        pooled = run_race(make_agents(), market_dir, workers=2)
+
+        assert pooled.stats["chunks"] == 2
+        assert pooled.leaderboard.equals(inline.leaderboard)
+
+    def test_saved_predictions_are_mapped(self, market_dir, tmp_path_factory, monkeypatch):
+        """Test that workers given a model's saved predictions don't predict it again."""
+        directory = str(tmp_path_factory.mktemp("predictions") / "model")
+        race._init_worker(str(market_dir), {(MODEL, "sklearn"): directory})
+        race._save_predictions(MODEL, "sklearn", directory)
+        expected = race._predict_model(MODEL, "sklearn")
+
+        def fail(*args):
+            raise AssertionError("predicted again")
+
+        monkeypatch.setattr(race, "predict_history", fail)
+        predictions = race._predictions_for(MODEL, "sklearn")
+
+        assert isinstance(predictions.action, np.memmap)
+        assert predictions.symbols == expected.symbols
+        np.testing.assert_array_equal(predictions.action, expected.action)
+        np.testing.assert_array_equal(predictions.confidence, expected.confidence)
+
+    def test_duplicate_agent_ids(self, market_dir):
+        """Test that agent ids must be unique."""
+        with pytest.raises(ValueError):
+            run_race([RaceAgent("a", MODEL), RaceAgent("a", MODEL)], market_dir)
+
+
+class TestChunkAgents:
+    """Tests for splitting agents into work units."""
+
+    def test_agents_of_a_model_stay_together(self):
+        """Test that agents are grouped by model before being split."""
+        agents = [RaceAgent(f"{m}-{i}", m) for i in range(2) for m in ("a", "b")]
+
+        chunks = _chunk_agents(agents, workers=2)
+
+        assert [[agent.model_path for agent in chunk] for chunk in chunks] == [
+            ["a", "a"], ["b", "b"]
+        ]
+
+    def test_single_model_split_across_workers(self):
+        """Test that a single model's agents are shared by all workers."""
+        agents = [RaceAgent(f"a-{i}", "a") for i in range(10)]
+
+        chunks = _chunk_agents(agents, workers=4)
+
+        assert [len(chunk) for chunk in chunks] == [3, 3, 3, 1]
@@ -0,0 +1,106 @@
+"""Tests for the sliding-window rate limiter."""
+
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from redis.exceptions import RedisError
+
+from app.services.rate_limiter import (
+    MemoryRateLimitBackend,
+    RateLimit,
+    RateLimiter,
+    RedisRateLimitBackend,
+)
+
+
+class TestRateLimit:
+    """Tests for parsing rate strings."""
+
+    def test_parse(self):
+        """Test common rate formats."""
+        assert RateLimit.parse("5/minute") == RateLimit(5, 60)
+        assert RateLimit.parse("100 / hour") == RateLimit(100, 3600)
+        assert RateLimit.parse("10/30seconds") == RateLimit(10, 30)
+
+    def test_parse_invalid(self):
+        """Test malformed rates are rejected."""
+        with pytest.raises(ValueError):
+            RateLimit.parse("five per minute")
+
+
+class TestMemoryBackend:
+    """Tests for the in-process backend."""
+
+    @pytest.mark.asyncio
+    async def test_sliding_window(self):
+        """Test requests beyond the limit are refused until the window slides."""
+        backend = MemoryRateLimitBackend()
+        rate = RateLimit(2, 60)
+
+        with patch("app.services.rate_limiter.time.monotonic", return_value=100.0):
+            assert (await backend.hit(["k"], rate)).remaining == 1
+            assert (await backend.hit(["k"], rate)).allowed
+            refused = await backend.hit(["k"], rate)
+        with patch("app.services.rate_limiter.time.monotonic", return_value=160.5):
+            later = await backend.hit(["k"], rate)
+
+        assert not refused.allowed and refused.retry_after_seconds == 60
+        assert later.allowed
+
+    @pytest.mark.asyncio
+    async def test_all_keys_or_none(self):
+        """Test a multi-key hit is refused, and not recorded, if any key is full."""
+        backend = MemoryRateLimitBackend()
+        rate = RateLimit(1, 60)
+        await backend.hit(["a"], rate)
+
+        assert not (await backend.hit(["a", "b"], rate)).allowed
+        assert (await backend.hit(["b"], rate)).allowed
+
+
+class TestRedisBackend:
+    """Tests for the Redis backend (script mocked)."""
+
+    @pytest.mark.asyncio
+    async def test_single_script_call(self):
+        """Test one check is one script invocation with prefixed keys."""
+        script = AsyncMock(return_value=[0, 0, 1500])
+        client = Mock()
+        client.register_script.return_value = script
+
+        result = await RedisRateLimitBackend(client).hit(["predict:ip:1.2.3.4"], RateLimit(5, 60))
+
+        script.assert_awaited_once()
+        kwargs = script.call_args.kwargs
+        assert kwargs["keys"] == ["ratelimit:predict:ip:1.2.3.4"]
+        assert kwargs["args"][:2] == [5, 60000]
+        assert not result.allowed and result.retry_after_seconds == 2
+
+
+class TestRateLimiter:
+    """Tests for per-endpoint limits."""
+
+    @pytest.mark.asyncio
+    async def test_per_endpoint_limits(self):
+        """Test each endpoint has its own limit and counters."""
+        limiter = RateLimiter({"predict": "1/minute", "predict_batch": "2/minute"})
+
+        assert (await limiter.hit("predict", ["ip"])).allowed
+        assert not (await limiter.hit("predict", ["ip"])).allowed
+        assert (await limiter.hit("predict_batch", ["ip"])).allowed
+        assert (await limiter.hit("unlimited", ["ip"])).allowed
+
+    @pytest.mark.asyncio
+    async def test_redis_errors_fail_open(self):
+        """Test a Redis outage doesn't reject traffic."""
+        limiter = RateLimiter({"predict": "1/minute"})
+        backend = Mock()
+        backend.hit = AsyncMock(side_effect=RedisError("down"))
+        limiter.use_backend(backend)
+
+        assert (await limiter.hit("predict", ["ip"])).allowed
+
+    def test_unknown_key_func(self):
+        """Test unknown key functions are rejected."""
+        with pytest.raises(ValueError):
+            RateLimiter({}, key_func="cookie")
@@ -1,14 +1,18 @@
 """Tests for Pydantic schemas."""
 
+import base64
 from datetime import datetime, timezone
 from decimal import Decimal
 
+import numpy as np
 import pytest
+from pydantic import ValidationError
 
 from app.models.enums import SignalContribution, TradeSide
 from app.models.schemas import (
     AgentContextRequest,
     AgentDecisionResponse,
+    CandleColumns,
     CandleData,
     ExplanationSignal,
     HealthResponse,
@@ -116,3 +120,66 @@ class TestSchemas:
         )
         assert health.status == "healthy"
         assert health.schema_version == SCHEMA_VERSION
+
+
+class TestCandleColumns:
+    """Tests for the columnar candle format."""
+
+    def test_json_arrays_decode(self):
+        """Test JSON column arrays decode to ns timestamps and an OHLCV matrix."""
+        columns = CandleColumns(
+            symbol="BTC",
+            timestamps=[1000, 2000],
+            open=[1, 2],
+            high=[3, 4],
+            low=[0.5, 1],
+            close=[2, 3],
+            volume=[10, 20],
+        )
+
+        timestamps, ohlcv = columns.to_arrays()
+
+        assert timestamps.tolist() == [1_000_000_000, 2_000_000_000]
+        assert ohlcv.shape == (2, 5)
+        assert ohlcv[:, 3].tolist() == [2.0, 3.0]
+
+    def test_packed_decode(self):
+        """Test packed float64 columns decode to the same arrays."""
+        packed = np.array(
+            [[1000, 2000], [1, 2], [3, 4], [0.5, 1], [2, 3], [10, 20]], dtype="<f8"
+        )
+
+        columns = CandleColumns(symbol="BTC", packed=base64.b64encode(packed.tobytes()).decode())
+        timestamps, ohlcv = columns.to_arrays()
+
+        assert timestamps.tolist() == [1_000_000_000, 2_000_000_000]
+        assert ohlcv[:, 4].tolist() == [10.0, 20.0]
+
+    def test_rejects_ragged_columns(self):
+        """Test columns of different lengths are rejected."""
+        with pytest.raises(ValidationError):
+            CandleColumns(symbol="BTC", timestamps=[1, 2], close=[1.0])
+
+    def test_rejects_truncated_packed(self):
+        """Test packed data that isn't whole rows of six float64 is rejected."""
+        with pytest.raises(ValidationError):
+            CandleColumns(symbol="BTC", packed=base64.b64encode(b"x" * 40).decode())
+
+    def test_rejects_symbol_in_both_forms(self):
+        """Test a symbol can't be sent as both candles and candleColumns."""
+        candle = CandleData(
+            symbol="BTC",
+            timestamp=datetime.now(timezone.utc),
+            open=Decimal("1"),
+            high=Decimal("1"),
+            low=Decimal("1"),
+            close=Decimal("1"),
+            volume=Decimal("1"),
+        )
+        with pytest.raises(ValidationError):
+            AgentContextRequest(
+                agent_id="a",
+                portfolio=PortfolioState(cash=Decimal("1"), positions=[], total_value=Decimal("1")),
+                candles=[candle],
+                candle_columns=[CandleColumns(symbol="BTC")],
+            )
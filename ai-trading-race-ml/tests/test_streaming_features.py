@@ -0,0 +1,126 @@
+"""Tests for streaming indicator state."""
+
+import numpy as np
+import pytest
+
+from app.ml.feature_engine import latest_features
+from app.ml.streaming_features import IndicatorState, StreamingFeatureStore
+
+RTOL = 1e-9
+ATOL = 1e-9
+INTERVAL = 60
+
+
+def make_series(n: int, seed: int = 3) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Create evenly spaced timestamps with a random-walk close series."""
+    rng = np.random.default_rng(seed)
+    timestamps = np.arange(n, dtype=np.int64) * INTERVAL
+    close = 42000 * np.cumprod(1 + rng.normal(0, 0.02, n))
+    volume = rng.uniform(100, 1000, n)
+    return timestamps, close, volume
+
+
+class TestIndicatorState:
+    """Tests for O(1) indicator updates."""
+
+    @pytest.mark.parametrize("seed_size", [21, 30, 40])
+    def test_updates_match_full_recompute(self, seed_size):
+        """Test incremental updates equal a recompute over the whole history."""
+        timestamps, close, volume = make_series(1200)
+        state = IndicatorState(timestamps[:seed_size], close[:seed_size], volume[:seed_size])
+
+        for i in range(seed_size, len(close)):
+            state.update(timestamps[i], close[i], volume[i])
+            if i % 50 == 0 or i < seed_size + 15:
+                np.testing.assert_allclose(
+                    state.features(),
+                    latest_features(close[:i + 1], volume[:i + 1]),
+                    rtol=RTOL,
+                    atol=ATOL,
+                )
+
+    def test_seed_requires_enough_candles(self):
+        """Test that seeding needs full indicator windows."""
+        timestamps, close, volume = make_series(20)
+
+        with pytest.raises(ValueError):
+            IndicatorState(timestamps, close, volume)
+
+
+class TestStreamingFeatureStore:
+    """Tests for the per-symbol feature store."""
+
+    def test_sliding_window_only_folds_new_candles(self):
+        """Test a window moving by one candle reuses the stored state."""
+        timestamps, close, volume = make_series(200)
+        store = StreamingFeatureStore()
+        window = 50
+
+        for end in range(window, len(close) + 1):
+            window_slice = slice(end - window, end)
+            features = store.latest_features(
+                "BTC", timestamps[window_slice], close[window_slice], volume[window_slice]
+            )
+
+        # State carries the whole streamed history, not just the last window
+        np.testing.assert_allclose(
+            features, latest_features(close, volume), rtol=RTOL, atol=ATOL
+        )
+        assert len(store) == 1
+
+    def test_gap_triggers_reseed(self):
+        """Test a window that skips candles is recomputed from scratch."""
+        timestamps, close, volume = make_series(200)
+        store = StreamingFeatureStore()
+        store.latest_features("BTC", timestamps[:50], close[:50], volume[:50])
+
+        features = store.latest_features(
+            "BTC", timestamps[100:150], close[100:150], volume[100:150]
+        )
+
+        np.testing.assert_allclose(
+            features, latest_features(close[100:150], volume[100:150]), rtol=RTOL, atol=ATOL
+        )
+
+    def test_revision_triggers_reseed(self):
+        """Test a revised last candle is recomputed from scratch."""
+        timestamps, close, volume = make_series(100)
+        store = StreamingFeatureStore()
+        store.latest_features("BTC", timestamps[:50], close[:50], volume[:50])
+
+        revised = close[:51].copy()
+        revised[49] *= 1.01
+        features = store.latest_features("BTC", timestamps[:51], revised, volume[:51])
+
+        np.testing.assert_allclose(
+            features, latest_features(revised, volume[:51]), rtol=RTOL, atol=ATOL
+        )
+
+    def test_stale_window_does_not_rewind_state(self):
+        """Test an older window is served without replacing the state."""
+        timestamps, close, volume = make_series(100)
+        store = StreamingFeatureStore()
+        store.latest_features("BTC", timestamps[:80], close[:80], volume[:80])
+
+        stale = store.latest_features("BTC", timestamps[:60], close[:60], volume[:60])
+        latest = store.latest_features("BTC", timestamps[:81], close[:81], volume[:81])
+
+        np.testing.assert_allclose(stale, latest_features(close[:60], volume[:60]), rtol=RTOL)
+        np.testing.assert_allclose(latest, latest_features(close[:81], volume[:81]), rtol=RTOL)
+
+    def test_symbols_and_intervals_are_separate(self):
+        """Test states are keyed by (symbol, interval) with LRU eviction."""
+        timestamps, close, volume = make_series(60)
+        store = StreamingFeatureStore(max_series=2)
+
+        store.latest_features("BTC", timestamps, close, volume)
+        store.latest_features("ETH", timestamps, close, volume)
+        store.latest_features("BTC", timestamps * 5, close, volume)
+
+        assert len(store) == 2
+
+    def test_short_window_returns_no_rows(self):
+        """Test windows too short for indicators produce no features."""
+        timestamps, close, volume = make_series(10)
+
+        assert len(StreamingFeatureStore().latest_features("BTC", timestamps, close, volume)) == 0
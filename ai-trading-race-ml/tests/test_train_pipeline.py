@@ -0,0 +1,143 @@
+"""Tests for the sharded training pipeline."""
+
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pytest
+
+from app.ml.feature_engine import compute_features
+from app.services.candle_store import CandleStore
+from scripts.generate_training_data import generate_ohlcv_vectorized, generate_shards
+from scripts import train_pipeline
+from scripts.train_pipeline import assemble, featurize_shard, plan_parallelism, run_pipeline
+
+SMALL_FOREST = {"n_estimators": 5, "max_depth": 4, "class_weight": "balanced"}
+
+
+class TestTrainPipeline:
+    """Tests for the training pipeline."""
+
+    def test_blocked_features_match_full_series(self, tmp_path, monkeypatch):
+        """Test block-wise featurization matches one full-series computation."""
+        monkeypatch.setattr(train_pipeline, "FEATURE_BLOCK_ROWS", 700)
+        [shard] = generate_shards(tmp_path / "shards", n_shards=1, candles_per_shard=3000)
+
+        result = featurize_shard(shard, tmp_path)
+        X, y = train_pipeline._open_shard(tmp_path, result["key"], result["rows"])
+
+        df = generate_ohlcv_vectorized(3000)
+        full = compute_features(df["close"].to_numpy(), df["volume"].to_numpy())
+        full = full[: -train_pipeline.LABEL_HORIZON]
+        expected = full[~np.isnan(full).any(axis=1)].astype(np.float32)
+        np.testing.assert_allclose(X, expected, rtol=1e-6)
+        assert len(y) == len(expected)
+
+    def test_featurized_shards_are_reused(self, tmp_path):
+        """Test a second run reads features from the cache."""
+        [shard] = generate_shards(tmp_path / "shards", n_shards=1, candles_per_shard=500)
+
+        first = featurize_shard(shard, tmp_path)
+        second = featurize_shard(shard, tmp_path)
+
+        assert not first["cached"]
+        assert second["cached"]
+        assert second["rows"] == first["rows"]
+
+    def test_candle_store_symbols_as_shards(self, tmp_path):
+        """Test a candle store symbol featurizes like the Parquet shard it came from."""
+        [shard] = generate_shards(tmp_path / "shards", n_shards=1, candles_per_shard=1000)
+        store = CandleStore(tmp_path / "store")
+        store.import_parquet("BTC", shard)
+        (tmp_path / "parquet_cache").mkdir()
+        (tmp_path / "store_cache").mkdir()
+
+        from_parquet = featurize_shard(shard, tmp_path / "parquet_cache")
+        from_store = featurize_shard(tmp_path / "store" / "BTC", tmp_path / "store_cache")
+
+        X_parquet, _ = train_pipeline._open_shard(
+            tmp_path / "parquet_cache", from_parquet["key"], from_parquet["rows"]
+        )
+        X_store, _ = train_pipeline._open_shard(
+            tmp_path / "store_cache", from_store["key"], from_store["rows"]
+        )
+        np.testing.assert_array_equal(X_store, X_parquet)
+
+    def test_run_pipeline(self, tmp_path):
+        """Test the pipeline cross-validates, saves a model and reports stages."""
+        generate_shards(tmp_path / "shards", n_shards=3, candles_per_shard=2000)
+
+        report = run_pipeline(
+            tmp_path / "shards",
+            tmp_path / "cache",
+            tmp_path / "model.pkl",
+            cv=3,
+            model_params=SMALL_FOREST,
+        )
+
+        model = joblib.load(tmp_path / "model.pkl")
+        assert model.n_features_in_ == len(train_pipeline.FEATURE_COLUMNS)
+        assert len(report["cv_scores"]) == 3
+        assert [s["stage"] for s in report["stages"]] == ["features", "assemble", "train", "save"]
+        assert all(s["wall_seconds"] >= 0 and s["peak_rss_mb"] > 0 for s in report["stages"])
+
+    def test_max_rows_subsamples(self, tmp_path):
+        """Test max_rows bounds the training set."""
+        generate_shards(tmp_path / "shards", n_shards=2, candles_per_shard=2000)
+
+        report = run_pipeline(
+            tmp_path / "shards",
+            tmp_path / "cache",
+            tmp_path / "model.pkl",
+            cv=2,
+            max_rows=1000,
+            model_params=SMALL_FOREST,
+        )
+
+        assert report["samples"] == 1000
+
+    def test_assemble_into_run_dir(self, tmp_path):
+        """Test the training matrix is written to the run's directory only."""
+        shards = [
+            featurize_shard(path, tmp_path)
+            for path in generate_shards(tmp_path / "shards", n_shards=2, candles_per_shard=500)
+        ]
+        cached = set(tmp_path.iterdir())
+        (tmp_path / "run").mkdir()
+
+        X, y, _ = assemble(shards, tmp_path, tmp_path / "run", max_rows=100)
+
+        assert Path(X.filename).parent == tmp_path / "run"
+        assert len(X) == len(y) == 100
+        assert set(tmp_path.iterdir()) - cached == {tmp_path / "run"}
+
+    def test_run_leaves_only_the_feature_cache(self, tmp_path):
+        """Test a run deletes its training matrix once the model is fitted."""
+        generate_shards(tmp_path / "shards", n_shards=2, candles_per_shard=1000)
+        cache_dir = tmp_path / "cache"
+
+        for max_rows in (None, 500):
+            run_pipeline(
+                tmp_path / "shards",
+                cache_dir,
+                tmp_path / "model.pkl",
+                cv=2,
+                max_rows=max_rows,
+                model_params=SMALL_FOREST,
+            )
+
+        assert not [path for path in cache_dir.iterdir() if path.name.startswith("train")]
+        assert not list(cache_dir.glob("*.tmp"))
+
+    def test_no_rows(self, tmp_path):
+        """Test shards too short for the feature warm-up are a clear error."""
+        [shard] = generate_shards(tmp_path / "shards", n_shards=1, candles_per_shard=20)
+
+        with pytest.raises(ValueError, match="No training rows"):
+            assemble([featurize_shard(shard, tmp_path)], tmp_path, tmp_path, max_rows=10)
+
+    def test_memory_budget_limits_concurrent_fits(self):
+        """Test fits run one at a time when only one fits in memory."""
+        assert plan_parallelism(8, 6, fold_bytes=100, max_memory_bytes=None) == (6, 1)
+        assert plan_parallelism(8, 6, fold_bytes=100, max_memory_bytes=250) == (2, 4)
+        assert plan_parallelism(8, 6, fold_bytes=100, max_memory_bytes=50) == (1, 8)